@@ -0,0 +1,255 @@
+#################################
+##### jExam Build Benchmark #####
+#################################
+
+"""
+Times the phases of a jExam build on synthetic master notebooks (see ``benchmarks.synthetic``) and
+stores the results as JSON so that runs can be compared. Run from the repository root with
+
+    python -m benchmarks.bench_build --cases small medium
+    python -m benchmarks.bench_build --cases small --compare benchmarks/results/baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import pathlib
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+
+import numpy as np
+import nbformat
+
+from jexam.output import DirectoryOutput
+from jexam.parser import (
+    ExamFragments, create_and_write_autograder_exam, create_and_write_exam_instance,
+    parse_notebook, plan_exam_instances
+)
+
+from .synthetic import MasterSpec, make_master
+
+
+#---------------------------------------------------------------------------------------------------
+# GLOBAL VARIABLES
+#---------------------------------------------------------------------------------------------------
+
+CASES = {
+    "small": MasterSpec(questions=5, versions=2, tests=2, cell_lines=5, students=100),
+    "medium": MasterSpec(questions=20, versions=4, tests=4, cell_lines=20, students=500, exam_questions=10),
+    "large": MasterSpec(questions=50, versions=6, tests=6, cell_lines=50, students=2000, exam_questions=25),
+    "long-cells": MasterSpec(questions=5, versions=2, tests=2, cell_lines=2000, students=100),
+    "many-students": MasterSpec(questions=10, versions=3, tests=2, cell_lines=10, students=5000),
+}
+
+PHASES = ["parse_notebook", "create_and_write_autograder_exam", "encode_fragments", "create_and_write_exam_instance"]
+
+RESULTS_DIR = pathlib.Path(__file__).parent / "results"
+NB_NAME = "master.ipynb"
+
+
+#---------------------------------------------------------------------------------------------------
+# BENCHMARK
+#---------------------------------------------------------------------------------------------------
+
+def run_build(nb, result, trace_memory=False):
+    """
+    Runs each phase of a build of ``nb`` into the directory ``result`` and measures it.
+
+    Args:
+        nb (``nbformat.NotebookNode``): the master notebook
+        result (``pathlib.Path``): the directory to write to
+        trace_memory (``bool``): whether to record the peak memory allocated by each phase with
+            ``tracemalloc``, which slows the build down
+
+    Returns:
+        ``dict``: the seconds (and peak bytes, if traced) of each phase, keyed by phase name
+    """
+    measurements = {}
+    def measure(phase, func, *args):
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        value = func(*args)
+        measurements[phase] = {"seconds": time.perf_counter() - start}
+        if trace_memory:
+            measurements[phase]["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return value
+
+    output = DirectoryOutput(result)
+
+    exam = measure("parse_notebook", parse_notebook, nb)
+    measure("create_and_write_autograder_exam", create_and_write_autograder_exam, exam, output, pathlib.Path("autograder"), NB_NAME)
+
+    num_questions, num_students = exam.config["num_questions"], exam.config["num_students"]
+    exam.fragments = measure("encode_fragments", ExamFragments, exam, NB_NAME, num_questions)
+
+    assignments = plan_exam_instances(exam, exam.config["seed"], num_students, num_questions)
+    def write_exams():
+        for i, assignment in enumerate(assignments):
+            create_and_write_exam_instance(exam, output, pathlib.Path(f"exam_{i}"), NB_NAME, assignment)
+    measure("create_and_write_exam_instance", write_exams)
+    measurements["create_and_write_exam_instance"]["seconds_per_exam"] = \
+        measurements["create_and_write_exam_instance"]["seconds"] / num_students
+
+    return measurements
+
+def count_files(result):
+    """
+    Returns the number of files in a directory and their total size in bytes.
+
+    Args:
+        result (``pathlib.Path``): the directory
+
+    Returns:
+        ``tuple`` of ``int``: the number of files and bytes
+    """
+    num_files, num_bytes = 0, 0
+    for root, _, files in os.walk(result):
+        for f in files:
+            num_files += 1
+            num_bytes += os.path.getsize(os.path.join(root, f))
+    return num_files, num_bytes
+
+def run_case(spec, repeat, trace_memory):
+    """
+    Benchmarks a build of the master notebook for ``spec``. Each phase's time is the best of
+    ``repeat`` builds.
+
+    Args:
+        spec (``MasterSpec``): the shape of the master notebook
+        repeat (``int``): the number of builds to time
+        trace_memory (``bool``): whether to run an extra build that records peak memory
+
+    Returns:
+        ``dict``: the results for the case
+    """
+    nb = make_master(spec)
+    phases = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        result = pathlib.Path(tmp) / "dist"
+        for _ in range(repeat):
+            shutil.rmtree(result, ignore_errors=True)
+            for phase, m in run_build(nb, result).items():
+                if phase not in phases or m["seconds"] < phases[phase]["seconds"]:
+                    phases[phase] = m
+        num_files, num_bytes = count_files(result)
+
+        if trace_memory:
+            shutil.rmtree(result)
+            for phase, m in run_build(nb, result, trace_memory=True).items():
+                phases[phase]["peak_bytes"] = m["peak_bytes"]
+
+    return {
+        "spec": spec._asdict(),
+        "cells": len(nb.cells),
+        "phases": phases,
+        "files": num_files,
+        "bytes": num_bytes,
+    }
+
+def get_environment():
+    """
+    Returns information about the environment that the benchmarks ran in.
+
+    Returns:
+        ``dict``: the environment
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "nbformat": nbformat.__version__,
+    }
+
+
+#---------------------------------------------------------------------------------------------------
+# COMPARISON
+#---------------------------------------------------------------------------------------------------
+
+def compare(results, baseline, threshold):
+    """
+    Prints the ratio of each phase's time to its time in ``baseline`` for the cases in both.
+
+    Args:
+        results (``dict``): the results of this run
+        baseline (``dict``): the results of an earlier run
+        threshold (``float``): the ratio above which a phase counts as a regression
+
+    Returns:
+        ``list`` of ``str``: the ``case/phase`` names of the regressions
+    """
+    regressions = []
+    for name, case in results["cases"].items():
+        if name not in baseline["cases"]:
+            continue
+        for phase, m in case["phases"].items():
+            old = baseline["cases"][name]["phases"].get(phase)
+            if old is None:
+                continue
+            ratio = m["seconds"] / old["seconds"]
+            flag = " REGRESSION" if ratio > threshold else ""
+            print(f"{name:<16}{phase:<36}{old['seconds']:>10.4f}s ->{m['seconds']:>10.4f}s  x{ratio:.2f}{flag}")
+            if flag:
+                regressions.append(f"{name}/{phase}")
+    return regressions
+
+def print_case(name, case):
+    """
+    Prints the results of a case.
+    """
+    print(f"{name}: {case['cells']} cells, {case['files']} files, {case['bytes']} bytes")
+    for phase in PHASES:
+        m = case["phases"][phase]
+        line = f"  {phase:<36}{m['seconds']:>10.4f}s"
+        if "seconds_per_exam" in m:
+            line += f"  ({m['seconds_per_exam'] * 1e3:.3f} ms/exam)"
+        if "peak_bytes" in m:
+            line += f"  peak {m['peak_bytes'] / 2 ** 20:.1f} MiB"
+        print(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark jExam builds of synthetic master notebooks")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=["small", "medium"], help="Cases to run")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed builds per case")
+    parser.add_argument("--no-memory", dest="memory", default=True, action="store_false", help="Skip the build that records peak memory")
+    parser.add_argument("--output", default=None, help="Path at which to write results; defaults to benchmarks/results/<time>.json")
+    parser.add_argument("--compare", default=None, help="Path to earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Time ratio above which --compare reports a regression")
+    args = parser.parse_args(argv)
+
+    results = {"environment": get_environment(), "cases": {}}
+    for name in args.cases:
+        results["cases"][name] = run_case(CASES[name], args.repeat, args.memory)
+        print_case(name, results["cases"][name])
+
+    output = pathlib.Path(args.output or RESULTS_DIR / (time.strftime("%Y%m%d-%H%M%S") + ".json"))
+    os.makedirs(output.parent, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=1)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("Regressions: " + ", ".join(regressions))
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+########################################
+##### Doctest Conversion Benchmark #####
+########################################
+
+"""
+Times ``str_to_doctest`` and ``gen_case`` on test cells of increasing length and checks that the time
+per line stays roughly constant (i.e. that conversion scales linearly). Run from the repository root
+with
+
+    python -m benchmarks.bench_doctest
+"""
+
+import sys
+import time
+import argparse
+
+from jexam.parser import Test, gen_case
+from jexam.utils import str_to_doctest
+
+
+#---------------------------------------------------------------------------------------------------
+# GLOBAL VARIABLES
+#---------------------------------------------------------------------------------------------------
+
+DEFAULT_SIZES = [1000, 4000, 16000, 64000]
+
+
+#---------------------------------------------------------------------------------------------------
+# BENCHMARK
+#---------------------------------------------------------------------------------------------------
+
+def make_code_lines(num_lines):
+    """
+    Returns the lines of a data-driven test cell with a literal table of ``num_lines - 2`` rows.
+
+    Args:
+        num_lines (``int``): the number of lines in the cell
+
+    Returns:
+        ``list`` of ``str``: the lines of the cell
+    """
+    rows = [f"    ({i}, {i ** 2})," for i in range(num_lines - 2)]
+    return ["data = ["] + rows + ["]"]
+
+def time_per_line(func, num_lines, repeat):
+    """
+    Returns the best time per line, in microseconds, of ``repeat`` calls of ``func`` on a cell with
+    ``num_lines`` lines.
+
+    Args:
+        func (callable): a function that takes the lines of a cell
+        num_lines (``int``): the number of lines in the cell
+        repeat (``int``): the number of times to call ``func``
+
+    Returns:
+        ``float``: the time per line in microseconds
+    """
+    code_lines = make_code_lines(num_lines)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(code_lines)
+        best = min(best, time.perf_counter() - start)
+    return best / num_lines * 1e6
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark doctest conversion of long test cells")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="Cell lengths to time")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timings per cell length")
+    parser.add_argument("--max-ratio", type=float, default=3.0, help="Largest allowed ratio of time per line between the longest and shortest cells")
+    args = parser.parse_args(argv)
+
+    funcs = {
+        "str_to_doctest": lambda code_lines: str_to_doctest(code_lines, []),
+        "gen_case": lambda code_lines: gen_case(Test("\n".join(code_lines), "", False)),
+    }
+
+    linear = True
+    for name, func in funcs.items():
+        per_line = [time_per_line(func, size, args.repeat) for size in args.sizes]
+        for size, t in zip(args.sizes, per_line):
+            print(f"{name:<16}{size:>10} lines{t:>10.3f} us/line")
+        ratio = per_line[-1] / per_line[0]
+        print(f"{name:<16}ratio {ratio:.2f}\n")
+        linear = linear and ratio <= args.max_ratio
+
+    if not linear:
+        print(f"Time per line grew by more than {args.max_ratio}x")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
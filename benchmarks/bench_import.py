@@ -0,0 +1,102 @@
+##################################
+##### jExam Import Benchmark #####
+##################################
+
+"""
+Times the startup of short jExam invocations in fresh interpreters and reports which heavy
+dependencies each one imports. Run from the repository root with
+
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --importtime "jexam --help"
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+
+#---------------------------------------------------------------------------------------------------
+# GLOBAL VARIABLES
+#---------------------------------------------------------------------------------------------------
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BIN = os.path.join(ROOT, "bin", "jexam")
+
+CASES = {
+    "python": ["-c", "pass"],
+    "jexam --help": [BIN, "--help"],
+    "jexam query --help": [BIN, "query", "--help"],
+    "import jexam.parser": ["-c", "import jexam.parser"],
+    "import jexam.planner": ["-c", "import jexam.planner"],
+}
+
+# dependencies that take tens of milliseconds to import
+HEAVY_MODULES = ["nbformat", "numpy", "yaml", "jsonschema", "concurrent.futures.process"]
+
+
+#---------------------------------------------------------------------------------------------------
+# BENCHMARK
+#---------------------------------------------------------------------------------------------------
+
+def run(argv, importtime=False):
+    """
+    Runs the Python interpreter with ``argv`` in a fresh process.
+
+    Args:
+        argv (``list`` of ``str``): the interpreter arguments
+        importtime (``bool``, optional): whether to run with ``-X importtime``
+
+    Returns:
+        ``tuple`` of ``float`` and ``str``: the wall time in seconds and the standard error
+    """
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + argv
+    start = time.perf_counter()
+    result = subprocess.run(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return time.perf_counter() - start, result.stderr
+
+def parse_importtime(stderr):
+    """
+    Parses the output of ``-X importtime``.
+
+    Args:
+        stderr (``str``): the standard error of the interpreter
+
+    Returns:
+        ``dict``: the cumulative import time in microseconds of each module, keyed by name
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the startup time of jExam commands")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES), help="Cases to run")
+    parser.add_argument("--repeat", type=int, default=10, help="Number of timed runs per case")
+    parser.add_argument("--importtime", default=None, choices=list(CASES), help="Print the slowest imports of this case")
+    parser.add_argument("--top", type=int, default=15, help="Number of imports to print with --importtime")
+    args = parser.parse_args(argv)
+
+    for name in args.cases:
+        times = [run(CASES[name])[0] for _ in range(args.repeat)]
+        imported = parse_importtime(run(CASES[name], importtime=True)[1])
+        heavy = [m for m in HEAVY_MODULES if m in imported] or ["none"]
+        print(f"{name:<24}min {min(times) * 1e3:>7.1f} ms  median {statistics.median(times) * 1e3:>7.1f} ms  heavy: {', '.join(heavy)}")
+
+    if args.importtime:
+        imported = parse_importtime(run(CASES[args.importtime], importtime=True)[1])
+        print(f"\nSlowest imports of {args.importtime} (cumulative):")
+        for module, us in sorted(imported.items(), key=lambda m: -m[1])[:args.top]:
+            print(f"  {module:<48}{us / 1e3:>8.1f} ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
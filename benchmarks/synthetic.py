@@ -0,0 +1,123 @@
+#########################################################
+##### Synthetic Master Notebook Generator for jExam #####
+#########################################################
+
+"""
+Generates master notebooks of any size in the format parsed by ``jexam.parser.parse_notebook``, for
+benchmarking. Run from the repository root with
+
+    python -m benchmarks.synthetic master.ipynb --questions 20 --versions 4 --students 500
+"""
+
+import sys
+import argparse
+import nbformat
+
+from collections import namedtuple
+
+
+#---------------------------------------------------------------------------------------------------
+# SPECIFICATION
+#---------------------------------------------------------------------------------------------------
+
+# the shape of a synthetic master notebook:
+#   questions: the number of questions
+#   versions: the number of versions of each question
+#   tests: the number of test cells in each version of an autograded question; every other is hidden
+#   cell_lines: the number of lines in each prompt and solution cell
+#   students: the number of students
+#   exam_questions: the number of questions on each exam; 0 for all questions
+#   manual_every: every manual_every-th question is manually graded; 0 for none
+#   public_tests: whether student exams include public tests
+#   seed: the exam seed
+MasterSpec = namedtuple("MasterSpec", [
+    "questions", "versions", "tests", "cell_lines", "students", "exam_questions", "manual_every", 
+    "public_tests", "seed",
+], defaults=[10, 3, 2, 10, 100, 0, 4, False, 42])
+
+
+#---------------------------------------------------------------------------------------------------
+# GENERATOR
+#---------------------------------------------------------------------------------------------------
+
+def make_version_cells(spec, question, version, manual):
+    """
+    Returns the cells of one version of a question: a prompt, a solution, and its tests.
+
+    Args:
+        spec (``MasterSpec``): the shape of the notebook
+        question (``int``): the question index
+        version (``int``): the version index
+        manual (``bool``): whether the question is manually graded
+
+    Returns:
+        ``list`` of ``nbformat.NotebookNode``: the cells
+    """
+    prompt = [f"Question {question}, version {version}: compute `q{question}`."]
+    prompt += [f"Line {i} of the prompt for question {question}." for i in range(spec.cell_lines - 1)]
+    if manual:
+        return [
+            nbformat.v4.new_markdown_cell("\n".join(prompt)),
+            nbformat.v4.new_markdown_cell(f"**SOLUTION:** version {version} of question {question}"),
+        ]
+
+    solution = [f"x_{i} = {i} * {version + 1}  # SOLUTION" for i in range(spec.cell_lines - 1)]
+    solution += [f"q{question} = {version}  # SOLUTION"]
+    cells = [nbformat.v4.new_markdown_cell("\n".join(prompt)), nbformat.v4.new_code_cell("\n".join(solution))]
+    for t in range(spec.tests):
+        header = "# HIDDEN TEST" if t % 2 else "# TEST"
+        test = nbformat.v4.new_code_cell(f"{header}\nq{question} + {t} == {version + t}", execution_count=1)
+        test.outputs = [nbformat.v4.new_output("execute_result", {"text/plain": "True"}, execution_count=1)]
+        cells.append(test)
+    return cells
+
+def make_master(spec):
+    """
+    Returns a synthetic master notebook.
+
+    Args:
+        spec (``MasterSpec``): the shape of the notebook
+
+    Returns:
+        ``nbformat.NotebookNode``: the master notebook
+    """
+    raw, md, code = nbformat.v4.new_raw_cell, nbformat.v4.new_markdown_cell, nbformat.v4.new_code_cell
+    exam_questions = spec.exam_questions or spec.questions
+    config = [
+        "BEGIN EXAM",
+        f"num_questions: {exam_questions}",
+        f"num_students: {spec.students}",
+        f"seed: {spec.seed}",
+        "endpoint: /benchmark",
+        f"public_tests: {str(spec.public_tests).lower()}",
+    ]
+    cells = [
+        raw("\n".join(config)),
+        raw("BEGIN INTRODUCTION"), md("# Synthetic Exam"), code("import numpy as np"), raw("END INTRODUCTION"),
+    ]
+    for q in range(spec.questions):
+        manual = spec.manual_every > 0 and q % spec.manual_every == spec.manual_every - 1
+        cells.append(raw(f"BEGIN QUESTION\npoints: {q % 3 + 1}\nmanual: {str(manual).lower()}"))
+        for v in range(spec.versions):
+            cells.append(raw("BEGIN VERSION"))
+            cells.extend(make_version_cells(spec, q, v, manual))
+            cells.append(raw("END VERSION"))
+        cells.append(raw("END QUESTION"))
+    cells += [raw("BEGIN CONCLUSION"), md("Done!"), raw("END CONCLUSION")]
+    return nbformat.v4.new_notebook(cells=cells)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic jExam master notebook")
+    parser.add_argument("path", help="Path at which to write the notebook")
+    for name, default in MasterSpec()._asdict().items():
+        flag = "--" + name.replace("_", "-")
+        if isinstance(default, bool):
+            parser.add_argument(flag, default=default, action="store_true")
+        else:
+            parser.add_argument(flag, type=int, default=default)
+    args = vars(parser.parse_args(argv))
+    path = args.pop("path")
+    nbformat.write(make_master(MasterSpec(**args)), path)
+
+if __name__ == "__main__":
+    sys.exit(main())
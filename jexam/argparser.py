@@ -13,8 +13,79 @@ def get_parser():
     """
     parser = argparse.ArgumentParser()
     parser.add_argument("master", type=str, help="Path to exam master notebook")
-    parser.add_argument("result", nargs="?", default="dist", help="Path at which to write output notebooks")
+    parser.add_argument("result", nargs="?", default="dist", help="Path at which to write output notebooks; a .zip, .tar, .tar.gz, .tgz, .tar.bz2, or .tar.xz path writes an archive")
     parser.add_argument("-f", "--format", type=str, default="otter", help="Name of autograder format; 'otter' or 'ok'")
-    parser.add_argument("-s", "--seed", type=int, default=None, help="Random seed for NumPy to run before execution")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="Seed for the per-student question and version assignments; overrides the exam's configured seed")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of worker processes to use when generating exams")
+    parser.add_argument("-i", "--incremental", default=False, action="store_true", help="Only rewrite outputs whose inputs changed since the last incremental build")
+    parser.add_argument("-q", "--quiet", default=False, action="store_true", help="Run without printing status")
+    parser.add_argument("-l", "--link", default=False, action="store_true", help="Write each distinct file once into a content-addressed store in the result directory and hard-link it into place")
+    parser.add_argument("--student", dest="students", type=int, action="append", default=None, help="Index of a student whose exam to write instead of the whole class; may be repeated")
+    parser.add_argument("--strip-outputs", default=False, action="store_true", help="Discard the outputs of all cells except test cells while reading the master notebook, including from the autograder notebook")
+    parser.add_argument("-a", "--extract-attachments", default=False, action="store_true", help="Write each distinct cell attachment once to an assets directory and link to it from the notebooks")
+    parser.add_argument("-e", "--export", default=None, choices=["html", "pdf"], help="Also export each student notebook to HTML or PDF with nbconvert")
+    parser.add_argument("--export-autograder", default=False, action="store_true", help="With --export, also export the autograder notebook")
+    parser.add_argument("-w", "--watch", default=False, action="store_true", help="Rebuild incrementally whenever the master notebook changes")
+    parser.add_argument("--progress", default=None, help="Write progress events as JSON lines to this path, or '-' for stdout")
+    parser.add_argument("--profile", nargs="?", const="jexam-profile", default=None, help="Write a timing and memory report and a Chrome trace of the build to this directory (default: jexam-profile)")
+    parser.add_argument("--cprofile", default=False, action="store_true", help="With --profile, also write a cProfile dump of the main process")
+    return parser
+
+def get_query_parser():
+    """
+    Creates and returns the argument parser for ``jexam query``
+    
+    Returns:
+        ``argparse.ArgumentParser``: the argument parser for ``jexam query``
+    """
+    parser = argparse.ArgumentParser(prog="jexam query", description="Look up the questions and versions assigned to students; all indices are zero-based")
+    parser.add_argument("result", nargs="?", default="dist", help="Path to the output of a jExam build")
+    parser.add_argument("--student", type=str, default=None, help="Index or exam name (e.g. exam_17) of a student whose answer key to show")
+    parser.add_argument("--question", type=int, default=None, help="Index of a question whose recipients to show")
+    parser.add_argument("--version", type=int, default=None, help="Index of a version of --question whose recipients to show")
+    parser.add_argument("--hash", type=str, default=None, help="Hash (test name) of a version whose recipients to show")
+    parser.add_argument("--json", default=False, action="store_true", help="Print rows as JSON")
+    return parser
+
+def get_batch_parser():
+    """
+    Creates and returns the argument parser for ``jexam batch``
+    
+    Returns:
+        ``argparse.ArgumentParser``: the argument parser for ``jexam batch``
+    """
+    parser = argparse.ArgumentParser(prog="jexam batch", description="Build exams from many master notebooks in one process")
+    parser.add_argument("masters", nargs="+", help="Paths to exam master notebooks")
+    parser.add_argument("-o", "--output-dir", default="dist", help="Directory in which to write the output of each master notebook, in a subdirectory named for the notebook")
+    parser.add_argument("-f", "--format", type=str, default="otter", help="Name of autograder format; 'otter' or 'ok'")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="Random seed to use for every master notebook instead of its configured seed")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of worker processes to use when generating the exams of each master notebook")
+    parser.add_argument("-l", "--link", default=False, action="store_true", help="Write each distinct file once into a content-addressed store in each result directory and hard-link it into place")
+    parser.add_argument("-c", "--concurrency", type=int, default=2, help="Number of master notebooks to build at once")
+    parser.add_argument("-i", "--incremental", default=False, action="store_true", help="Only rewrite outputs whose inputs changed since the last incremental build")
+    parser.add_argument("--strip-outputs", default=False, action="store_true", help="Discard the outputs of all cells except test cells while reading each master notebook, including from the autograder notebooks")
+    parser.add_argument("-a", "--extract-attachments", default=False, action="store_true", help="Write each distinct cell attachment once to an assets directory in each result directory and link to it from the notebooks")
+    parser.add_argument("-e", "--export", default=None, choices=["html", "pdf"], help="Also export each student notebook to HTML or PDF with nbconvert")
+    parser.add_argument("--export-autograder", default=False, action="store_true", help="With --export, also export the autograder notebooks")
+    parser.add_argument("-q", "--quiet", default=False, action="store_true", help="Run without printing status")
+    parser.add_argument("--progress", default=None, help="Write progress events of all builds as JSON lines to this path, or '-' for stdout")
+    return parser
+
+def get_serve_parser():
+    """
+    Creates and returns the argument parser for ``jexam serve``
+    
+    Returns:
+        ``argparse.ArgumentParser``: the argument parser for ``jexam serve``
+    """
+    parser = argparse.ArgumentParser(prog="jexam serve", description="Keep parsed master notebooks in memory and build them on request over HTTP")
+    parser.add_argument("masters", nargs="*", help="Paths to master notebooks to parse at startup")
+    parser.add_argument("-f", "--format", type=str, default="otter", help="Autograder format of the master notebooks parsed at startup; 'otter' or 'ok'")
+    parser.add_argument("--socket", default="jexam.sock", help="Path of the Unix socket to listen on")
+    parser.add_argument("--tcp", default=False, action="store_true", help="Listen on --host and --port instead of a Unix socket; clients must send the token written to --token-file")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to listen on with --tcp")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on with --tcp")
+    parser.add_argument("--token-file", default=".jexam-token", help="Path to write the token that clients must send with --tcp")
+    parser.add_argument("-v", "--verbose", default=False, action="store_true", help="Log each request")
     parser.add_argument("-q", "--quiet", default=False, action="store_true", help="Run without printing status")
     return parser
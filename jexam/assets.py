@@ -0,0 +1,123 @@
+###################################
+##### Shared Assets for jExam #####
+###################################
+
+import copy
+import base64
+import hashlib
+import mimetypes
+
+from . import profiler
+
+
+#---------------------------------------------------------------------------------------------------
+# GLOBAL VARIABLES
+#---------------------------------------------------------------------------------------------------
+
+# the directory that assets are written to, relative to the output root
+ASSETS_DIR = "assets"
+
+# the path of the assets directory relative to the notebooks, which are all one directory deep
+ASSETS_LINK = "../" + ASSETS_DIR
+
+# file extensions of common attachment types, which mimetypes does not map consistently
+MIME_EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/gif": ".gif",
+    "image/svg+xml": ".svg",
+    "image/webp": ".webp",
+}
+
+# attachment types stored as text rather than base64 in notebook JSON
+TEXT_MIME_SUFFIXES = ("+xml", "+json", "/json", "/javascript")
+
+
+#---------------------------------------------------------------------------------------------------
+# ATTACHMENTS
+#---------------------------------------------------------------------------------------------------
+
+def decode_attachment(mime, data):
+    """
+    Decodes the data of an attachment as it is stored in notebook JSON.
+
+    Args:
+        mime (``str``): the MIME type of the attachment
+        data (``str`` or ``list`` of ``str``): the stored data
+
+    Returns:
+        ``bytes``: the contents of the attachment
+    """
+    if isinstance(data, list):
+        data = "".join(data)
+    if mime.startswith("text/") or mime.endswith(TEXT_MIME_SUFFIXES):
+        return data.encode("utf-8")
+    return base64.b64decode(data)
+
+def get_asset_name(mime, contents):
+    """
+    Returns the filename of an asset, which is the SHA-256 hash of its contents with the extension of
+    its MIME type.
+
+    Args:
+        mime (``str``): the MIME type of the asset
+        contents (``bytes``): the contents of the asset
+
+    Returns:
+        ``str``: the filename
+    """
+    extension = MIME_EXTENSIONS.get(mime) or mimetypes.guess_extension(mime) or ""
+    return hashlib.sha256(contents).hexdigest() + extension
+
+def extract_cell_attachments(cell, assets):
+    """
+    Returns ``cell`` with its attachments replaced by links to shared assets. Each attachment is added
+    to ``assets`` under a name derived from its contents (see ``get_asset_name``), so identical
+    attachments are stored once, and references to it in the cell's source (``attachment:{name}``)
+    are rewritten to the asset's path relative to the notebook. ``cell`` is not modified; a cell
+    without attachments is returned as is.
+
+    Args:
+        cell (``nbformat.NotebookNode``): the cell
+        assets (``dict``): the contents of each asset, keyed by filename
+
+    Returns:
+        ``nbformat.NotebookNode``: the cell with links to assets
+    """
+    attachments = cell.get("attachments")
+    if not attachments:
+        return cell
+
+    source = cell.source
+    # replace longer names first so that a name is never replaced inside a longer one
+    for name in sorted(attachments, key=len, reverse=True):
+        mime, data = next(iter(attachments[name].items()))
+        contents = decode_attachment(mime, data)
+        asset = get_asset_name(mime, contents)
+        assets.setdefault(asset, contents)
+        source = source.replace(f"attachment:{name}", f"{ASSETS_LINK}/{asset}")
+        profiler.count("attachments")
+
+    new_cell = copy.copy(cell)
+    del new_cell["attachments"]
+    new_cell.source = source
+    return new_cell
+
+def extract_attachments(nb):
+    """
+    Returns a copy of ``nb`` with the attachments of all of its cells replaced by links to shared
+    assets (see ``extract_cell_attachments``), and the contents of the assets. ``nb`` and its cells
+    are not modified; only cells with attachments are copied.
+
+    Args:
+        nb (``nbformat.NotebookNode``): the notebook
+
+    Returns:
+        ``tuple`` of ``nbformat.NotebookNode`` and ``dict``: the notebook and the contents of each
+        asset, keyed by filename
+    """
+    assets = {}
+    extracted = copy.copy(nb)
+    extracted["cells"] = [extract_cell_attachments(cell, assets) for cell in nb.cells]
+    profiler.count("assets", len(assets))
+    return extracted, assets
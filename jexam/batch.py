@@ -0,0 +1,115 @@
+##################################
+##### Batch Builds for jExam #####
+##################################
+
+import sys
+import argparse
+import pathlib
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, closing, redirect_stdout
+
+from .parser import build
+from .progress import JSONLinesSink, ProgressTracker
+
+
+#---------------------------------------------------------------------------------------------------
+# BATCH BUILDS
+#---------------------------------------------------------------------------------------------------
+
+def get_batch_results(masters, output_dir):
+    """
+    Returns the result directory of each master notebook in a batch, ``{{ output_dir }}/{{ stem }}``
+    where ``stem`` is the master's filename without its extension.
+
+    Args:
+        masters (``list`` of ``str``): paths to the master notebooks
+        output_dir (``str``): the directory to write results to
+
+    Returns:
+        ``list`` of ``pathlib.Path``: the result directory of each master
+
+    Raises:
+        ``ValueError``: if two master notebooks have the same filename stem
+    """
+    results, seen = [], {}
+    for master in masters:
+        stem = pathlib.Path(master).stem
+        if stem in seen:
+            raise ValueError(f"Master notebooks {seen[stem]} and {master} would both be written to {stem}")
+        seen[stem] = master
+        results.append(pathlib.Path(output_dir) / stem)
+    return results
+
+def build_batch(args, callbacks=()):
+    """
+    Builds exams from each master notebook in ``args.masters`` into
+    ``{{ args.output_dir }}/{{ stem }}`` with ``jexam.parser.build``. Up to ``args.concurrency``
+    builds run at once in threads of this process, each with its own ``jexam.parser.Exam`` and
+    ``args.jobs`` worker processes, which are spawned rather than forked from the threads (see 
+    ``jexam.utils.get_mp_context``). Every build uses the same options as ``jexam``, e.g. 
+    ``args.format``, ``args.seed``, ``args.incremental``, and ``args.export``; the progress events of 
+    each build include the key ``build`` set to the path of its master notebook.
+
+    Args:
+        args (``argparse.Namespace``): parsed command-line arguments for ``jexam batch``
+        callbacks (iterable of callable, optional): functions called with the progress events of
+            every build
+
+    Returns:
+        ``list`` of ``pathlib.Path``: the result directory of each master
+
+    Raises:
+        ``ValueError``: if two master notebooks have the same filename stem
+        ``AssertionError``: if ``args.concurrency`` is less than 1
+    """
+    assert args.concurrency >= 1, f"Concurrency {args.concurrency} invalid"
+    results = get_batch_results(args.masters, args.output_dir)
+    print_lock = threading.Lock()
+
+    def build_one(master, result):
+        build_args = argparse.Namespace(
+            master=master,
+            result=str(result),
+            format=args.format,
+            seed=args.seed,
+            jobs=args.jobs,
+            incremental=args.incremental,
+            students=None,
+            link=args.link,
+            export=args.export,
+            export_autograder=args.export_autograder,
+            strip_outputs=args.strip_outputs,
+            extract_attachments=args.extract_attachments,
+            quiet=True,
+        )
+        build(build_args, progress=ProgressTracker(callbacks, name=master))
+        if not args.quiet:
+            with print_lock:
+                print(f"Built {master} into {result}")
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [executor.submit(build_one, m, r) for m, r in zip(args.masters, results)]
+        for future in futures:
+            future.result()
+
+    return results
+
+def batch(args):
+    """
+    Runs ``jexam batch`` with ``build_batch``. If ``args.progress`` is not ``None``, writes the progress
+    events of all builds to that path as JSON lines; if it is ``"-"``, they are written to stdout and
+    status messages to stderr.
+
+    Args:
+        args (``argparse.Namespace``): parsed command-line arguments for ``jexam batch``
+    """
+    with ExitStack() as stack:
+        callbacks = []
+        if args.progress is not None:
+            callbacks.append(stack.enter_context(closing(JSONLinesSink(args.progress))))
+        if args.progress == "-":
+            # keep stdout for progress events
+            stack.enter_context(redirect_stdout(sys.stderr))
+        build_batch(args, callbacks)
@@ -0,0 +1,156 @@
+#################################
+##### Build Cache for jExam #####
+#################################
+
+import os
+import json
+import shutil
+import hashlib
+import pathlib
+
+
+#---------------------------------------------------------------------------------------------------
+# GLOBAL VARIABLES
+#---------------------------------------------------------------------------------------------------
+
+# bump when the outputs for the same inputs change so that old caches are invalidated
+CACHE_VERSION = 1
+CACHE_DIR = ".jexam"
+CACHE_FILE = "cache.json"
+
+
+#---------------------------------------------------------------------------------------------------
+# BUILD CACHE
+#---------------------------------------------------------------------------------------------------
+
+def hash_inputs(*inputs):
+    """
+    Returns a SHA-256 hash of JSON-serializable build inputs.
+
+    Args:
+        *inputs: the inputs to hash
+
+    Returns:
+        ``str``: the hash of the inputs
+    """
+    source = json.dumps([CACHE_VERSION, inputs], sort_keys=True, default=str)
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+class BuildCache:
+    """
+    A content-addressed record of the outputs in a result directory. Each entry maps the name of an
+    output (e.g. an exam directory) to the hash of the inputs it was built from and the files that were
+    written for it, relative to the result directory. Entries whose key and files are unchanged can be
+    skipped on a rebuild.
+
+    Args:
+        result (``pathlib.Path``): the path to the result directory
+
+    Attributes:
+        result (``pathlib.Path``): the path to the result directory
+        path (``pathlib.Path``): the path to the cache file
+        entries (``dict``): the cache entries, keyed by output name
+        skipped (``dict``): the number of entries skipped, keyed by kind (e.g. ``"exams"``)
+        written (``dict``): the number of entries written, keyed by kind
+        removed (``dict``): the number of entries removed, keyed by kind
+    """
+    def __init__(self, result):
+        self.result = pathlib.Path(result)
+        self.path = self.result / CACHE_DIR / CACHE_FILE
+        self.entries = {}
+        self.skipped = {}
+        self.written = {}
+        self.removed = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                cache = json.load(f)
+            if cache.get("version") == CACHE_VERSION:
+                self.entries = cache["entries"]
+
+    def is_current(self, name, key, kind):
+        """
+        Returns whether the output ``name`` was built from inputs with hash ``key`` and all of its
+        files still exist. Counts the output as skipped under ``kind`` if so.
+
+        Args:
+            name (``str``): the name of the output
+            key (``str``): the hash of the output's inputs
+            kind (``str``): the kind of output, used for reporting
+
+        Returns:
+            ``bool``: whether the output is current
+        """
+        entry = self.entries.get(name)
+        current = entry is not None and entry["key"] == key and \
+            all((self.result / f).exists() for f in entry["files"])
+        if current:
+            self.skipped[kind] = self.skipped.get(kind, 0) + 1
+        return current
+
+    def record(self, name, key, files, kind):
+        """
+        Records that the output ``name`` was built from inputs with hash ``key`` by writing ``files``.
+        Removes files written for a previous build of this output that were not written again.
+
+        Args:
+            name (``str``): the name of the output
+            key (``str``): the hash of the output's inputs
+            files (``list`` of ``pathlib.Path``): the paths of the files written for the output, 
+                relative to the result directory
+            kind (``str``): the kind of output, used for reporting
+        """
+        files = [pathlib.PurePath(f).as_posix() for f in files]
+        for f in set(self.entries.get(name, {}).get("files", [])) - set(files):
+            if (self.result / f).exists():
+                os.remove(self.result / f)
+        self.entries[name] = {"key": key, "files": files}
+        self.written[kind] = self.written.get(kind, 0) + 1
+
+    def prune(self, names, kind, directories=False):
+        """
+        Removes the outputs ``names`` from the cache and deletes the files written for them. If 
+        ``directories`` is true, each name is also a directory in the result directory that belongs to
+        the output, which is deleted with everything in it.
+
+        Args:
+            names (``list`` of ``str``): the names of the outputs to remove
+            kind (``str``): the kind of output, used for reporting
+            directories (``bool``, optional): whether to delete the directories named ``names``
+        """
+        for name in names:
+            entry = self.entries.pop(name, None)
+            if entry is not None:
+                for f in entry["files"]:
+                    if (self.result / f).exists():
+                        os.remove(self.result / f)
+            if directories and (self.result / name).is_dir():
+                shutil.rmtree(self.result / name)
+            self.removed[kind] = self.removed.get(kind, 0) + 1
+
+    def save(self):
+        """
+        Writes the cache to ``path``.
+        """
+        os.makedirs(self.path.parent, exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump({"version": CACHE_VERSION, "entries": self.entries}, f, indent=1, sort_keys=True)
+
+    def summary(self):
+        """
+        Returns a summary of the outputs that were skipped and removed, or ``None`` if nothing was 
+        skipped or removed.
+
+        Returns:
+            ``str`` or ``None``: the summary
+        """
+        summaries = []
+        if self.skipped:
+            counts = []
+            for kind in sorted(set(self.skipped) | set(self.written)):
+                total = self.skipped.get(kind, 0) + self.written.get(kind, 0)
+                counts.append(f"{self.skipped.get(kind, 0)} of {total} {kind}")
+            summaries.append("Skipped " + ", ".join(counts) + " (unchanged)")
+        if self.removed:
+            counts = [f"{count} {kind}" for kind, count in sorted(self.removed.items())]
+            summaries.append("Removed " + ", ".join(counts) + " (no longer planned)")
+        return "\n".join(summaries) or None
@@ -0,0 +1,202 @@
+###############################
+##### Exporting for jExam #####
+###############################
+
+import io
+import pathlib
+import nbformat
+
+from . import profiler
+from .output import unshare
+from .parser import gen_exam_instance_fragments
+from .utils import get_mp_context
+
+
+#---------------------------------------------------------------------------------------------------
+# GLOBAL VARIABLES
+#---------------------------------------------------------------------------------------------------
+
+# the nbconvert exporter and file extension of each export format
+EXPORTERS = {
+    "html": ("html", ".html"),
+    "pdf": ("pdf", ".pdf"),
+}
+
+
+#---------------------------------------------------------------------------------------------------
+# EXPORTERS
+#---------------------------------------------------------------------------------------------------
+
+def get_exporter(export_format):
+    """
+    Creates an nbconvert exporter for ``export_format``. An exporter compiles its template the first
+    time it is used and keeps it, so one exporter should be reused for every notebook.
+
+    Args:
+        export_format (``str``): the export format; a key of ``EXPORTERS``
+
+    Returns:
+        ``nbconvert.exporters.Exporter``: the exporter
+
+    Raises:
+        ``AssertionError``: if ``export_format`` is invalid
+        ``ImportError``: if nbconvert is not installed
+    """
+    assert export_format in EXPORTERS, f"Export format {export_format} invalid"
+    try:
+        import nbconvert
+    except ImportError:
+        raise ImportError("You must have nbconvert installed to export notebooks.")
+    return nbconvert.get_exporter(EXPORTERS[export_format][0])()
+
+def export_notebook(exporter, nb, path):
+    """
+    Exports the notebook ``nb`` with ``exporter`` to ``path``.
+
+    Args:
+        exporter (``nbconvert.exporters.Exporter``): the exporter
+        nb (``nbformat.NotebookNode``): the notebook
+        path (``pathlib.Path``): the path of the exported file
+
+    Returns:
+        ``tuple`` of ``pathlib.Path`` and ``int``: the path of the exported file and its size in bytes
+    """
+    with profiler.phase("nbconvert export"):
+        body, _ = exporter.from_notebook_node(nb)
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    unshare(path)
+    with io.open(path, "wb") as f:
+        f.write(body)
+    return path, len(body)
+
+def read_exam_instance(exam, nb_name, assignment):
+    """
+    Returns the student notebook with the questions and versions in ``assignment`` as a notebook
+    node, built from the same encoded cells as the written notebook without reading it from disk.
+
+    Args:
+        exam (``jexam.parser.Exam``): the exam
+        nb_name (``str``): the filename of the notebook
+        assignment (``list`` of ``tuple``): the ``(question index, version index)`` pairs for the exam
+
+    Returns:
+        ``nbformat.NotebookNode``: the notebook
+    """
+    cells = gen_exam_instance_fragments(exam, nb_name, assignment)
+    return nbformat.v4.reads(exam.fragments.writer.writes(cells))
+
+
+#---------------------------------------------------------------------------------------------------
+# WORKER POOL
+#---------------------------------------------------------------------------------------------------
+
+# the exam, export format, exporter, and result directory of a worker process
+_worker_exam = None
+_worker_format = None
+_worker_exporter = None
+_worker_root = None
+
+def _init_worker(exam, export_format, root, profile_origin):
+    """
+    Sets the exam and result directory of a worker process and creates its exporter, which is reused
+    for every notebook the worker exports. Enables profiling if ``profile_origin`` is not ``None``.
+    """
+    global _worker_exam, _worker_format, _worker_exporter, _worker_root
+    _worker_exam = exam
+    _worker_format = export_format
+    _worker_exporter = get_exporter(export_format)
+    _worker_root = root
+    if profile_origin is not None:
+        profiler.set_profiler(profiler.Profiler(profile_origin))
+
+def _export_exam_instance(task):
+    """
+    Exports the exam of a task tuple in a worker process. Returns the path and size of the exported
+    file and, if profiling is enabled, the worker's profiler records.
+    """
+    path, nbytes = _profile_export(_worker_exam, _worker_format, _worker_exporter, _worker_root, task)
+    worker_profiler = profiler.get_profiler()
+    return path, nbytes, worker_profiler.drain() if worker_profiler is not None else None
+
+def _profile_export(exam, export_format, exporter, root, task):
+    """
+    Exports the exam of a task tuple as a profiled phase.
+    """
+    output_dir, nb_name, assignment = task
+    with profiler.phase("export exam", exam=output_dir.as_posix()):
+        nb = read_exam_instance(exam, nb_name, assignment)
+        result = export_notebook(exporter, nb, get_export_path(root / output_dir / nb_name, export_format))
+    profiler.count("exports")
+    return result
+
+def export_exam_instances(exam, root, export_format, tasks, jobs=1):
+    """
+    Exports the student notebooks of ``exam`` for each ``(output_dir, nb_name, assignment)`` tuple in
+    ``tasks`` to ``export_format`` next to the notebooks in the directory ``root``. The notebooks are
+    built in memory (see ``read_exam_instance``). If ``jobs`` is greater than 1, they are exported by a
+    pool of ``jobs`` worker processes, each of which creates its exporter once. Yields the index of
+    each exported notebook, the path of the exported file, and its size once it has been written.
+
+    Args:
+        exam (``jexam.parser.Exam``): the exam
+        root (``pathlib.Path``): the path to the result directory
+        export_format (``str``): the export format; a key of ``EXPORTERS``
+        tasks (``list`` of ``tuple``): the exams to export, as passed to
+            ``jexam.parser.create_and_write_exam_instance``
+        jobs (``int``, optional): the number of worker processes
+
+    Yields:
+        ``tuple`` of ``int``, ``pathlib.Path``, and ``int``: the index in ``tasks`` of each exported
+        notebook, the path of the exported file, and its size in bytes
+    """
+    root = pathlib.Path(root)
+    if jobs <= 1:
+        exporter = get_exporter(export_format)
+        for i, task in enumerate(tasks):
+            yield (i, *_profile_export(exam, export_format, exporter, root, task))
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    parent_profiler = profiler.get_profiler()
+    initargs = (exam, export_format, root, parent_profiler.origin if parent_profiler is not None else None)
+    chunksize = max(1, len(tasks) // (jobs * 4))
+    with ProcessPoolExecutor(
+        max_workers=jobs, mp_context=get_mp_context(), initializer=_init_worker, initargs=initargs
+    ) as executor:
+        results = executor.map(_export_exam_instance, tasks, chunksize=chunksize)
+        for i, (path, nbytes, records) in enumerate(results):
+            if records is not None:
+                parent_profiler.merge(records)
+            yield i, path, nbytes
+
+def export_autograder(root, nb_path, export_format):
+    """
+    Exports the autograder notebook at ``nb_path``, relative to the result directory ``root``, to
+    ``export_format`` next to the notebook.
+
+    Args:
+        root (``pathlib.Path``): the path to the result directory
+        nb_path (``pathlib.Path``): the path to the autograder notebook, relative to ``root``
+        export_format (``str``): the export format; a key of ``EXPORTERS``
+
+    Returns:
+        ``tuple`` of ``pathlib.Path`` and ``int``: the path of the exported file and its size in bytes
+    """
+    path = pathlib.Path(root) / nb_path
+    nb = nbformat.read(path, as_version=nbformat.NO_CONVERT)
+    return export_notebook(get_exporter(export_format), nb, get_export_path(path, export_format))
+
+def get_export_path(path, export_format):
+    """
+    Returns the path to which the notebook at ``path`` is exported in ``export_format``.
+
+    Args:
+        path (``pathlib.Path``): the path of the notebook
+        export_format (``str``): the export format; a key of ``EXPORTERS``
+
+    Returns:
+        ``pathlib.Path``: the path of the exported file
+    """
+    return pathlib.Path(path).with_suffix(EXPORTERS[export_format][1])
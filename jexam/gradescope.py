@@ -0,0 +1,267 @@
+####################################
+##### Gradescope Zip for jExam #####
+####################################
+
+import os
+import stat
+import pathlib
+import zipfile
+
+from . import profiler
+
+
+#---------------------------------------------------------------------------------------------------
+# GLOBAL VARIABLES
+#---------------------------------------------------------------------------------------------------
+
+ZIP_NAME = "autograder.zip"
+REQUIREMENTS_FILE = "requirements.txt"
+
+# the release of otter-grader whose Gradescope templates are rendered; the template variables and the
+# names in otter.generate.autograder differ between releases, so this must match requirements.txt
+OTTER_VERSION = "1.1.6"
+
+# a fixed timestamp for the files in the zip so that identical builds produce identical zips
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+# files in the zip that Gradescope runs and their permissions
+EXECUTABLE_FILES = {"run_autograder", "setup.sh"}
+EXECUTABLE_MODE = 0o755
+FILE_MODE = 0o644
+
+
+#---------------------------------------------------------------------------------------------------
+# ZIP CONTENTS
+#---------------------------------------------------------------------------------------------------
+
+def iter_test_files(exam):
+    """
+    Yields the autograder test files of every version of every autograded question in ``exam``, with
+    hidden tests included. These are the same tests written to ``autograder/tests`` by
+    ``jexam.parser.create_and_write_autograder_exam``.
+
+    Args:
+        exam (``jexam.parser.Exam``): the exam
+
+    Yields:
+        ``tuple`` of ``str``: the path of each test file in the zip and its contents
+    """
+    for question in exam.questions:
+        if question.manual:
+            continue
+        for version in question.versions:
+            yield f"tests/{version.get_hash()}.py", version.get_test_source(question.points, True)
+
+def iter_support_files(paths, root):
+    """
+    Yields the support files in ``paths``, which are relative to ``root``, to be included in the
+    ``files`` directory of the zip. Directories are included recursively.
+
+    Args:
+        paths (``list`` of ``str``): the paths of the files and directories
+        root (``pathlib.Path``): the directory that ``paths`` are relative to
+
+    Yields:
+        ``tuple`` of ``str`` and ``pathlib.Path``: the path of each file in the zip and on disk
+
+    Raises:
+        ``AssertionError``: if a path is not in a subdirectory of ``root`` or does not exist
+    """
+    root = pathlib.Path(root).resolve()
+    for path in paths:
+        full_path = (root / path).resolve()
+        assert full_path == root or root in full_path.parents, f"{path} is not in a subdirectory of {root}"
+        assert full_path.exists(), f"Support file {path} not found"
+        if full_path.is_dir():
+            for dirpath, dirnames, filenames in os.walk(full_path):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    file_path = pathlib.Path(dirpath, filename)
+                    yield f"files/{file_path.relative_to(root).as_posix()}", file_path
+        else:
+            yield f"files/{full_path.relative_to(root).as_posix()}", full_path
+
+def read_requirements(config, root):
+    """
+    Returns the contents of the requirements file for the autograder, which is ``config["requirements"]``
+    if given and ``requirements.txt`` if it exists otherwise. Paths are relative to ``root``.
+
+    Args:
+        config (``dict``): the ``generate`` configurations of the exam
+        root (``pathlib.Path``): the directory that paths are relative to
+
+    Returns:
+        ``str``: the requirements, or an empty string if there are none
+
+    Raises:
+        ``AssertionError``: if the configured requirements file does not exist
+    """
+    path = config.get("requirements", None)
+    if path is None:
+        path = REQUIREMENTS_FILE
+        if not (pathlib.Path(root) / path).is_file():
+            return ""
+    path = pathlib.Path(root) / path
+    assert path.is_file(), f"Requirements file {path} not found"
+    with open(path) as f:
+        return f.read()
+
+def render_otter_files(config, requirements, token=None):
+    """
+    Renders Otter's Gradescope templates (``run_autograder``, ``run_otter.py``, ``setup.sh``,
+    ``environment.yml``, and the requirements files) with the configurations in ``config``, in the
+    same way as ``otter generate autograder`` in otter-grader ``OTTER_VERSION``.
+
+    Args:
+        config (``dict``): the ``generate`` configurations of the exam
+        requirements (``str``): additional requirements for the autograder
+        token (``str``, optional): a Gradescope token for uploading PDFs
+
+    Returns:
+        ``dict``: the contents of each file, keyed by its path in the zip
+
+    Raises:
+        ``ImportError``: if Otter is not installed or is not version ``OTTER_VERSION``
+    """
+    try:
+        from jinja2 import Template
+        from otter.version import __version__ as otter_version
+        from otter.generate.autograder import MINICONDA_INSTALL_URL, OTTER_ENV_NAME, TEMPLATE_FILE_PATHS
+    except ImportError:
+        raise ImportError("You must have otter-grader installed to generate a Gradescope zip file.")
+    if otter_version != OTTER_VERSION:
+        raise ImportError(
+            f"Generating a Gradescope zip file requires otter-grader {OTTER_VERSION}, not {otter_version}"
+        )
+
+    templates = {}
+    for name, path in TEMPLATE_FILE_PATHS.items():
+        with open(path) as f:
+            templates[name] = Template(f.read())
+
+    points, threshold = config.get("points", None), config.get("threshold", None)
+    pdfs = config.get("pdfs", {})
+    autograder_dir = config.get("autograder_dir", "/autograder")
+    overwrite_requirements = bool(requirements) and config.get("overwrite_requirements", False)
+
+    # these are the variables that otter generate autograder passes to each template in OTTER_VERSION
+    return {
+        "run_autograder": templates["run_autograder"].render(autograder_dir=autograder_dir),
+        "run_otter.py": templates["run_otter.py"].render(
+            threshold = str(float(threshold) if threshold is not None else None),
+            points = str(float(points) if points is not None else None),
+            show_stdout = str(config.get("show_stdout", False)),
+            show_hidden = str(config.get("show_hidden", False)),
+            seed = str(config.get("seed", None)),
+            token = str(token or ""),
+            course_id = str(pdfs.get("course_id", None)),
+            assignment_id = str(pdfs.get("assignment_id", None)),
+            filtering = str(pdfs.get("filtering", True)),
+            pagebreaks = str(pdfs.get("pagebreaks", True)),
+            grade_from_log = str(config.get("grade_from_log", False)),
+            serialized_variables = str(config.get("variables", {})),
+            public_multiplier = str(float(config.get("public_multiplier", 0))),
+            lang = "python",
+            autograder_dir = autograder_dir,
+        ),
+        "setup.sh": templates["setup.sh"].render(
+            autograder_dir = autograder_dir,
+            miniconda_install_url = MINICONDA_INSTALL_URL,
+            ottr_branch = "stable",
+            otter_env_name = OTTER_ENV_NAME,
+        ),
+        "environment.yml": templates["environment.yml"].render(otter_env_name=OTTER_ENV_NAME),
+        "requirements.txt": templates["requirements.txt"].render(
+            other_requirements = requirements,
+            overwrite_requirements = overwrite_requirements,
+        ),
+        "requirements.r": templates["requirements.r"].render(
+            other_requirements = "",
+            overwrite_requirements = overwrite_requirements,
+        ),
+    }
+
+
+#---------------------------------------------------------------------------------------------------
+# ZIP WRITER
+#---------------------------------------------------------------------------------------------------
+
+def write_zip(path, contents, files=()):
+    """
+    Writes a zip file at ``path`` in one pass from the in-memory ``contents`` and the files on disk
+    in ``files``. Entries have a fixed timestamp, so the same inputs always produce the same zip.
+
+    Args:
+        path (``str`` or ``pathlib.Path``): the path to the zip file
+        contents (iterable of ``tuple`` of ``str``): the path of each file in the zip and its contents
+        files (iterable of ``tuple`` of ``str`` and ``pathlib.Path``, optional): the path of each
+            file in the zip and on disk
+
+    Returns:
+        ``int``: the size of the zip file in bytes
+    """
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in contents:
+            info = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            mode = EXECUTABLE_MODE if name in EXECUTABLE_FILES else FILE_MODE
+            info.external_attr = (stat.S_IFREG | mode) << 16
+            zf.writestr(info, data)
+        for name, file_path in files:
+            info = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = (stat.S_IFREG | FILE_MODE) << 16
+            with open(file_path, "rb") as src, zf.open(info, "w") as dst:
+                while True:
+                    chunk = src.read(1 << 20)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+    return os.path.getsize(path)
+
+def generate(exam, config, path, root):
+    """
+    Generates a Gradescope autograder zip file for Otter at ``path`` from the tests of ``exam`` and
+    the ``generate`` configurations in ``config``. The tests are taken from the parsed exam rather
+    than from files on disk, and the zip is written directly, so this does not change the working
+    directory and is safe to call from threads. If ``config["pdfs"]`` is given, a Gradescope token is
+    requested with Otter's ``APIClient``.
+
+    Paths in ``config`` (``requirements`` and ``files``) are relative to ``root``, the directory
+    containing the master notebook.
+
+    Args:
+        exam (``jexam.parser.Exam``): the exam
+        config (``dict``): the ``generate`` configurations of the exam
+        path (``str`` or ``pathlib.Path``): the path to the zip file
+        root (``str`` or ``pathlib.Path``): the directory that paths in ``config`` are relative to
+
+    Returns:
+        ``int``: the size of the zip file in bytes
+
+    Raises:
+        ``AssertionError``: if the threshold, public test multiplier, or PDF configurations are 
+            invalid or a requirements or support file is missing
+        ``ImportError``: if Otter is not installed or is not version ``OTTER_VERSION``
+    """
+    threshold = config.get("threshold", None)
+    assert threshold is None or 0 <= float(threshold) <= 1, f"{threshold} is not a valid threshold"
+    public_multiplier = config.get("public_multiplier", 0)
+    assert 0 <= float(public_multiplier) <= 1, \
+        f"Public test multiplier {public_multiplier} is not between 0 and 1"
+    pdfs = config.get("pdfs", {})
+    assert not pdfs or (pdfs.get("course_id") and pdfs.get("assignment_id")), \
+        "Either course ID or assignment ID unspecified for PDF submissions"
+
+    token = None
+    if pdfs:
+        try:
+            from otter.generate.token import APIClient
+        except ImportError:
+            raise ImportError("You must have otter-grader installed to generate a Gradescope zip file.")
+        token = APIClient.get_token()
+
+    with profiler.phase("render templates"):
+        contents = render_otter_files(config, read_requirements(config, root), token=token)
+    files = list(iter_support_files(config.get("files", []), root))
+    return write_zip(path, [*contents.items(), *iter_test_files(exam)], files)
@@ -0,0 +1,242 @@
+#########################################
+##### Assignment Manifest for jExam #####
+#########################################
+
+import os
+import json
+import sqlite3
+import pathlib
+
+from .cache import CACHE_DIR
+from .output import get_archive_mode
+
+
+#---------------------------------------------------------------------------------------------------
+# GLOBAL VARIABLES
+#---------------------------------------------------------------------------------------------------
+
+MANIFEST_FILE = "manifest.sqlite"
+
+SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE versions (
+    question INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    points REAL,
+    manual INTEGER NOT NULL,
+    test_file TEXT,
+    PRIMARY KEY (question, version)
+);
+CREATE TABLE assignments (
+    student INTEGER NOT NULL,
+    exam TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    question INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    test_file TEXT,
+    PRIMARY KEY (student, slot)
+);
+CREATE INDEX assignments_by_version ON assignments (question, version, student);
+CREATE INDEX assignments_by_hash ON assignments (hash, student);
+CREATE INDEX assignments_by_exam ON assignments (exam, slot);
+"""
+
+# the columns of the rows returned by queries
+ASSIGNMENT_COLUMNS = ["student", "exam", "slot", "question", "version", "hash", "points", "manual", "test_file"]
+
+
+#---------------------------------------------------------------------------------------------------
+# WRITING
+#---------------------------------------------------------------------------------------------------
+
+def get_manifest_path(result):
+    """
+    Returns the path of the manifest for a result path: ``{{ result }}/.jexam/manifest.sqlite`` for a
+    directory, or a ``.manifest.sqlite`` file next to an archive.
+
+    Args:
+        result (``str`` or ``pathlib.Path``): the result path
+
+    Returns:
+        ``pathlib.Path``: the path to the manifest
+    """
+    result = pathlib.Path(result)
+    if get_archive_mode(result) is None:
+        return result / CACHE_DIR / MANIFEST_FILE
+    return result.with_name(result.name + "." + MANIFEST_FILE)
+
+def write_manifest(path, meta, questions, assignments):
+    """
+    Writes an indexed SQLite manifest of the questions and versions assigned to each student,
+    replacing any existing manifest at ``path``. Student ``i``'s exam is ``exam_{{ i }}``; question,
+    version, and slot numbers are zero-based indices.
+
+    Args:
+        path (``pathlib.Path``): the path to the manifest
+        meta (``dict``): information about the build, e.g. the seed, stored as JSON strings
+        questions (``list`` of ``jexam.parser.Question``): the questions of the exam
+        assignments (``list`` of ``list`` of ``tuple``): the ``(question index, version index)`` pairs
+            for each student's exam, in order
+    """
+    versions = {}
+    for i, question in enumerate(questions):
+        for j, version in enumerate(question.versions):
+            test_file = None if question.manual else version.get_hash() + ".py"
+            versions[(i, j)] = (version.get_hash(), question.points, int(question.manual), test_file)
+
+    os.makedirs(path.parent, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    if tmp_path.exists():
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(str(tmp_path))
+    try:
+        conn.executescript(SCHEMA)
+        with conn:
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", [(k, json.dumps(v)) for k, v in meta.items()])
+            conn.executemany("INSERT INTO versions VALUES (?, ?, ?, ?, ?, ?)", [
+                (q, v, h, points, manual, test_file) for (q, v), (h, points, manual, test_file) in versions.items()
+            ])
+            conn.executemany("INSERT INTO assignments VALUES (?, ?, ?, ?, ?, ?, ?)", (
+                (i, f"exam_{i}", slot, q, v, versions[(q, v)][0], versions[(q, v)][3])
+                for i, assignment in enumerate(assignments) for slot, (q, v) in enumerate(assignment)
+            ))
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, path)
+
+
+#---------------------------------------------------------------------------------------------------
+# READING
+#---------------------------------------------------------------------------------------------------
+
+class Manifest:
+    """
+    A read-only view of a manifest written by ``write_manifest``. Query methods return rows as
+    ``dict``s with the keys in ``ASSIGNMENT_COLUMNS``, ordered by student and slot.
+
+    Args:
+        path (``str`` or ``pathlib.Path``): the path to the manifest
+
+    Attributes:
+        meta (``dict``): information about the build that wrote the manifest
+
+    Raises:
+        ``FileNotFoundError``: if there is no manifest at ``path``
+    """
+    def __init__(self, path):
+        path = pathlib.Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"No manifest found at {path}")
+        self.conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+        self.meta = {k: json.loads(v) for k, v in self.conn.execute("SELECT key, value FROM meta")}
+
+    def _select(self, where, params):
+        rows = self.conn.execute(
+            "SELECT a.student, a.exam, a.slot, a.question, a.version, a.hash, v.points, v.manual, a.test_file "
+            "FROM assignments a JOIN versions v ON a.question = v.question AND a.version = v.version "
+            f"WHERE {where} ORDER BY a.student, a.slot",
+            params,
+        )
+        return [dict(zip(ASSIGNMENT_COLUMNS, row)) for row in rows]
+
+    def answer_key(self, student):
+        """
+        Returns the questions and versions on a student's exam, one row per slot.
+
+        Args:
+            student (``int`` or ``str``): the student's index or exam name (e.g. ``"exam_17"``)
+
+        Returns:
+            ``list`` of ``dict``: the rows
+        """
+        if isinstance(student, str):
+            return self._select("a.exam = ?", (student,))
+        return self._select("a.student = ?", (student,))
+
+    def students_with(self, question, version=None):
+        """
+        Returns the students who received a question, or a single version of it.
+
+        Args:
+            question (``int``): the question index
+            version (``int``, optional): the version index
+
+        Returns:
+            ``list`` of ``dict``: the rows
+        """
+        if version is None:
+            return self._select("a.question = ?", (question,))
+        return self._select("a.question = ? AND a.version = ?", (question, version))
+
+    def students_with_hash(self, hash):
+        """
+        Returns the students who received the version with a hash (which is also its test name).
+
+        Args:
+            hash (``str``): the version hash
+
+        Returns:
+            ``list`` of ``dict``: the rows
+        """
+        return self._select("a.hash = ?", (hash,))
+
+    def close(self):
+        """
+        Closes the connection to the manifest.
+        """
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+#---------------------------------------------------------------------------------------------------
+# QUERY COMMAND
+#---------------------------------------------------------------------------------------------------
+
+def query(args):
+    """
+    Runs ``jexam query``. Looks up the rows in the manifest of ``args.result`` for ``args.student``,
+    ``args.question`` (and optionally ``args.version``), or ``args.hash`` and prints them as a
+    tab-separated table, or as JSON if ``args.json`` is true.
+
+    Args:
+        args (``argparse.Namespace``): parsed command-line arguments
+
+    Returns:
+        ``list`` of ``dict``: the rows
+
+    Raises:
+        ``AssertionError``: if not exactly one kind of lookup is requested
+    """
+    lookups = [args.student is not None, args.question is not None, args.hash is not None]
+    assert sum(lookups) == 1, "Specify exactly one of --student, --question, or --hash"
+    assert args.version is None or args.question is not None, "--version requires --question"
+
+    with Manifest(get_manifest_path(args.result)) as manifest:
+        if args.student is not None:
+            student = int(args.student) if args.student.isdigit() else args.student
+            rows = manifest.answer_key(student)
+        elif args.question is not None:
+            rows = manifest.students_with(args.question, args.version)
+        else:
+            rows = manifest.students_with_hash(args.hash)
+
+    if args.json:
+        print(json.dumps(rows, indent=1))
+    else:
+        print("\t".join(ASSIGNMENT_COLUMNS))
+        for row in rows:
+            print("\t".join("" if row[c] is None else str(row[c]) for c in ASSIGNMENT_COLUMNS))
+
+    return rows
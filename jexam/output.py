@@ -0,0 +1,453 @@
+####################################
+##### Output Targets for jExam #####
+####################################
+
+import io
+import os
+import gzip
+import time
+import shutil
+import hashlib
+import tarfile
+import zipfile
+import pathlib
+import tempfile
+
+from contextlib import contextmanager
+
+from .cache import CACHE_DIR
+
+
+#---------------------------------------------------------------------------------------------------
+# GLOBAL VARIABLES
+#---------------------------------------------------------------------------------------------------
+
+# tarfile modes for each supported tar suffix; longest suffixes first
+TAR_MODES = {
+    ".tar.gz": "w:gz",
+    ".tar.bz2": "w:bz2",
+    ".tar.xz": "w:xz",
+    ".tgz": "w:gz",
+    ".tar": "w",
+}
+
+# the timestamp of archive members if SOURCE_DATE_EPOCH is not set, 1980-01-01 00:00:00 UTC, which 
+# is the earliest time a zip file can store
+DEFAULT_SOURCE_DATE_EPOCH = 315532800
+
+# the content-addressed store of a linked directory output, relative to its root
+STORE_DIR = pathlib.PurePath(CACHE_DIR, "objects")
+
+
+#---------------------------------------------------------------------------------------------------
+# OUTPUT TARGETS
+#---------------------------------------------------------------------------------------------------
+
+class Output:
+    """
+    A target for the files generated by jExam. Files are addressed by paths relative to the root of the
+    output and are written as text encoded with UTF-8, or as bytes with ``write_bytes``. Subclasses 
+    implement ``open`` and ``write_bytes``.
+
+    Attributes:
+        parallel_safe (``bool``): whether separate processes can write to this output at once
+        bytes_written (``int``): the number of bytes written to files in this output
+    """
+    parallel_safe = False
+    bytes_written = 0
+
+    @contextmanager
+    def open(self, path):
+        """
+        Opens a file in this output for writing. Must be used as a context manager, and only one file
+        may be open at a time.
+
+        Args:
+            path (``str`` or ``pathlib.PurePath``): the path of the file relative to the output root
+
+        Yields:
+            file-like object: a text stream for the file's contents
+        """
+        raise NotImplementedError("open must be implemented in a subclass")
+
+    def write(self, path, contents):
+        """
+        Writes a file in this output.
+
+        Args:
+            path (``str`` or ``pathlib.PurePath``): the path of the file relative to the output root
+            contents (``str``): the contents of the file
+        """
+        with self.open(path) as f:
+            f.write(contents)
+
+    def write_bytes(self, path, contents):
+        """
+        Writes a binary file in this output.
+
+        Args:
+            path (``str`` or ``pathlib.PurePath``): the path of the file relative to the output root
+            contents (``bytes``): the contents of the file
+        """
+        raise NotImplementedError("write_bytes must be implemented in a subclass")
+
+    def mkdir(self, path):
+        """
+        Creates a (possibly empty) directory in this output.
+
+        Args:
+            path (``str`` or ``pathlib.PurePath``): the path of the directory relative to the output root
+        """
+        raise NotImplementedError("mkdir must be implemented in a subclass")
+
+    def close(self):
+        """
+        Finishes writing this output.
+        """
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class DirectoryOutput(Output):
+    """
+    Writes files into a directory, creating subdirectories as needed.
+
+    Args:
+        root (``pathlib.Path``): the path to the directory
+
+    Attributes:
+        root (``pathlib.Path``): the path to the directory
+    """
+    parallel_safe = True
+
+    def __init__(self, root):
+        self.root = pathlib.Path(root)
+        self._dirs = set()
+
+    @contextmanager
+    def open(self, path):
+        full_path = self.root / path
+        if full_path.parent not in self._dirs:
+            os.makedirs(full_path.parent, exist_ok=True)
+            self._dirs.add(full_path.parent)
+        unshare(full_path)
+        with io.open(full_path, "w", encoding="utf-8") as f:
+            yield f
+            self.bytes_written += f.tell()
+
+    def write_bytes(self, path, contents):
+        full_path = self.root / path
+        os.makedirs(full_path.parent, exist_ok=True)
+        unshare(full_path)
+        with io.open(full_path, "wb") as f:
+            f.write(contents)
+        self.bytes_written += len(contents)
+
+    def mkdir(self, path):
+        os.makedirs(self.root / path, exist_ok=True)
+
+    def __getstate__(self):
+        return {**self.__dict__, "_dirs": set()}
+
+class LinkedDirectoryOutput(DirectoryOutput):
+    """
+    Writes files into a directory by writing each distinct file once into a content-addressed store
+    at ``{{ root }}/.jexam/objects`` and hard-linking it into place, so that the files shared by
+    many exams (tests, configuration files) take the space and time of one file. Falls back to 
+    copying if the file system does not support hard links. Objects are written atomically, so
+    worker processes can write to the store at once; objects that are no longer linked anywhere are
+    removed when the output is closed.
+
+    Args:
+        root (``pathlib.Path``): the path to the directory
+
+    Attributes:
+        root (``pathlib.Path``): the path to the directory
+        store (``pathlib.Path``): the path to the content-addressed store
+        bytes_stored (``int``): the number of bytes written to new objects in the store
+    """
+    bytes_stored = 0
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.store = self.root / STORE_DIR
+        self._objects = set()
+
+    @contextmanager
+    def open(self, path):
+        buffer = io.StringIO()
+        yield buffer
+        self.write_bytes(path, buffer.getvalue().encode("utf-8"))
+
+    def write_bytes(self, path, contents):
+        full_path = self.root / path
+        if full_path.parent not in self._dirs:
+            os.makedirs(full_path.parent, exist_ok=True)
+            self._dirs.add(full_path.parent)
+        unshare(full_path, force=True)
+        link_or_copy(self.store_object(contents), full_path)
+        self.bytes_written += len(contents)
+
+    def store_object(self, data):
+        """
+        Writes ``data`` into the store if it is not there already.
+
+        Args:
+            data (``bytes``): the contents of the object
+
+        Returns:
+            ``pathlib.Path``: the path to the object
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        obj = self.store / digest[:2] / digest
+        if digest not in self._objects and not obj.exists():
+            os.makedirs(obj.parent, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=obj.parent)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.chmod(tmp, 0o644)
+            # link rather than rename so that an object written by another process at the same time
+            # is kept, and files linked to it stay linked to the store
+            try:
+                os.link(tmp, obj)
+                self.bytes_stored += len(data)
+            except FileExistsError:
+                pass
+            finally:
+                os.remove(tmp)
+        self._objects.add(digest)
+        return obj
+
+    def close(self):
+        if not self.store.is_dir():
+            return
+        for prefix in os.scandir(self.store):
+            for obj in os.scandir(prefix.path):
+                if obj.stat().st_nlink <= 1:
+                    os.remove(obj.path)
+
+    def __getstate__(self):
+        return {**super().__getstate__(), "_objects": set()}
+
+def get_source_date_epoch():
+    """
+    Returns the timestamp to give archive members so that building the same exam twice produces the
+    same archive: the value of the ``SOURCE_DATE_EPOCH`` environment variable if it is set, otherwise
+    ``DEFAULT_SOURCE_DATE_EPOCH``. Timestamps before ``DEFAULT_SOURCE_DATE_EPOCH`` are raised to it
+    because zip files cannot store them.
+
+    Returns:
+        ``int``: the timestamp in seconds since the epoch
+    """
+    epoch = int(os.environ.get("SOURCE_DATE_EPOCH", DEFAULT_SOURCE_DATE_EPOCH))
+    return max(epoch, DEFAULT_SOURCE_DATE_EPOCH)
+
+class ZipOutput(Output):
+    """
+    Streams files into a zip archive. Members are timestamped with ``get_source_date_epoch`` so that
+    identical builds produce identical archives.
+
+    Args:
+        path (``pathlib.Path``): the path to the zip file
+    """
+    def __init__(self, path):
+        self.zip_file = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+        self.date_time = time.gmtime(get_source_date_epoch())[:6]
+
+    @contextmanager
+    def open(self, path):
+        info = self.get_info(path)
+        with io.TextIOWrapper(self.zip_file.open(info, "w"), encoding="utf-8") as f:
+            yield f
+        self.bytes_written += info.file_size
+
+    def write_bytes(self, path, contents):
+        self.zip_file.writestr(self.get_info(path), contents)
+        self.bytes_written += len(contents)
+
+    def get_info(self, path):
+        """
+        Returns the zip entry of a file in this output.
+
+        Args:
+            path (``str`` or ``pathlib.PurePath``): the path of the file relative to the output root
+
+        Returns:
+            ``zipfile.ZipInfo``: the zip entry
+        """
+        info = zipfile.ZipInfo(pathlib.PurePath(path).as_posix(), self.date_time)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        return info
+
+    def mkdir(self, path):
+        info = zipfile.ZipInfo(pathlib.PurePath(path).as_posix() + "/", self.date_time)
+        info.external_attr = 0o40755 << 16 | 0x10
+        self.zip_file.writestr(info, b"")
+
+    def close(self):
+        self.zip_file.close()
+
+class TarOutput(Output):
+    """
+    Streams files into a (possibly compressed) tar archive. Tar members need their size up front, so
+    each file is buffered in memory until it is closed. Members (and the gzip header of a ``.tar.gz``)
+    are timestamped with ``get_source_date_epoch`` so that identical builds produce identical archives.
+
+    Args:
+        path (``pathlib.Path``): the path to the tar file
+        mode (``str``): the ``tarfile`` write mode, e.g. ``"w:gz"``
+    """
+    def __init__(self, path, mode):
+        self.mtime = get_source_date_epoch()
+        self.gzip_file = None
+        if mode == "w:gz":
+            # tarfile stamps the gzip header with the current time
+            self.gzip_file = gzip.GzipFile(path, "wb", mtime=self.mtime)
+            self.tar_file = tarfile.open(fileobj=self.gzip_file, mode="w")
+        else:
+            self.tar_file = tarfile.open(path, mode)
+
+    @contextmanager
+    def open(self, path):
+        buffer = io.StringIO()
+        yield buffer
+        self.write_bytes(path, buffer.getvalue().encode("utf-8"))
+
+    def write_bytes(self, path, contents):
+        info = tarfile.TarInfo(pathlib.PurePath(path).as_posix())
+        info.size = len(contents)
+        info.mtime = self.mtime
+        self.tar_file.addfile(info, io.BytesIO(contents))
+        self.bytes_written += len(contents)
+
+    def mkdir(self, path):
+        info = tarfile.TarInfo(pathlib.PurePath(path).as_posix())
+        info.type = tarfile.DIRTYPE
+        info.mode = 0o755
+        info.mtime = self.mtime
+        self.tar_file.addfile(info)
+
+    def close(self):
+        self.tar_file.close()
+        if self.gzip_file is not None:
+            self.gzip_file.close()
+
+class MemoryOutput(Output):
+    """
+    Collects files in memory, e.g. to send them from a worker process to an archive output.
+
+    Attributes:
+        files (``list`` of ``tuple``): the ``(path, contents)`` of each file, in the order written; 
+            ``contents`` is ``bytes`` for binary files and ``None`` for directories
+    """
+    def __init__(self):
+        self.files = []
+
+    @contextmanager
+    def open(self, path):
+        buffer = io.StringIO()
+        yield buffer
+        contents = buffer.getvalue()
+        self.files.append((pathlib.PurePath(path).as_posix(), contents))
+        self.bytes_written += len(contents.encode("utf-8"))
+
+    def write_bytes(self, path, contents):
+        self.files.append((pathlib.PurePath(path).as_posix(), contents))
+        self.bytes_written += len(contents)
+
+    def mkdir(self, path):
+        self.files.append((pathlib.PurePath(path).as_posix(), None))
+
+    def replay(self, output):
+        """
+        Writes the files collected by this output to another output, in order.
+
+        Args:
+            output (``Output``): the output to write to
+        """
+        for path, contents in self.files:
+            if contents is None:
+                output.mkdir(path)
+            elif isinstance(contents, bytes):
+                output.write_bytes(path, contents)
+            else:
+                output.write(path, contents)
+
+def unshare(path, force=False):
+    """
+    Removes the file at ``path`` if it is hard-linked elsewhere (e.g. by a ``LinkedDirectoryOutput``),
+    so that writing to ``path`` does not change the other links. If ``force`` is true, removes the file
+    whether or not it is linked.
+
+    Args:
+        path (``pathlib.Path``): the path of the file
+        force (``bool``, optional): whether to remove the file even if it is not linked elsewhere
+    """
+    try:
+        if force or os.stat(path).st_nlink > 1:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def link_or_copy(source, destination):
+    """
+    Hard-links ``destination`` to ``source``, or copies ``source`` to ``destination`` if the file
+    system does not support hard links between them.
+
+    Args:
+        source (``pathlib.Path``): the path of the existing file
+        destination (``pathlib.Path``): the path of the new file
+    """
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+def get_archive_mode(path):
+    """
+    Returns the archive type for an output path based on its suffix.
+
+    Args:
+        path (``str`` or ``pathlib.Path``): the output path
+
+    Returns:
+        ``str`` or ``None``: ``"zip"`` for zip files, a ``tarfile`` write mode for tar files, or
+        ``None`` if the path is not an archive
+    """
+    name = pathlib.Path(path).name.lower()
+    if name.endswith(".zip"):
+        return "zip"
+    for suffix, mode in TAR_MODES.items():
+        if name.endswith(suffix):
+            return mode
+    return None
+
+def open_output(path, link=False):
+    """
+    Opens the output target for a result path: a zip or tar archive if the path has an archive suffix
+    (``.zip``, ``.tar``, ``.tar.gz``, ``.tgz``, ``.tar.bz2``, or ``.tar.xz``), otherwise a directory.
+
+    Args:
+        path (``str`` or ``pathlib.Path``): the result path
+        link (``bool``, optional): whether to hard-link identical files in a directory to a shared
+            store (see ``LinkedDirectoryOutput``)
+
+    Returns:
+        ``Output``: the output target
+
+    Raises:
+        ``AssertionError``: if ``link`` is true and the path is an archive
+    """
+    mode = get_archive_mode(path)
+    assert not (link and mode is not None), "Linked output requires a directory result"
+    if mode is None:
+        return LinkedDirectoryOutput(path) if link else DirectoryOutput(path)
+    os.makedirs(pathlib.Path(path).parent, exist_ok=True)
+    if mode == "zip":
+        return ZipOutput(path)
+    return TarOutput(path, mode)
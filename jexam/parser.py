@@ -4,6 +4,7 @@
 
 import re
 import os
+import sys
 import yaml
 import copy
 import json
@@ -11,12 +12,19 @@ import pprint
 import hashlib
 import pathlib
 import nbformat
-import numpy as np
 
 from textwrap import dedent
+from contextlib import ExitStack, closing, redirect_stdout
 from collections import namedtuple
 
-from .utils import str_to_doctest, generate
+from . import profiler
+from .cache import BuildCache, hash_inputs
+from .manifest import get_manifest_path, write_manifest
+from .output import MemoryOutput, get_archive_mode, open_output
+from .progress import JSONLinesSink, ProgressTracker
+from .reader import read_notebook
+from .utils import get_mp_context, iter_doctest
+from .writer import NotebookWriter, encode_cell, encode_cells
 
 
 #---------------------------------------------------------------------------------------------------
@@ -27,26 +35,26 @@ NB_VERSION = 4
 COMMENT_PREFIX = "#"
 TEST_HEADERS = ["TEST", "HIDDEN TEST"]
 ALLOWED_NAME = re.compile(r'[A-Za-z][A-Za-z0-9_]*')
-TEST_REGEX = r"(##\s*(hidden\s*)?test\s*##|#\s*(hidden\s*)?test)"
-MD_SOLUTION_REGEX = r"(<strong>|\*{2})solution:?(<\/strong>|\*{2})"
+TEST_REGEX = re.compile(r"(##\s*(hidden\s*)?test\s*##|#\s*(hidden\s*)?test)", flags=re.IGNORECASE)
+HIDDEN_TEST_REGEX = re.compile(r"hidden", flags=re.IGNORECASE)
+MD_SOLUTION_REGEX = re.compile(r"(<strong>|\*{2})solution:?(<\/strong>|\*{2})", flags=re.IGNORECASE)
 MARKDOWN_ANSWER_CELL_TEMPLATE = nbformat.v4.new_markdown_cell(
     "_Type your answer here, replacing this text._"
 )
 
-BEGIN_REGEXES = {
-    "exam": r"\s*BEGIN EXAM\s*",
-    "introduction": r"\s*BEGIN INTRODUCTION\s*",
-    "question": r"\s*BEGIN QUESTION\s*",
-    "version": r"\s*BEGIN VERSION\s*",
-    "conclusion": r"\s*BEGIN CONCLUSION\s*",
-}
+DELIM_REGEX = re.compile(r"\s*(BEGIN|END) (EXAM|INTRODUCTION|QUESTION|VERSION|CONCLUSION)", flags=re.IGNORECASE)
+BEGIN_DELIMS = {"exam", "introduction", "question", "version", "conclusion"}
+END_DELIMS = {"introduction", "question", "version", "conclusion"}
 
-END_REGEXES = {
-    "introduction": r"\s*END INTRODUCTION\s*",
-    "question": r"\s*END QUESTION\s*",
-    "version": r"\s*END VERSION\s*",
-    "conclusion": r"\s*END CONCLUSION\s*",
-}
+# delimiters whose cells contain YAML configurations
+CONFIG_DELIMS = {"exam", "question"}
+
+# cell kinds assigned by classify_cell
+BEGIN_CELL = "begin"
+END_CELL = "end"
+TEST_CELL = "test"
+MARKDOWN_SOLUTION_CELL = "markdown solution"
+PLAIN_CELL = "plain"
 
 
 #---------------------------------------------------------------------------------------------------
@@ -55,46 +63,133 @@ END_REGEXES = {
 
 class Version:
     """
-    Represents a single version of a question. Contains methods to parse its cells for solution removal
-    and generating tests.
+    Represents a single version of a question. Its cells are classified and hashed when the version is
+    created and parsed once by ``prepare`` to remove test cells and solutions, read its tests, and 
+    encode its student cells; ``parse_notebook`` prepares every version (see ``prepare_versions``) 
+    before returning. Everything that depends only on the version (its hash, tests, parsed cells, and
+    rendered test files and fragments) is computed at most once.
 
     Args:
         cells (``list`` of ``nbformat.NotebookNode``): the list of original (unparsed) cells that define
             this version
+        classified (``list`` of ``ClassifiedCell``, optional): ``cells`` as returned by 
+            ``classify_cell``, if they have already been classified
 
     Attributes:
         original_cells (``list`` of ``nbformat.NotebookNode``): the original cells from the notebook 
             (incl. test cells and solutions)
+        classified (``list`` of ``ClassifiedCell``): the classified cells, until the version is prepared
         cells_with_solutions (``list`` of ``nbformat.NotebookNode``): the original cells with test 
             cells removed and solutions left
         cells_without_solutions (``list`` of ``nbformat.NotebookNode``): the original cells with 
             solutions and test cells removed
         tests (``list`` of ``Test``): the tests for this version as named tuples
+        public_tests (``list`` of ``Test``): the tests for this version that are not hidden
+        hash (``str``): the SHA-256 hash of this version's source, used as its test name
+        content_hash (``str``): the SHA-256 hash of this version's full contents, computed on first use
+        test_sources (``dict``): rendered test files for this version, keyed by ``(points, hidden)``
+        fragments (``list`` of ``str``): the encoded cells of this version for student notebooks
+        test_cell_fragment (``str``): the encoded test cell of this version for student notebooks
     """
-    def __init__(self, cells):
+    __slots__ = (
+        "original_cells", "classified", "cells_with_solutions", "cells_without_solutions", "tests", 
+        "public_tests", "hash", "content_hash", "test_sources", "fragments", "test_cell_fragment",
+    )
+
+    def __init__(self, cells, classified=None):
+        if classified is None:
+            classified = [classify_cell(cell) for cell in cells]
+
         self.original_cells = cells
+        self.classified = classified
         self.cells_with_solutions = None
         self.cells_without_solutions = None
-        self.tests = []
+        self.tests = None
+        self.public_tests = None
+
+        source = "".join("\n".join(c.source) for c in classified)
+        self.hash = hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+        self.content_hash = None
+        self.test_sources = {}
+        self.fragments = None
+        self.test_cell_fragment = None
 
-    def _parse_cells(self):
+    def is_prepared(self):
         """
-        Parses the original cells of this version to remove test cells and solutions. Populates 
-        ``cells_with_solutions`` and ``cells_without_solutions``.
+        Returns whether this version has been prepared.
+
+        Returns:
+            ``bool``: whether this version has been prepared
         """
-        self.cells_with_solutions = []
-        self.cells_without_solutions = []
-        for cell in self.original_cells:
-            if is_test_cell(cell):
-                self.tests.append(read_test(cell))
-            else:
-                self.cells_with_solutions.append(cell)
-                self.cells_without_solutions.append(replace_cell_solutions(cell))
+        return self.fragments is not None
+
+    def prepare(self):
+        """
+        Parses the cells of this version, if it has not been prepared: removes test cells and 
+        solutions, reads the tests, and encodes the student cells.
+
+        Raises:
+            ``AssertionError``: if a cell has malformed solution markers
+        """
+        if self.is_prepared():
+            return
+
+        cells_with_solutions, cells_without_solutions, tests = [], [], []
+        with profiler.phase("strip solutions"):
+            for c in self.classified:
+                if c.kind == TEST_CELL:
+                    tests.append(read_test(c.cell, source=c.source))
+                else:
+                    cells_with_solutions.append(c.cell)
+                    cells_without_solutions.append(replace_cell_solutions(c.cell, classified=c))
+
+        self.cells_with_solutions = cells_with_solutions
+        self.cells_without_solutions = cells_without_solutions
+        self.tests = tests
+        self.public_tests = [t for t in tests if not t.hidden]
+        self.fragments = encode_student_cells(cells_without_solutions)
+        self.classified = None
+
+    def dump_prepared(self):
+        """
+        Returns the results of ``prepare`` in a form that can be sent between processes and loaded 
+        into another ``Version`` of the same cells with ``load_prepared``. Cells shared with 
+        ``original_cells`` are sent as their indices so that they stay shared once loaded.
+
+        Returns:
+            ``tuple``: the prepared state of this version
+        """
+        index = {id(cell): i for i, cell in enumerate(self.original_cells)}
+        without_solutions = [
+            None if cell is MARKDOWN_ANSWER_CELL_TEMPLATE else index.get(id(cell), cell) 
+            for cell in self.cells_without_solutions
+        ]
+        with_solutions = [index[id(cell)] for cell in self.cells_with_solutions]
+        return with_solutions, without_solutions, self.tests, self.fragments, self.test_sources
+
+    def load_prepared(self, state):
+        """
+        Loads the prepared state returned by ``dump_prepared`` for a version of the same cells.
+
+        Args:
+            state (``tuple``): the prepared state
+        """
+        with_solutions, without_solutions, tests, fragments, test_sources = state
+        self.cells_with_solutions = [self.original_cells[i] for i in with_solutions]
+        self.cells_without_solutions = [
+            MARKDOWN_ANSWER_CELL_TEMPLATE if c is None else self.original_cells[c] if isinstance(c, int) else c
+            for c in without_solutions
+        ]
+        self.tests = tests
+        self.public_tests = [t for t in tests if not t.hidden]
+        self.fragments = fragments
+        self.test_sources.update(test_sources)
+        self.classified = None
 
     def get_cells(self, include_solutions):
         """
-        Returns the list of parsed cells for this version. If parsing hasn't been done yet, it parses
-        this version.
+        Returns the list of parsed cells for this version.
 
         Args:
             include_solutions (``bool``): whether to return the cells that contain solutions
@@ -102,8 +197,6 @@ class Version:
         Returns:
             ``list`` of ``nbformat.NotebookNode``: the list of parsed cells
         """
-        if self.cells_with_solutions is None or self.cells_without_solutions is None:
-            self._parse_cells()
         if include_solutions:
             return self.cells_with_solutions
         return self.cells_without_solutions
@@ -115,7 +208,50 @@ class Version:
         Returns:
             ``bool``: whether this version has any public tests
         """
-        return any([not t.hidden for t in self.tests])
+        return len(self.public_tests) > 0
+
+    def get_test_source(self, points, include_hidden):
+        """
+        Returns the contents of the OK-formatted test file for this version. Each file is only rendered
+        the first time it is requested.
+
+        Args:
+            points (``int``): the value of the test
+            include_hidden (``bool``): whether to include hidden test cases
+
+        Returns:
+            ``str``: the contents of the test file
+        """
+        key = (points, include_hidden)
+        if key not in self.test_sources:
+            tests = self.tests if include_hidden else self.public_tests
+            self.test_sources[key] = format_test(gen_test(self.hash, points, tests))
+        return self.test_sources[key]
+
+    def get_fragments(self):
+        """
+        Returns the encoded cells without solutions or outputs of this version for student notebooks,
+        as encoded by ``prepare``.
+
+        Returns:
+            ``list`` of ``str``: the encoded cells
+        """
+        return self.fragments
+
+    def get_test_cell_fragment(self, exam):
+        """
+        Returns the encoded test cell of this version for student notebooks, encoding it the first time
+        it is requested.
+
+        Args:
+            exam (``Exam``): the exam that this version belongs to
+
+        Returns:
+            ``str``: the encoded test cell
+        """
+        if self.test_cell_fragment is None:
+            self.test_cell_fragment = encode_cell(gen_check_cell(exam, self.hash))
+        return self.test_cell_fragment
     
     def get_hash(self):
         """
@@ -124,10 +260,20 @@ class Version:
         Returns:
             ``str``: the hash of this version
         """
-        source = ""
-        for cell in self.original_cells:
-            source += "\n".join(get_source(cell))
-        return hashlib.sha256(source.encode("utf-8")).hexdigest()
+        return self.hash
+
+    def get_content_hash(self):
+        """
+        Returns a SHA-256 hash of the full contents of this version's cells, including outputs and 
+        metadata, which ``get_hash`` ignores.
+
+        Returns:
+            ``str``: the hash of this version's contents
+        """
+        if self.content_hash is None:
+            source = json.dumps(self.original_cells, sort_keys=True)
+            self.content_hash = hashlib.sha256(source.encode("utf-8")).hexdigest()
+        return self.content_hash
 
 class Question:
     """
@@ -137,15 +283,17 @@ class Question:
         versions (``list`` of ``Version``): the versions of this question
         points (``int``): the number of points this question is worth
         manual (``bool``): whether this question is manually graded
+        config (``dict``, optional): the question's configurations from the master notebook
 
     Attributes:
         versions (``list`` of ``Version``): the versions of this question
         points (``int``): the number of points this question is worth
         manual (``bool``): whether this question is manually graded
-        unused_versions (``list`` of ``int``): a list of indices in ``versions`` that haven't been 
-            used yet; repopulated when this list becomes empty
+        config (``dict``): the question's configurations from the master notebook
     """
-    def __init__(self, versions, points, manual):
+    __slots__ = ("versions", "points", "manual", "config")
+
+    def __init__(self, versions, points, manual, config=None):
         if not isinstance(versions, list):
             self.versions = [versions]
         else:
@@ -153,27 +301,23 @@ class Question:
         
         self.points = points
         self.manual = manual
-        self.unused_versions = list(range(len(self.versions)))
-
-    def choose_version(self):
-        """
-        Randomly selects a version of this question from ``unused_versions`` and returns it. Removes 
-        its index from ``unused_versions`` Repopulates``unused_versions`` if empty.
-
-        Returns:
-            ``Version``: the chosen version
-        """
-        if  len(self.unused_versions) == 0:
-            self.unused_versions = list(range(len(self.versions)))
-        idx = np.random.choice(self.unused_versions)
-        self.unused_versions.remove(idx)
-        version = self.versions[idx]
-        return version
+        self.config = config or {}
 
 class Exam:
     """
-    Contains configurations and lists of cells/objects that define an Exam. This class is not designed
-    to be instantiated but to have its class attributes edited directly.
+    Contains configurations and lists of cells/objects that define an Exam, as returned by 
+    ``parse_notebook``. Exams hold no global state, so several can be built at once in one process;
+    each is passed explicitly to the functions that create notebooks from it.
+
+    Args:
+        config (``dict``, optional): configurations for the exam
+        questions (``list`` of ``Question``, optional): the questions that make up this exam
+        introduction (``list`` of ``nbformat.NotebookNode``, optional): a list of preamble cells for 
+            the notebook
+        conclusion (``list`` of ``nbformat.NotebookNode``, optional): a list of postamble cells for 
+            the notebook
+        autograder_format (``str``, optional): a string defining the autograder output format; either
+            "otter" for Otter-Grader or "ok" for OkPy
 
     Attributes:
         config (``dict``): configurations for the exam
@@ -182,193 +326,321 @@ class Exam:
         conclusion (``list`` of ``nbformat.NotebookNode``): a list of postamble cells for the notebook
         autograder_format (``str``): a string defining the autograder output format; either "otter"
             for Otter-Grader or "ok" for OkPy
+        fragments (``ExamFragments``): the encoded cells shared by student notebooks, or ``None`` if
+            they have not been encoded yet
+        assets (``dict``): the contents of the files that the notebooks link to in the ``assets`` 
+            directory of the output, keyed by filename (see ``jexam.assets``)
     """
-    config = {}
-    questions = []
-    introduction = []
-    conclusion = []
-    autograder_format = "otter"
-
-    @classmethod
-    def otter(cls):
+    def __init__(self, config=None, questions=None, introduction=None, conclusion=None, 
+            autograder_format="otter"):
+        self.config = config or {}
+        self.questions = questions or []
+        self.introduction = introduction or []
+        self.conclusion = conclusion or []
+        self.autograder_format = autograder_format
+        self.fragments = None
+        self.assets = {}
+
+    def otter(self):
         """
         Returns whether the autograder format for this exam is Otter-Grader
         
         Returns:
             ``bool``: whether the autograder format for this exam is Otter-Grader 
         """
-        return cls.autograder_format == "otter"
+        return self.autograder_format == "otter"
     
-    @classmethod
-    def ok(cls):
+    def ok(self):
         """
         Returns whether the autograder format for this exam is OkPy
         
         Returns:
             ``bool``: whether the autograder format for this exam is OkPy 
         """
-        return cls.autograder_format == "ok"
+        return self.autograder_format == "ok"
 
-def create_and_write_exam_instance(output_dir, nb_name, num_questions):
+class ExamFragments:
     """
-    Creates a single exam notebook using nbformat with solutions removes and writes that notebook at
-    ``{{ output_dir }}/{{ nb_name }}``. Randomly selects ``num_questions`` questions from ``Exam.questions``
-    and includes test cells if ``Exam.config.get("public_tests", False)`` is ``True``. 
+    Encodes the cells shared by all student notebooks of an exam once, so that student notebooks can
+    be written by concatenating fragments instead of building and validating a notebook for each 
+    student. Also encodes the student cells of each version.
 
     Args:
-        output_dir (``pathlib.Path``): the path to the output directory
+        exam (``Exam``): the exam
         nb_name (``str``): the filename of the notebook
-        num_questions (``int``): the number of questions for the exam
+        num_questions (``int``): the number of questions for each exam
+
+    Attributes:
+        writer (``jexam.writer.NotebookWriter``): the writer for student notebooks
+        init (``list`` of ``str``): the encoded init cell, if any
+        introduction (``list`` of ``str``): the encoded introduction cells
+        question_headers (``list`` of ``str``): the encoded header cell for each question number
+        conclusion (``list`` of ``str``): the encoded conclusion cells
+        check_all (``list`` of ``str``): the encoded check-all cells, if any
+        export (``list`` of ``str``): the encoded export cells, if any
     """
-    test_dir = output_dir / 'tests'
+    def __init__(self, exam, nb_name, num_questions):
+        self.writer = NotebookWriter()
+        public_tests = exam.config.get("public_tests", False)
+
+        self.init = []
+        if exam.config.get("init_cell", True):
+            ok_path = pathlib.Path(nb_name).with_suffix(".ok").name if exam.ok() else None
+            self.init = encode_cells([gen_init_cell(exam, ok_path)])
+
+        self.introduction = encode_student_cells(exam.introduction)
+        self.question_headers = encode_cells([gen_question_header_cell(i + 1) for i in range(num_questions)])
+        self.conclusion = encode_student_cells(exam.conclusion)
+
+        self.check_all = []
+        if exam.config.get("check_all_cell", True) and public_tests:
+            self.check_all = encode_cells(gen_check_all_cell(exam))
+
+        self.export = []
+        if exam.config.get("export_cell", True):
+            export_cell = exam.config.get("export_cell", True)
+            if export_cell is True:
+                export_cell = {}
+
+            self.export = encode_cells(gen_export_cells(
+                exam,
+                export_cell.get('instructions', ''), 
+                pdf = export_cell.get('pdf', True),
+                filtering = export_cell.get('filtering', True)
+            ))
+
+        for question in exam.questions:
+            for version in question.versions:
+                version.get_fragments()
+                if not question.manual and public_tests:
+                    version.get_test_cell_fragment(exam)
+
+def encode_student_cells(cells):
+    """
+    Encodes ``cells`` with their outputs removed for student notebooks. ``cells`` are not modified.
+
+    Args:
+        cells (``list`` of ``nbformat.NotebookNode``): the cells to encode
 
-    if Exam.config.get("public_tests", False):
-        os.makedirs(test_dir, exist_ok=True)
+    Returns:
+        ``list`` of ``str``: the encoded cells
+    """
+    student = remove_output(nbformat.v4.new_notebook(cells=cells))
+    return encode_cells(student.cells)
+
+def plan_exam_instances(exam, seed, num_students, num_questions, students=None):
+    """
+    Chooses ``num_questions`` questions from ``exam.questions`` and a version of each for every student
+    using ``jexam.planner.plan_assignments``. If any question has a ``difficulty`` in its config, the
+    questions in each slot are balanced by difficulty; questions without one have difficulty 0.
+
+    Args:
+        exam (``Exam``): the exam
+        seed (``int``): the exam seed
+        num_students (``int``): the number of students
+        num_questions (``int``): the number of questions for each exam
+        students (iterable of ``int``, optional): the indices of the students to plan; defaults to
+            all students
+
+    Returns:
+        ``list`` of ``list`` of ``tuple``: the ``(question index, version index)`` pairs for each 
+        student's exam, in order
+    """
+    # numpy is only needed to plan exams, so it is imported here to keep other code paths fast
+    from .planner import plan_assignments
+
+    difficulties = [q.config.get("difficulty") for q in exam.questions]
+    if all(d is None for d in difficulties):
+        difficulties = None
     else:
-        os.makedirs(output_dir, exist_ok=True)
+        difficulties = [d or 0 for d in difficulties]
+
+    questions, versions = plan_assignments(
+        seed, 
+        num_students, 
+        num_questions, 
+        [len(q.versions) for q in exam.questions], 
+        difficulties=difficulties, 
+        students=None if students is None else list(students),
+    )
+    return [list(zip(qs, vs)) for qs, vs in zip(questions.tolist(), versions.tolist())]
+
+def gen_exam_instance_fragments(exam, nb_name, assignment):
+    """
+    Returns the encoded cells of the student notebook with the questions and versions given by 
+    ``assignment`` (as returned by ``plan_exam_instances``), including test cells if 
+    ``exam.config.get("public_tests", False)`` is ``True``. The cells are taken from 
+    ``exam.fragments``, which are created if they have not been already.
 
-    student = nbformat.v4.new_notebook()
+    Args:
+        exam (``Exam``): the exam
+        nb_name (``str``): the filename of the notebook
+        assignment (``list`` of ``tuple``): the ``(question index, version index)`` pairs for the exam
 
-    # create autograder config file for this dir
-    if Exam.otter():
-        gen_otter_file(output_dir / nb_name)
-        ok_path = None
-    elif Exam.ok():
-        ok_path = gen_dot_ok(output_dir / nb_name, Exam.config["endpoint"])
-    
-    # init cell
-    if Exam.config.get("init_cell", True):
-        student.cells.append(gen_init_cell(ok_path))
-    
-    # introduction
-    student.cells.extend(Exam.introduction)
+    Returns:
+        ``list`` of ``str``: the encoded cells of the notebook
+    """
+    public_tests = exam.config.get("public_tests", False)
+    if exam.fragments is None:
+        exam.fragments = ExamFragments(exam, nb_name, len(assignment))
+    fragments = exam.fragments
 
-    # get question indices
-    question_idx = list(range(len(Exam.questions)))
-    np.random.shuffle(question_idx)
-    question_idx = question_idx[:num_questions]
+    # init cell and introduction
+    cells = fragments.init + fragments.introduction
 
     # questions
-    for i in range(num_questions):
-        student.cells.append(gen_question_header_cell(i + 1))
-
-        question = Exam.questions[question_idx[i]]
-        version = question.choose_version()
-        student.cells.extend(version.get_cells(False))
-
-        if not question.manual and Exam.config.get("public_tests", False):
-            student.cells.append(gen_test_cell(
-                version.get_hash(),
-                question.points,
-                version.tests,
-                test_dir
-            ))
-    
-    # remove hidden tests
-    if Exam.config.get("public_tests", False):
-        remove_hidden_tests(test_dir)
+    for i, (question_idx, version_idx) in enumerate(assignment):
+        cells.append(fragments.question_headers[i])
+
+        question = exam.questions[question_idx]
+        version = question.versions[version_idx]
+        cells.extend(version.get_fragments())
+
+        if not question.manual and public_tests:
+            cells.append(version.get_test_cell_fragment(exam))
     
-    # conclusion
-    student.cells.extend(Exam.conclusion)
+    # conclusion, check all cell, and export cell
+    cells.extend(fragments.conclusion)
+    cells.extend(fragments.check_all)
+    cells.extend(fragments.export)
+    return cells
 
-    # check all cell
-    if Exam.config.get("check_all_cell", True) and Exam.config.get("public_tests", False):
-        student.cells.extend(gen_check_all_cell())
+def create_and_write_exam_instance(exam, output, output_dir, nb_name, assignment):
+    """
+    Creates a single exam notebook with solutions removed and writes that notebook to ``output`` at
+    ``{{ output_dir }}/{{ nb_name }}``. Uses the questions and versions given by ``assignment`` (as
+    returned by ``plan_exam_instances``) and includes test cells if 
+    ``exam.config.get("public_tests", False)`` is ``True``. The notebook is written from the encoded
+    cells returned by ``gen_exam_instance_fragments``.
 
-    # export cell
-    if Exam.config.get("export_cell", True):
-        export_cell = Exam.config.get("export_cell", True)
-        if export_cell is True:
-            export_cell = {}
+    Args:
+        exam (``Exam``): the exam
+        output (``jexam.output.Output``): the output to write to
+        output_dir (``pathlib.Path``): the path to the exam directory, relative to the output root
+        nb_name (``str``): the filename of the notebook
+        assignment (``list`` of ``tuple``): the ``(question index, version index)`` pairs for the exam
 
-        student.cells.extend(gen_export_cells(
-            export_cell.get('instructions', ''), 
-            pdf = export_cell.get('pdf', True),
-            filtering = export_cell.get('filtering', True)
-        ))
+    Returns:
+        ``list`` of ``pathlib.Path``: the paths of the files written, relative to the output root
+    """
+    test_dir = output_dir / 'tests'
+    public_tests = exam.config.get("public_tests", False)
+    files = [output_dir / nb_name]
+
+    cells = gen_exam_instance_fragments(exam, nb_name, assignment)
 
-    # remove output
-    remove_output(student)
+    # create autograder config file for this dir
+    if exam.otter():
+        gen_otter_file(exam, output, output_dir / nb_name)
+        files.append((output_dir / nb_name).with_suffix('.otter'))
+    elif exam.ok():
+        gen_dot_ok(output, output_dir / nb_name, exam.config["endpoint"])
+        files.append((output_dir / nb_name).with_suffix('.ok'))
+
+    # public test files
+    if public_tests:
+        output.mkdir(test_dir)
+        for question_idx, version_idx in assignment:
+            question = exam.questions[question_idx]
+            if not question.manual:
+                version = question.versions[version_idx]
+                test_path = test_dir / (version.hash + '.py')
+                write_test(output, test_path, version.get_test_source(question.points, False))
+                files.append(test_path)
     
     # write notebooks
-    nbformat.write(student, output_dir / nb_name)
+    with output.open(output_dir / nb_name) as f:
+        exam.fragments.writer.write(cells, f)
 
-def create_and_write_autograder_exam(output_dir, nb_name):
+    return files
+
+def create_and_write_autograder_exam(exam, output, output_dir, nb_name, cache=None):
     """
-    Formats and writes a solutions notebook containing all questions and all versions to the path
-    ``{{ output_dir }}/{{ nb_name }}``. Also creates test cells and autograder tests files included
-    in the ``tests`` subdirectory of ``output_dir``.
+    Formats and writes a solutions notebook containing all questions and all versions to ``output`` 
+    at ``{{ output_dir }}/{{ nb_name }}``. Also creates test cells and autograder tests files included
+    in the ``tests`` subdirectory of ``output_dir``. If ``cache`` is provided, test files whose 
+    contents are unchanged are not rewritten.
 
     Args:
-        output_dir (``pathlib.Path``): the path to the output directory
+        exam (``Exam``): the exam
+        output (``jexam.output.Output``): the output to write to
+        output_dir (``pathlib.Path``): the path to the autograder directory, relative to the output root
         nb_name (``str``): the filename of the notebook
+        cache (``jexam.cache.BuildCache``, optional): the build cache for the result directory
+
+    Returns:
+        ``list`` of ``pathlib.Path``: the paths of the files written or kept, relative to the output root
     """
     test_dir = output_dir / 'tests'
-    os.makedirs(test_dir, exist_ok=True)
+    output.mkdir(test_dir)
 
     autograder = nbformat.v4.new_notebook()
+    files = [output_dir / nb_name]
 
     # create autograder config file for this dir
-    if Exam.otter():
-        gen_otter_file(output_dir / nb_name)
+    if exam.otter():
+        gen_otter_file(exam, output, output_dir / nb_name)
+        files.append((output_dir / nb_name).with_suffix('.otter'))
         ok_path = None
-    elif Exam.ok():
-        ok_path = gen_dot_ok(output_dir / nb_name, Exam.config["endpoint"])
+    elif exam.ok():
+        ok_path = gen_dot_ok(output, output_dir / nb_name, exam.config["endpoint"])
+        files.append((output_dir / nb_name).with_suffix('.ok'))
 
     # init cell
-    if Exam.config.get("init_cell", True):
-        autograder.cells.append(gen_init_cell(ok_path))
+    if exam.config.get("init_cell", True):
+        autograder.cells.append(gen_init_cell(exam, ok_path))
     
     # introduction
-    autograder.cells.extend(Exam.introduction)
-
-    # # get question indices
-    # question_idx = list(range(len(Exam.questions)))
-    # np.random.shuffle(question_idx)
-    # question_idx = question_idx[:num_questions]
+    autograder.cells.extend(exam.introduction)
 
     # questions
-    for i, question in enumerate(Exam.questions):
+    for i, question in enumerate(exam.questions):
         autograder.cells.append(gen_question_header_cell(i + 1))
 
-        # question = Exam.questions[question_idx[i]]
-
         for j, version in enumerate(question.versions):
             autograder.cells.append(gen_version_header_cell(j + 1))
             autograder.cells.extend(version.get_cells(True))
 
             if not question.manual:
-                autograder.cells.append(gen_test_cell(
-                    version.get_hash(),
-                    question.points,
-                    version.tests,
-                    test_dir
-                ))
+                name, source = version.get_hash(), version.get_test_source(question.points, True)
+                test_path = test_dir / (name + '.py')
+                files.append(test_path)
+
+                test_key = hash_inputs(source)
+                if cache is not None and cache.is_current(test_path.as_posix(), test_key, "autograder tests"):
+                    autograder.cells.append(gen_check_cell(exam, name))
+                    continue
+
+                autograder.cells.append(gen_test_cell(exam, name, source, output, test_dir))
+                if cache is not None:
+                    cache.record(test_path.as_posix(), test_key, [test_path], "autograder tests")
     
     # conclusion
-    autograder.cells.extend(Exam.conclusion)
+    autograder.cells.extend(exam.conclusion)
 
     # check all cell
-    if Exam.config.get("check_all_cell", True):
-        autograder.cells.extend(gen_check_all_cell())
+    if exam.config.get("check_all_cell", True):
+        autograder.cells.extend(gen_check_all_cell(exam))
 
     # export cell
-    if Exam.config.get("export_cell", True):
-        export_cell = Exam.config.get("export_cell", True)
+    if exam.config.get("export_cell", True):
+        export_cell = exam.config.get("export_cell", True)
         if export_cell is True:
             export_cell = {}
 
         autograder.cells.extend(gen_export_cells(
+            exam,
             export_cell.get('instructions', ''), 
             pdf = export_cell.get('pdf', True),
             filtering = export_cell.get('filtering', True)
         ))
 
-    # # remove output
-    # remove_output(autograder)
-    
     # write notebooks
-    nbformat.write(autograder, output_dir / nb_name)
+    with output.open(output_dir / nb_name) as f:
+        with profiler.phase("nbformat write"):
+            nbformat.write(autograder, f)
+
+    return files
 
 
 #---------------------------------------------------------------------------------------------------
@@ -391,15 +663,46 @@ def get_source(cell):
         return [l.strip() for l in source]
     assert False, f'unknown source type: {type(source)}'
 
+def get_exam_student(name):
+    """Returns the index of the student whose exam is written to the directory ``name``
+    
+    Args:
+        name (``str`` or ``pathlib.Path``): a directory name relative to the result, e.g. ``exam_17``
+
+    Returns:
+        ``int`` or ``None``: the index of the student, or ``None`` if ``name`` is not an exam directory
+    """
+    match = re.fullmatch(r"exam_(\d+)", pathlib.PurePath(name).as_posix())
+    return int(match.group(1)) if match else None
+
 def remove_output(nb):
-    """Removes all outputs from a notebook
+    """Returns a copy of a notebook with all outputs removed. ``nb`` and its cells are not modified;
+    only the cells that have outputs are copied, and the others are shared with ``nb``.
     
     Args:
         nb (``nbformat.NotebookNode``): a notebook
+
+    Returns:
+        ``nbformat.NotebookNode``: the notebook without outputs
     """
-    for cell in nb['cells']:
-        if 'outputs' in cell:
-            cell['outputs'] = []
+    stripped = copy.copy(nb)
+    stripped['cells'] = [strip_cell_outputs(cell) for cell in nb['cells']]
+    return stripped
+
+def strip_cell_outputs(cell):
+    """Returns ``cell`` with its outputs removed, copying the cell only if it has outputs.
+
+    Args:
+        cell (``nbformat.NotebookNode``): a cell
+
+    Returns:
+        ``nbformat.NotebookNode``: the cell without outputs
+    """
+    if not cell.get('outputs'):
+        return cell
+    stripped = copy.copy(cell)
+    stripped['outputs'] = []
+    return stripped
 
 def lock(cell):
     """Makes a cell non-editable and non-deletable
@@ -451,23 +754,42 @@ def is_code_cell(cell):
 
 def is_delim_cell(cell, delim, begin):
     """
-    Returns whether a cell is a delimiter cell. Uses a regex in ``BEGIN_REGEXES`` or ``END_REGEXES`` 
-    (based on the value of ``begin``). ``delim`` should be a key of one of these dictionaries.
+    Returns whether a cell is a ``BEGIN`` or ``END`` (based on the value of ``begin``) delimiter cell
+    for ``delim``.
 
     Args:
         cell (``nbformat.NotebookNode``): the cell in question
-        delim (``str``): the delimiter type; a key of one of the regex dicts
-        begin (``bool``): whether to look in ``BEGIN_REGEXES`` (rather than ``END REGEXES``)
+        delim (``str``): the delimiter type; an element of ``BEGIN_DELIMS`` or ``END_DELIMS``
+        begin (``bool``): whether to look for a ``BEGIN`` cell (rather than an ``END`` cell)
 
     Returns:
         ``bool``: whether the cell is a delimiter cell
     """
     if not is_raw_cell(cell):
         return False
-    source = get_source(cell)
-    if begin:
-        return bool(re.match(BEGIN_REGEXES[delim], source[0], flags=re.IGNORECASE))
-    return bool(re.match(END_REGEXES[delim], source[0], flags=re.IGNORECASE))
+    kind, cell_delim = match_delim(get_source(cell))
+    return kind == (BEGIN_CELL if begin else END_CELL) and cell_delim == delim
+
+def match_delim(source):
+    """
+    Matches the first line of a raw cell's source against ``DELIM_REGEX``.
+
+    Args:
+        source (``list`` of ``str``): the lines of the cell source
+
+    Returns:
+        ``tuple``: the kind (``BEGIN_CELL`` or ``END_CELL``) and type of the delimiter, or 
+        ``(None, None)`` if the cell is not a delimiter cell
+    """
+    match = DELIM_REGEX.match(source[0]) if source else None
+    if match is None:
+        return None, None
+    begin, delim = match.group(1).lower() == "begin", match.group(2).lower()
+    if begin and delim in BEGIN_DELIMS:
+        return BEGIN_CELL, delim
+    elif not begin and delim in END_DELIMS:
+        return END_CELL, delim
+    return None, None
 
 def get_delim_config(cell, delim):
     """
@@ -476,34 +798,89 @@ def get_delim_config(cell, delim):
 
     Args:
         cell (``nbformat.NotebookNode``): the cell in question
-        delim (``str``): the delimiter type; a key of ``BEGIN_REGEXES``
+        delim (``str``): the delimiter type; an element of ``BEGIN_DELIMS``
     
     Returns:
         iterable: the YAML-parsed config
     """
     assert is_raw_cell(cell), "cannot get delim config from non-raw cell"
-    source = get_source(cell)[1:]
-    config = yaml.full_load("\n".join(source))
+    return load_delim_config(get_source(cell))
+
+def load_delim_config(source):
+    """
+    Returns the delimiter config given by running ``source`` through a YAML parser after removing the 
+    first line (the ``BEGIN __________`` line)
+
+    Args:
+        source (``list`` of ``str``): the lines of the delimiter cell source
+    
+    Returns:
+        iterable: the YAML-parsed config
+    """
+    with profiler.phase("parse config"):
+        config = yaml.full_load("\n".join(source[1:]))
     if config is None:
         return {}
     return config
 
 
+#---------------------------------------------------------------------------------------------------
+# CELL CLASSIFICATION
+#---------------------------------------------------------------------------------------------------
+
+ClassifiedCell = namedtuple('ClassifiedCell', ['cell', 'kind', 'delim', 'source', 'config'])
+
+def classify_cell(cell):
+    """
+    Classifies a cell in a single pass over its source. Each cell is one of a ``BEGIN`` or ``END``
+    delimiter cell, a test cell, a Markdown solution cell, or a plain cell. The YAML configs of 
+    ``BEGIN EXAM`` and ``BEGIN QUESTION`` cells are parsed.
+
+    Args:
+        cell (``nbformat.NotebookNode``): the cell to classify
+
+    Returns:
+        ``ClassifiedCell``: the cell, its kind (one of ``BEGIN_CELL``, ``END_CELL``, ``TEST_CELL``, 
+        ``MARKDOWN_SOLUTION_CELL``, or ``PLAIN_CELL``), its delimiter type (or ``None``), the lines of
+        its source, and its config (or ``None``)
+    """
+    source = get_source(cell)
+    cell_type = cell["cell_type"]
+
+    if cell_type == "raw":
+        kind, delim = match_delim(source)
+        if kind is not None:
+            config = load_delim_config(source) if kind == BEGIN_CELL and delim in CONFIG_DELIMS else None
+            return ClassifiedCell(cell, kind, delim, source, config)
+
+    elif cell_type == "code":
+        if source and TEST_REGEX.match(source[0]):
+            return ClassifiedCell(cell, TEST_CELL, None, source, None)
+
+    elif cell_type == "markdown":
+        if any(MD_SOLUTION_REGEX.match(l) for l in source):
+            return ClassifiedCell(cell, MARKDOWN_SOLUTION_CELL, None, source, None)
+
+    return ClassifiedCell(cell, PLAIN_CELL, None, source, None)
+
+
 #---------------------------------------------------------------------------------------------------
 # AUTOGRADER CONFIG GENERATORS
 #---------------------------------------------------------------------------------------------------
 
-def gen_otter_file(notebook_path):
+def gen_otter_file(exam, output, notebook_path):
     """
-    Uses ``Exam.config`` to generate a .otter file to configure student use of Otter tools, 
+    Uses ``exam.config`` to generate a .otter file to configure student use of Otter tools, 
     including saving environments and submission to an Otter Service deployment
 
     Args:
-        notebook_path (``pathlib.Path``): path to notebook
+        exam (``Exam``): the exam
+        output (``jexam.output.Output``): the output to write to
+        notebook_path (``pathlib.Path``): path to notebook, relative to the output root
     """
     config = {}
 
-    service = Exam.config.get('service', {})
+    service = exam.config.get('service', {})
     if service:
         config.update({
             "endpoint": service["endpoint"],
@@ -513,22 +890,23 @@ def gen_otter_file(notebook_path):
         })
 
     config["notebook"] = service.get('notebook', notebook_path.name)
-    config["save_environment"] = Exam.config.get("save_environment", False)
-    config["ignore_modules"] = Exam.config.get("ignore_modules", [])
+    config["save_environment"] = exam.config.get("save_environment", False)
+    config["ignore_modules"] = exam.config.get("ignore_modules", [])
 
-    if Exam.config.get("variables", None):
-        config["variables"] = Exam.config.get("variables")
+    if exam.config.get("variables", None):
+        config["variables"] = exam.config.get("variables")
 
     config_path = notebook_path.with_suffix('.otter')
-    with open(config_path, "w+") as f:
+    with output.open(config_path) as f:
         json.dump(config, f, indent=4)
 
-def gen_dot_ok(notebook_path, endpoint):
+def gen_dot_ok(output, notebook_path, endpoint):
     """
     Generates .ok file and return its name
     
     Args:
-        notebook_path (``pathlib.Path``): the path to the notebook
+        output (``jexam.output.Output``): the output to write to
+        notebook_path (``pathlib.Path``): the path to the notebook, relative to the output root
         endpoint (``str``): an endpoint specification for https://okpy.org
     
     Returns:
@@ -538,7 +916,7 @@ def gen_dot_ok(notebook_path, endpoint):
     ok_path = notebook_path.with_suffix('.ok')
     name = notebook_path.stem
     src = [notebook_path.name]
-    with open(ok_path, 'w') as out:
+    with output.open(ok_path) as out:
         json.dump({
             "name": name,
             "endpoint": endpoint,
@@ -559,30 +937,34 @@ def gen_dot_ok(notebook_path, endpoint):
 # MISCELLANEOUS CELL GENERATORS
 #---------------------------------------------------------------------------------------------------
 
-def gen_init_cell(dot_ok_name):
+def gen_init_cell(exam, dot_ok_name):
     """
-    Generates a cell to initialize Otter or OkPy in the notebook. Uses ``Exam.otter()`` and ``Exam.ok()``
+    Generates a cell to initialize Otter or OkPy in the notebook. Uses ``exam.otter()`` and ``exam.ok()``
     to determine which type of init cell should be generated.
 
     Args:
+        exam (``Exam``): the exam
         dot_ok_name (``str`` or ``None``): the name of the .ok file if it exists otherwise ``None``
     
     Returns:
         cell (``nbformat.NotebookNode``): new code cell
     """
-    if Exam.otter():
+    if exam.otter():
         cell = nbformat.v4.new_code_cell("# Initialize Otter\nimport otter\ngrader = otter.Notebook()")
-    elif Exam.ok():
+    elif exam.ok():
         cell = nbformat.v4.new_code_cell(
             "# Initialize OK\nfrom client.api.notebook import Notebook\n"
             f"ok = Notebook(\"{dot_ok_name}\")")
     lock(cell)
     return cell
 
-def gen_check_all_cell():
+def gen_check_all_cell(exam):
     """
     Generates a check-all cell that runs all tests for a notebook. Determines the format of this cell 
-    using ``Exam.otter()`` and ``Exam.ok()``.
+    using ``exam.otter()`` and ``exam.ok()``.
+
+    Args:
+        exam (``Exam``): the exam
     
     Returns:
         ``list`` of ``nbformat.NotebookNode``: generated check-all cells
@@ -590,9 +972,9 @@ def gen_check_all_cell():
     instructions = nbformat.v4.new_markdown_cell()
     instructions.source = "To double-check your work, the cell below will rerun all of the autograder tests."
 
-    if Exam.otter():
+    if exam.otter():
         check_all = nbformat.v4.new_code_cell("grader.check_all()")
-    elif Exam.ok():
+    elif exam.ok():
         check_all = nbformat.v4.new_code_cell(dedent("""\
         # For your convenience, you can run this cell to run all the tests at once!
         import os
@@ -606,12 +988,13 @@ def gen_check_all_cell():
 
     return [instructions, check_all]
 
-def gen_export_cells(instruction_text, pdf=True, filtering=True):
+def gen_export_cells(exam, instruction_text, pdf=True, filtering=True):
     """
     Generates export or submit cells for the notebook. Determines the format of this cell using 
-    ``Exam.otter()`` and ``Exam.ok()``.
+    ``exam.otter()`` and ``exam.ok()``.
     
     Args:
+        exam (``Exam``): the exam
         instruction_text (``str``): extra instructions for students when exporting/submitting
         pdf (``bool``, optional): whether a PDF is needed; for Otter only
         filtering (``bool``, optional): whether PDF filtering is needed; for Otter only
@@ -620,7 +1003,7 @@ def gen_export_cells(instruction_text, pdf=True, filtering=True):
         ``list`` of ``nbformat.NotebookNode``: generated export/submit cells
 
     """
-    if Exam.otter():
+    if exam.otter():
         instructions = nbformat.v4.new_markdown_cell()
         instructions.source = "## Submission\n\nMake sure you have run all cells in your notebook in order before \
         running the cell below, so that all images/graphs appear in the output. The cell below will generate \
@@ -639,7 +1022,7 @@ def gen_export_cells(instruction_text, pdf=True, filtering=True):
             source_lines.append(f"grader.export(pdf=False)")
         export.source = "\n".join(source_lines)
 
-    elif Exam.ok():
+    elif exam.ok():
         instructions = nbformat.v4.new_markdown_cell()
         instructions.source = (
             "## Submission\n\nOnce you're finished, select \"Save and Checkpoint\" " 
@@ -703,20 +1086,23 @@ def is_test_cell(cell):
     if cell['cell_type'] != 'code':
         return False
     source = get_source(cell)
-    return source and re.match(TEST_REGEX, source[0], flags=re.IGNORECASE)
+    return bool(source and TEST_REGEX.match(source[0]))
 
 Test = namedtuple('Test', ['input', 'output', 'hidden'])
 
-def read_test(cell):
+def read_test(cell, source=None):
     """Returns the contents of a test as an ``(input, output, hidden)`` named tuple
     
     Args:
         cell (``nbformat.NotebookNode``): a test cell
+        source (``list`` of ``str``, optional): the lines of the cell source, if already split
 
     Returns:
         ``Test``: test named tuple
     """
-    hidden = bool(re.search("hidden", get_source(cell)[0], flags=re.IGNORECASE))
+    if source is None:
+        source = get_source(cell)
+    hidden = bool(HIDDEN_TEST_REGEX.search(source[0]))
     output = ''
     for o in cell['outputs']:
         output += ''.join(o.get('text', ''))
@@ -725,48 +1111,81 @@ def read_test(cell):
             output += results[0]
         elif results:
             output += results
-    return Test('\n'.join(get_source(cell)[1:]), output, hidden)
+    return Test('\n'.join(source[1:]), output, hidden)
+
+def format_test(test):
+    """Formats an OK test as the contents of a test file
+    
+    Args:
+        test (``dict``): OK test to be formatted
+
+    Returns:
+        ``str``: the contents of the test file
+    """
+    with profiler.phase("format tests"):
+        return 'test = ' + pprint.pformat(test, indent=4, width=200, depth=None) + '\n'
 
-def write_test(path, test):
+def write_test(output, path, source):
     """Writes an OK-formatted test file
     
     Args:
-        path (``str``): path of file to be written
-        test (``dict``): OK test to be written
+        output (``jexam.output.Output``): the output to write to
+        path (``pathlib.Path``): path of file to be written, relative to the output root
+        source (``str``): contents of the test file, as returned by ``format_test``
     """
-    with open(path, 'w') as f:
-        f.write('test = ')
-        pprint.pprint(test, f, indent=4, width=200, depth=None)
+    output.write(path, source)
 
-def gen_test_cell(name, points, tests, tests_dir):
+def gen_test(name, points, tests):
+    """Generates an OK test
+    
+    Args:
+        name (``str``): the name of the test
+        points (``int``): the value of the test
+        tests (``list`` of ``Test``): test cases
+
+    Returns:
+        ``dict``: the OK test
     """
-    Writes test files to tests directory. Returns a code cell that runs the check in either Otter
+    return {
+        'name': name,
+        'points': points,
+        'suites': [gen_suite(tests)],
+    }
+
+def gen_test_cell(exam, name, source, output, tests_dir):
+    """
+    Writes a test file to tests directory. Returns a code cell that runs the check in either Otter
     or OkPy format.
     
     Args:
+        exam (``Exam``): the exam
+        name (``str``): the name of the test
+        source (``str``): contents of the test file, as returned by ``format_test``
+        output (``jexam.output.Output``): the output to write to
+        tests_dir (``pathlib.Path``): path to tests directory, relative to the output root
+
+    Returns:
+        ``nbformat.NotebookNode``: code cell that runs the test
+    """
+    write_test(output, tests_dir / (name + '.py'), source)
+    return gen_check_cell(exam, name)
+
+def gen_check_cell(exam, name):
+    """
+    Returns a code cell that runs the check for test ``name`` in either Otter or OkPy format.
+
+    Args:
+        exam (``Exam``): the exam
         name (``str``): the name of the test
-        points (``int``): the value of the test
-        tests (``list`` of ``Test``): tests to be written
-        tests_dir (``pathlib.Path``): path to tests directory
 
     Returns:
         ``nbformat.NotebookNode``: code cell that runs the test
     """
     cell = nbformat.v4.new_code_cell()
-    if Exam.otter():
+    if exam.otter():
         cell.source = ['grader.check("{}")'.format(name)]
-    elif Exam.ok():
+    elif exam.ok():
         cell.source = ['ok.grade("{}");'.format(name)]
-    suites = [gen_suite(tests)]
-    points = points
-    
-    test = {
-        'name': name,
-        'points': points,
-        'suites': suites,
-    }
-
-    write_test(tests_dir / (name + '.py'), test)
     lock(cell)
     return cell
 
@@ -797,11 +1216,11 @@ def gen_case(test):
     Returns:
         ``dict``: the OK test case
     """
-    code_lines = str_to_doctest(test.input.split('\n'), [])
-
-    for i in range(len(code_lines) - 1):
-        if code_lines[i+1].startswith('>>>') and len(code_lines[i].strip()) > 3 and not code_lines[i].strip().endswith("\\"):
-            code_lines[i] += ';'
+    code_lines = []
+    for line in iter_doctest(test.input.split('\n')):
+        if code_lines and line.startswith('>>>') and len(code_lines[-1].strip()) > 3 and not code_lines[-1].strip().endswith("\\"):
+            code_lines[-1] += ';'
+        code_lines.append(line)
 
     code_lines.append(test.output)
 
@@ -811,36 +1230,6 @@ def gen_case(test):
         'locked': False
     }
 
-def remove_hidden_tests(test_dir):
-    """Rewrites test files to remove hidden tests
-    
-    Args:
-        test_dir (``pathlib.Path``): path to test files directory
-    """
-    for f in test_dir.iterdir():
-        if f.name == '__init__.py' or f.suffix != '.py':
-            continue
-        locals = {}
-        with open(f) as f2:
-            exec(f2.read(), globals(), locals)
-        test = locals['test']
-        for suite in test['suites']:
-            for i, case in list(enumerate(suite['cases']))[::-1]:
-                if case['hidden']:
-                    suite['cases'].pop(i)
-        write_test(f, test)
-
-# def write_all_version_tests(output_dir):
-#     for question in Exam.questions:
-#         if not question.manual:
-#             for version in question.versions:
-#                 gen_test_cell(
-#                     version.get_hash(),
-#                     question.points,
-#                     version.tests,
-#                     output_dir
-#                 )
-
 
 #---------------------------------------------------------------------------------------------------
 # SOLUTIONS
@@ -857,8 +1246,7 @@ def is_markdown_solution_cell(cell):
     """
     if not is_markdown_cell(cell):
         return False
-    source = get_source(cell)
-    return any([re.match(MD_SOLUTION_REGEX, l, flags=re.IGNORECASE) for l in source])
+    return any(MD_SOLUTION_REGEX.match(l) for l in get_source(cell))
 
 solution_assignment_re = re.compile('(\\s*[a-zA-Z0-9_ ]*=)(.*) #[ ]?SOLUTION')
 def solution_assignment_sub(match):
@@ -914,116 +1302,374 @@ def replace_solutions(lines):
     assert not solution, 'BEGIN SOLUTION without END SOLUTION in ' + str(lines)
     return stripped
 
-def replace_cell_solutions(cell):
+def replace_cell_solutions(cell, classified=None):
     """
     Takes an arbitrary cell and replaces the solutions in it, if present. If a Markdown solution cell,
-    replaces the entire cell with a Markdown response cell (copied from ``MARKDOWN_ANSWER_CELL_TEMPLATE```).
-    If a code cell, replaces only lines that contain solution delimiting comments based on ``replace_solutions``.
-    Otherwise, returns the original cell.
+    replaces the entire cell with ``MARKDOWN_ANSWER_CELL_TEMPLATE``. If a code cell, replaces only lines
+    that contain solution delimiting comments based on ``replace_solutions``. Otherwise, returns the 
+    original cell. Cells are treated as immutable and shared: ``cell`` is not modified, and only code 
+    cells whose source changes are (shallowly) copied.
 
     Args:
         cell (``nbformat.NotebookNode``): the cell to replace
+        classified (``ClassifiedCell``, optional): the cell as returned by ``classify_cell``, if it has
+            already been classified
     
     Returns:
         ``nbformat.NotebookNode``: the sanitized cell
     """
-    if is_markdown_solution_cell(cell):
-        return copy.deepcopy(MARKDOWN_ANSWER_CELL_TEMPLATE)
+    if classified is None:
+        classified = classify_cell(cell)
+    if classified.kind == MARKDOWN_SOLUTION_CELL:
+        return MARKDOWN_ANSWER_CELL_TEMPLATE
     elif is_code_cell(cell):
-        source = get_source(cell)
+        source = classified.source
         stripped_source = replace_solutions(source)
-        new_cell = copy.deepcopy(cell)
+        if stripped_source == source:
+            return cell
+        new_cell = copy.copy(cell)
         new_cell.source = "\n".join(stripped_source)
         return new_cell
     else:
-        return copy.deepcopy(cell)
+        return cell
 
 
 #---------------------------------------------------------------------------------------------------
 # NOTEBOOK PARSER
 #---------------------------------------------------------------------------------------------------
 
-def parse_notebook(nb):
+def parse_notebook(nb, autograder_format="otter", version_cache=None, jobs=1, assets=None):
     """
     Parses a master notebook into the requisite types and configurations needed for generating the exam.
-    Populates fields in ``Exam`` and creates ``Questions`` and ``Versions`` based on delimeter cells.
-    Raises ``AssertionError``s if the notebook is improperly formatted.
+    Creates an ``Exam`` with ``Questions`` and ``Versions`` based on delimeter cells. Raises 
+    ``AssertionError``s if the notebook is improperly formatted. Cells are not copied: the exam shares
+    them with ``nb``, and neither is modified afterwards. Once the structure of the notebook has been
+    parsed, all versions are prepared with ``prepare_versions`` using ``jobs`` worker processes.
+
+    If ``assets`` is given, the attachments of each cell are replaced by links to shared assets, which
+    are added to ``assets`` (see ``jexam.assets.extract_cell_attachments``). Cells are classified 
+    before their attachments are extracted, so version hashes, and the test names derived from them,
+    are the same whether or not attachments are extracted.
 
     Args:
         nb (``nbformat.NotebookNode``): the master notebook
+        autograder_format (``str``, optional): the autograder output format; either "otter" or "ok"
+        version_cache (``dict``, optional): versions from earlier parses keyed by content hash (see
+            ``make_version``); versions whose cells are unchanged are reused from it
+        jobs (``int``, optional): the number of worker processes to prepare versions with
+        assets (``dict``, optional): a dictionary to add the contents of extracted attachments to,
+            keyed by filename
+
+    Returns:
+        ``Exam``: the parsed exam
     
     Raises:
         ``AssertionError``: if the notebook is improperly formatted (if ``BEGIN`` blocks have no ``END``
-            if there are ``END`` blocks with no ``BEGIN``, or if there are cells outside a delimiter
-            block)
+            if there are ``END`` blocks with no ``BEGIN``, if there are cells outside a delimiter
+            block, or if a version has malformed solution markers)
     """
+    exam = Exam(autograder_format=autograder_format)
     in_introduction, in_question, in_version, in_conclusion = tuple(False for _ in range(4))
     cells, config = [], {}
     questions, versions = [], []
+    if assets is not None:
+        from .assets import extract_cell_attachments
+
     for cell in nb.cells:
+        c = classify_cell(cell)
+        if assets is not None:
+            c = c._replace(cell=extract_cell_attachments(cell, assets))
 
         # check for BEGIN cells and parse configs (if applicable)
-        if is_delim_cell(cell, "exam", True):
-            Exam.config = get_delim_config(cell, "exam")
-        elif is_delim_cell(cell, "introduction", True):
-            assert all([not in_introduction, not in_question, not in_version, not in_conclusion]), \
-                f"BEGIN INTRODUCTION detected inside another block"
-            in_introduction = True
-        elif is_delim_cell(cell, "question", True):
-            assert all([not in_introduction, not in_question, not in_version, not in_conclusion]), \
-                f"BEGIN QUESTION detected inside another block"
-            in_question = True
-            config = get_delim_config(cell, "question")
-        elif is_delim_cell(cell, "version", True):
-            assert all([not in_introduction, in_question, not in_version, not in_conclusion]), \
-                f"BEGIN VERSION detected inside an incompatible block or outside a question block"
-            in_version = True
-        elif is_delim_cell(cell, "conclusion", True):
-            assert all([not in_introduction, not in_question, not in_version, not in_conclusion]), \
-                f"BEGIN CONCLUSION detected inside another block"
-            in_conclusion = True
+        if c.kind == BEGIN_CELL:
+            if c.delim == "exam":
+                exam.config = c.config
+            elif c.delim == "introduction":
+                assert all([not in_introduction, not in_question, not in_version, not in_conclusion]), \
+                    f"BEGIN INTRODUCTION detected inside another block"
+                in_introduction = True
+            elif c.delim == "question":
+                assert all([not in_introduction, not in_question, not in_version, not in_conclusion]), \
+                    f"BEGIN QUESTION detected inside another block"
+                in_question = True
+                config = c.config
+            elif c.delim == "version":
+                assert all([not in_introduction, in_question, not in_version, not in_conclusion]), \
+                    f"BEGIN VERSION detected inside an incompatible block or outside a question block"
+                in_version = True
+            elif c.delim == "conclusion":
+                assert all([not in_introduction, not in_question, not in_version, not in_conclusion]), \
+                    f"BEGIN CONCLUSION detected inside another block"
+                in_conclusion = True
         
-        # check for END cells and update vars
-        elif in_introduction and is_delim_cell(cell, "introduction", False):
-            in_introduction = False
-            Exam.introduction = copy.deepcopy(cells)
-            cells = []
-        elif in_question and is_delim_cell(cell, "question", False):
-            in_question = False
-            # handle case when there is only 1 version and no BEGIN/END VERSION provided
-            if len(versions) == 0 and len(cells) > 0:
-                versions = [Version(copy.deepcopy(cells))]
+        # check for END cells and update vars; raise errors for ENDs outside their blocks
+        elif c.kind == END_CELL:
+            if c.delim == "introduction":
+                assert in_introduction, "END INTRODUCTION found outside introduction block"
+                in_introduction = False
+                exam.introduction = [cc.cell for cc in cells]
+                cells = []
+            elif c.delim == "question":
+                assert in_question, "END QUESTION found outside question block"
+                in_question = False
+                # handle case when there is only 1 version and no BEGIN/END VERSION provided
+                if len(versions) == 0 and len(cells) > 0:
+                    versions = [make_version(cells, version_cache)]
+                    cells = []
+                questions.append(Question(versions, config.get("points", 1), config.get("manual", False), config))
+                versions, config, cells = [], {}, []
+            elif c.delim == "version":
+                assert in_version, "END VERSION found outside version block"
+                in_version = False
+                versions.append(make_version(cells, version_cache))
+                cells = []
+            elif c.delim == "conclusion":
+                assert in_conclusion, "END CONCLUSION found outside conclusion block"
+                in_conclusion = False
+                exam.conclusion = [cc.cell for cc in cells]
                 cells = []
-            questions.append(Question(versions, config.get("points", 1), config.get("manual", False)))
-            versions, config, cells = [], {}, []
-        elif in_version and is_delim_cell(cell, "version", False):
-            in_version = False
-            versions.append(Version(copy.deepcopy(cells)))
-            cells = []
-        elif in_conclusion and is_delim_cell(cell, "conclusion", False):
-            in_conclusion = False
-            Exam.conclusion = copy.deepcopy(cells)
-            cells = []
-        
-        # raise errors for ENDs or other cells outside their blocks
-        elif is_delim_cell(cell, "introduction", False):
-            raise AssertionError("END INTRODUCTION found outside introduction block")
-        elif is_delim_cell(cell, "question", False):
-            raise AssertionError("END QUESTION found outside question block")
-        elif is_delim_cell(cell, "version", False):
-            raise AssertionError("END VERSION found outside version block")
-        elif is_delim_cell(cell, "conclusion", False):
-            raise AssertionError("END CONCLUSION found outside conclusion block")
 
         # collect cells that are in between delim cells
         elif in_introduction or in_question or in_version or in_conclusion:
-            cells.append(cell)
+            cells.append(c)
 
         else:
-            raise AssertionError(f"Cell found outside a block: {cell}")
+            raise AssertionError(f"Cell found outside a block: {c.cell}")
     
-        # put the questions into Exam
-        Exam.questions = questions
+    # put the questions into the exam
+    exam.questions = questions
+
+    with profiler.phase("prepare versions", jobs=jobs):
+        prepare_versions(exam, jobs=jobs)
+    return exam
+
+def make_version(classified, version_cache=None):
+    """
+    Creates a ``Version`` from classified cells, reusing their classifications. If
+    ``version_cache`` is given, a version with the same content hash is returned from it if there is 
+    one; otherwise the new version is added to it.
+
+    Args:
+        classified (``list`` of ``ClassifiedCell``): the classified cells of the version
+        version_cache (``dict``, optional): versions keyed by content hash
+
+    Returns:
+        ``Version``: the version
+    """
+    if version_cache is not None:
+        source = json.dumps([c.cell for c in classified], sort_keys=True)
+        content_hash = hashlib.sha256(source.encode("utf-8")).hexdigest()
+        if content_hash in version_cache:
+            profiler.count("reused versions")
+            return version_cache[content_hash]
+
+    version = Version([c.cell for c in classified], classified)
+    if version_cache is not None:
+        version.content_hash = content_hash
+        version_cache[content_hash] = version
+    return version
+
+
+#---------------------------------------------------------------------------------------------------
+# VERSION PREPARATION
+#---------------------------------------------------------------------------------------------------
+
+# the smallest number of versions to prepare in worker processes; a pool takes longer to start than
+# preparing fewer versions in this process
+MIN_PARALLEL_VERSIONS = 32
+
+def prepare_versions(exam, jobs=1):
+    """
+    Prepares every version of ``exam`` that has not been prepared (see ``Version.prepare``) and renders
+    its test files, so that everything the generators need is computed before any output is written.
+    If ``jobs`` is greater than 1 and there are at least ``MIN_PARALLEL_VERSIONS`` versions to 
+    prepare, they are prepared in chunks by a pool of ``jobs`` worker processes.
+
+    Preparation fails fast: the first error raised stops the preparation of the remaining versions 
+    and is raised with the question and version it was found in.
+
+    Args:
+        exam (``Exam``): the exam
+        jobs (``int``, optional): the number of worker processes
+
+    Raises:
+        ``AssertionError``: if a version has malformed solution markers
+    """
+    public_tests = exam.config.get("public_tests", False)
+    pending = [
+        (i, j, question.points, question.manual, version) 
+        for i, question in enumerate(exam.questions) 
+        for j, version in enumerate(question.versions) if not version.is_prepared()
+    ]
+    profiler.count("prepared versions", len(pending))
+
+    if jobs <= 1 or len(pending) < MIN_PARALLEL_VERSIONS:
+        for i, j, points, manual, version in pending:
+            _prepare_version(i, j, points, manual, public_tests, version)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    chunksize = max(1, len(pending) // (jobs * 4))
+    chunks = [[
+        (i, j, points, manual, public_tests, version.original_cells) 
+        for i, j, points, manual, version in pending[k:k + chunksize]
+    ] for k in range(0, len(pending), chunksize)]
+
+    parent_profiler = profiler.get_profiler()
+    initargs = (parent_profiler.origin if parent_profiler is not None else None,)
+    executor = ProcessPoolExecutor(
+        max_workers=jobs, mp_context=get_mp_context(), initializer=_init_worker_profiler, 
+        initargs=initargs,
+    )
+    futures = []
+    try:
+        for chunk in chunks:
+            futures.append(executor.submit(_prepare_versions_chunk, chunk))
+        for future in as_completed(futures):
+            states, records = future.result()
+            for i, j, state in states:
+                exam.questions[i].versions[j].load_prepared(state)
+            if records is not None:
+                parent_profiler.merge(records)
+    finally:
+        # cancel the chunks that have not started if one failed; shutdown(cancel_futures=True) 
+        # requires Python 3.9
+        for future in futures:
+            future.cancel()
+        executor.shutdown()
+
+def _prepare_version(i, j, points, manual, public_tests, version):
+    """
+    Prepares version ``j`` of question ``i`` and renders its test files, naming the version in any
+    error raised.
+    """
+    try:
+        version.prepare()
+        if not manual:
+            version.get_test_source(points, True)
+            if public_tests:
+                version.get_test_source(points, False)
+    except AssertionError as e:
+        raise AssertionError(f"Question {i + 1}, version {j + 1}: {e}") from e
+
+def _prepare_versions_chunk(chunk):
+    """
+    Prepares a chunk of versions in a worker process from their cells and returns the prepared state
+    of each (see ``Version.dump_prepared``) and, if profiling is enabled, the worker's profiler 
+    records.
+    """
+    states = []
+    for i, j, points, manual, public_tests, cells in chunk:
+        version = Version(cells)
+        _prepare_version(i, j, points, manual, public_tests, version)
+        states.append((i, j, version.dump_prepared()))
+    return states, _drain_worker_profiler()
+
+
+#---------------------------------------------------------------------------------------------------
+# PARALLEL GENERATION
+#---------------------------------------------------------------------------------------------------
+
+# the exam that a worker process writes exams of
+_worker_exam = None
+
+# the output that a worker process writes exams to; ``None`` if exams are collected in memory
+_worker_output = None
+
+def _init_worker(exam, output, profile_origin):
+    """
+    Sets the exam and output of a worker process so that workers do not rely on inheriting the 
+    parent's state. Enables profiling if ``profile_origin`` is not ``None``.
+    """
+    global _worker_exam, _worker_output
+    _worker_exam = exam
+    _worker_output = output
+    _init_worker_profiler(profile_origin)
+
+def _init_worker_profiler(profile_origin):
+    """
+    Enables profiling in a worker process if ``profile_origin`` is not ``None``.
+    """
+    if profile_origin is not None:
+        profiler.set_profiler(profiler.Profiler(profile_origin))
+
+def _write_exam_instance(task):
+    """
+    Writes an exam for a task tuple in a worker process. If the worker has no output of its own, the
+    exam's files are collected in memory and returned to be written by the parent process. Also
+    returns the number of bytes written by the worker and, if profiling is enabled, the worker's
+    profiler records.
+    """
+    output = _worker_output or MemoryOutput()
+    start = output.bytes_written
+    files = _profile_exam_instance(_worker_exam, output, task)
+    if isinstance(output, MemoryOutput):
+        return files, output, 0, _drain_worker_profiler()
+    return files, None, output.bytes_written - start, _drain_worker_profiler()
+
+def _drain_worker_profiler():
+    """
+    Returns the records of the worker's profiler, or ``None`` if profiling is disabled.
+    """
+    worker_profiler = profiler.get_profiler()
+    return worker_profiler.drain() if worker_profiler is not None else None
+
+def _profile_exam_instance(exam, output, task):
+    """
+    Runs ``create_and_write_exam_instance`` for a task tuple as a profiled phase.
+    """
+    with profiler.phase("write exam", exam=task[0].as_posix()):
+        files = create_and_write_exam_instance(exam, output, *task)
+    profiler.count("exams")
+    profiler.count("exam files", len(files))
+    return files
+
+def write_exam_instances(exam, output, tasks, jobs=1):
+    """
+    Writes exams of ``exam`` for each ``(output_dir, nb_name, assignment)`` tuple in ``tasks`` to ``output``, in 
+    order. If ``jobs`` is greater than 1, the exams are created by a pool of ``jobs`` worker processes,
+    which write them directly if ``output.parallel_safe`` is true. Otherwise, the workers send the 
+    files back to this process, which writes them in order. Yields the index of each exam, the
+    files written for it, and the number of bytes written once it has been written.
+
+    Args:
+        exam (``Exam``): the exam
+        output (``jexam.output.Output``): the output to write to
+        tasks (``list`` of ``tuple``): arguments for ``create_and_write_exam_instance``
+        jobs (``int``, optional): the number of worker processes
+
+    Yields:
+        ``tuple`` of ``int``, ``list`` of ``pathlib.Path``, and ``int``: the index in ``tasks`` of 
+        each written exam, the paths of its files, and the number of bytes written
+    """
+    if jobs <= 1:
+        for i, task in enumerate(tasks):
+            start = output.bytes_written
+            files = _profile_exam_instance(exam, output, task)
+            yield i, files, output.bytes_written - start
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    parent_profiler = profiler.get_profiler()
+    initargs = (
+        exam, output if output.parallel_safe else None, 
+        parent_profiler.origin if parent_profiler is not None else None,
+    )
+    chunksize = max(1, len(tasks) // (jobs * 4))
+    with ProcessPoolExecutor(
+        max_workers=jobs, mp_context=get_mp_context(), initializer=_init_worker, initargs=initargs
+    ) as executor:
+        results = executor.map(_write_exam_instance, tasks, chunksize=chunksize)
+        for i, (files, contents, nbytes, records) in enumerate(results):
+            if contents is not None:
+                start = output.bytes_written
+                contents.replay(output)
+                nbytes = output.bytes_written - start
+            if records is not None:
+                parent_profiler.merge(records)
+            yield i, files, nbytes
 
 
 #---------------------------------------------------------------------------------------------------
@@ -1032,48 +1678,267 @@ def parse_notebook(nb):
 
 def main(args):
     """
-    Runs jExam. Parses master notebook, seeds ``np.random``, and creates the number of exams specified
-    in the exam config. Writes these to ``{{ args.result }}/exam_*``. Also writes a solutions notebook
-    containing all questions, versions, and autograder tests to ``{{ args.result }}/autograder``. If
-    specified, also generates a Gradescope zip file to use with Otter.
+    Runs jExam with ``build``. If ``args.progress`` is not ``None``, writes progress events to that
+    path as JSON lines (see ``jexam.progress``). If ``args.profile`` is not ``None``, profiles the 
+    build and writes a report, a Chrome trace of its phases, and (if ``args.cprofile`` is true) a 
+    cProfile dump of this process to the directory ``args.profile`` (see 
+    ``jexam.profiler.Profiler.write``). If progress events are written to stdout (``args.progress``
+    is ``"-"``), status messages are printed to stderr so that stdout holds only JSON lines.
 
     Args:
         args (``argparse.Namespace``): parsed command-line arguments
+    """
+    progress = ProgressTracker()
+    status = sys.stderr if args.progress == "-" else sys.stdout
+    with ExitStack() as stack:
+        if args.progress is not None:
+            progress.add_callback(stack.enter_context(closing(JSONLinesSink(args.progress))))
+        if args.progress == "-":
+            # keep stdout for progress events
+            stack.enter_context(redirect_stdout(status))
+        if args.profile is not None:
+            stack.enter_context(profiler.profiling(args.profile, cprofile=args.cprofile))
+        build(args, progress=progress)
+
+    if args.profile is not None and not args.quiet:
+        print(f"Profile written to {args.profile}", file=status)
+
+def load_exam(master, autograder_format="otter", version_cache=None, jobs=1, strip_outputs=False, 
+        extract_attachments=False):
+    """
+    Reads and parses the master notebook at ``master`` and encodes the fragments of its student 
+    notebooks, so that the returned exam can be built any number of times with ``build``. The master
+    is read one cell at a time (see ``jexam.reader``); if ``strip_outputs`` is true, the outputs of 
+    all cells except test cells, which student notebooks never include, are discarded as they are 
+    read, and so are also left out of the autograder notebook. If ``extract_attachments`` is true, 
+    the attachments of all cells are replaced by links to files in the ``assets`` directory of the 
+    output, which hold each distinct attachment once (see ``jexam.assets``).
+
+    Args:
+        master (``str`` or ``pathlib.Path``): the path to the master notebook
+        autograder_format (``str``, optional): the autograder output format; either "otter" or "ok"
+        version_cache (``dict``, optional): versions from earlier parses to reuse (see 
+            ``parse_notebook``)
+        jobs (``int``, optional): the number of worker processes to prepare versions with (see
+            ``prepare_versions``)
+        strip_outputs (``bool``, optional): whether to discard the outputs of cells that are not 
+            test cells
+        extract_attachments (``bool``, optional): whether to replace attachments with links to 
+            shared assets
+
+    Returns:
+        ``Exam``: the parsed exam
 
     Raises:
-        ``AssertionError``: if ``args.format`` is invalid
+        ``AssertionError``: if ``autograder_format`` is invalid or the notebook is improperly formatted
+    """
+    assert autograder_format in ["otter", "ok"], f"Autograder format {autograder_format} invalid"
+    master = pathlib.Path(master)
+    with profiler.phase("read master"):
+        nb = read_notebook(master, keep_outputs=is_test_cell if strip_outputs else None)
+    assets = {} if extract_attachments else None
+    with profiler.phase("parse notebook"):
+        exam = parse_notebook(
+            nb, autograder_format=autograder_format, version_cache=version_cache, jobs=jobs, assets=assets
+        )
+    exam.assets = assets or {}
+    profiler.count("assets", len(exam.assets))
+    profiler.count("cells", len(nb.cells))
+    profiler.count("questions", len(exam.questions))
+    profiler.count("versions", sum(len(q.versions) for q in exam.questions))
+    with profiler.phase("encode fragments"):
+        exam.fragments = ExamFragments(exam, master.name, exam.config["num_questions"])
+    return exam
+
+def build(args, progress=None, exam=None):
     """
+    Builds exams from a master notebook. Parses master notebook, plans the questions and versions for
+    all students from the seed, and creates the number of exams specified in the exam config, using
+    ``args.jobs`` worker processes. Writes these to ``{{ args.result }}/exam_*``. Also writes a 
+    solutions notebook containing all questions, versions, and autograder tests to 
+    ``{{ args.result }}/autograder``. If ``args.result`` is a zip or tar file path, all of these files
+    are written into that archive. If ``args.link`` is true, files with the same contents are written
+    once and hard-linked into place (see ``jexam.output.LinkedDirectoryOutput``). If 
+    ``args.incremental`` is true, only rewrites outputs whose inputs
+    changed since the last incremental build, using the build cache in ``{{ args.result }}/.jexam``. 
+    If specified, also generates a Gradescope zip file to use with Otter. Records the questions and
+    versions assigned to each student in a manifest (see ``jexam.manifest``). If ``exam`` is given, 
+    it is built instead of parsing ``args.master`` again.
+
+    If the exam has assets (see ``load_exam``), each is written once to ``{{ args.result }}/assets``.
+    If ``args.export`` is not ``None``, the student notebooks that were written (or whose exports are
+    missing) are also exported to that format next to each notebook by ``args.jobs`` worker processes
+    (see ``jexam.export``), as is the autograder notebook if ``args.export_autograder`` is true.
+
+    If ``args.students`` is not ``None``, only the exams of those students are written, exactly as 
+    they are in a build of the whole class; the autograder notebook, manifest, and Gradescope zip 
+    file are not, so the result must be a directory. Because each student's exam is planned 
+    independently (see ``jexam.planner.plan_assignments``), this takes the same time for any 
+    number of students.
+
+    Args:
+        args (``argparse.Namespace``): parsed command-line arguments
+        progress (``jexam.progress.ProgressTracker``, optional): a tracker to report the progress of
+            each phase to
+        exam (``Exam``, optional): the exam of ``args.master`` as returned by ``load_exam``
+
+    Raises:
+        ``AssertionError``: if ``args.format`` is invalid or does not match the format of ``exam``, 
+            ``args.jobs`` is less than 1, ``args.export`` is invalid, an incremental build, linked 
+            output, export, single students' exams, or autograder zip file is requested with an 
+            archive result, or a student in ``args.students`` is out of range
+    """
+    if progress is None:
+        progress = ProgressTracker()
     master, result = pathlib.Path(args.master), pathlib.Path(args.result)
 
-    # update Exam.autograder_format
     assert args.format in ["otter", "ok"], f"Autograder format {args.format} invalid"
-    Exam.autograder_format = args.format
+    assert args.jobs >= 1, f"Number of jobs {args.jobs} invalid"
+    archive = get_archive_mode(result) is not None
+    assert not (archive and args.incremental), "Incremental builds require a directory result"
+    assert not (archive and args.link), "Linked output requires a directory result"
+    assert not (archive and args.export), "Exporting notebooks requires a directory result"
+    assert not (archive and args.students is not None), "Writing single students' exams requires a directory result"
+    if args.export is not None:
+        from .export import EXPORTERS, export_autograder, export_exam_instances, get_export_path
+        assert args.export in EXPORTERS, f"Export format {args.export} invalid"
 
     # load notebook and parse
-    nb = nbformat.read(master, as_version=NB_VERSION)
-    parse_notebook(nb)
-
-    # seed np.random in advance of creating student versions
-    seed = args.seed or Exam.config.get("seed", 42)
-    np.random.seed(seed)
+    progress.start("parse")
+    if exam is None:
+        exam = load_exam(
+            master, 
+            autograder_format=args.format, 
+            jobs=args.jobs, 
+            strip_outputs=args.strip_outputs, 
+            extract_attachments=args.extract_attachments,
+        )
+    assert exam.autograder_format == args.format, \
+        f"Exam has autograder format {exam.autograder_format}, not {args.format}"
+    students = args.students
+    num_students = exam.config["num_students"]
+    if students is None:
+        assert not (archive and exam.config.get("generate", {})), \
+            "Generating an autograder zip file requires a directory result"
+    else:
+        for student in students:
+            assert 0 <= student < num_students, f"Student {student} not in range(0, {num_students})"
 
-    # create autograder notebook
+    seed = args.seed or exam.config.get("seed", 42)
     nb_name = master.name
-    create_and_write_autograder_exam(result / "autograder", nb_name)
-
-    # create exams
-    for i in range(Exam.config["num_students"]):
-        if (i + 1) % 50 == 0 and not args.quiet:
-            print(f"Generating exam {i + 1}")
-        output_dir = result / f"exam_{i}"
-        create_and_write_exam_instance(output_dir, nb_name, Exam.config["num_questions"])
 
-    # all_tests_path = result / 'tests'
-    # os.makedirs(all_tests_path, exist_ok=True)
-    # write_all_version_tests(all_tests_path)
+    # hash the inputs shared by all outputs for the build cache
+    cache = BuildCache(result) if args.incremental else None
+    exam_key = hash_inputs(args.format, seed, nb_name, exam.config, exam.introduction, exam.conclusion)
+
+    with open_output(result, link=args.link) as output:
+        # write the assets shared by all notebooks
+        if exam.assets:
+            from .assets import ASSETS_DIR
+
+            assets_key = hash_inputs(sorted(exam.assets))
+            if cache is None or not cache.is_current("assets", assets_key, "assets"):
+                files = []
+                with profiler.phase("write assets"):
+                    for name, contents in sorted(exam.assets.items()):
+                        output.write_bytes(pathlib.PurePath(ASSETS_DIR, name), contents)
+                        files.append(pathlib.PurePath(ASSETS_DIR, name))
+                if cache is not None:
+                    cache.record("assets", assets_key, files, "assets")
+
+        # create autograder notebook
+        if students is None:
+            autograder_key = hash_inputs(exam_key, [
+                (q.config, [(v.get_hash(), v.get_content_hash()) for v in q.versions]) for q in exam.questions
+            ])
+            progress.start("autograder", total=1)
+            if cache is None or not cache.is_current("autograder", autograder_key, "autograder notebooks"):
+                start = output.bytes_written
+                with profiler.phase("write autograder"):
+                    files = create_and_write_autograder_exam(exam, output, pathlib.Path("autograder"), nb_name, cache=cache)
+                if cache is not None:
+                    cache.record("autograder", autograder_key, files, "autograder notebooks")
+                progress.update(nbytes=output.bytes_written - start)
+            else:
+                progress.update()
+
+        # choose questions and versions for all students (or the requested students) at once
+        planned = range(num_students) if students is None else students
+        progress.start("plan", total=len(planned))
+        with profiler.phase("plan exams"):
+            assignments = plan_exam_instances(exam, seed, num_students, exam.config["num_questions"], students=students)
+        if students is None:
+            with profiler.phase("write manifest"):
+                write_manifest(get_manifest_path(result), {
+                    "master": nb_name,
+                    "format": args.format,
+                    "seed": seed,
+                    "num_students": num_students,
+                    "num_questions": exam.config["num_questions"],
+                }, exam.questions, assignments)
+        progress.update(len(planned))
+        tasks, keys, export_tasks = [], [], []
+        for i, assignment in zip(planned, assignments):
+            task = (pathlib.Path(f"exam_{i}"), nb_name, assignment)
+            if cache is not None:
+                key = hash_inputs(exam_key, [(
+                    exam.questions[q].config,
+                    exam.questions[q].versions[v].hash,
+                    exam.questions[q].versions[v].get_content_hash(),
+                ) for q, v in assignment])
+                if cache.is_current(f"exam_{i}", key, "exams"):
+                    if args.export is not None and not get_export_path(result / task[0] / nb_name, args.export).exists():
+                        export_tasks.append(task)
+                    continue
+                keys.append((f"exam_{i}", key))
+            tasks.append(task)
+            export_tasks.append(task)
+
+        # create exams
+        progress.start("exams", total=len(tasks))
+        with profiler.phase("write exams", jobs=args.jobs):
+            for i, files, nbytes in write_exam_instances(exam, output, tasks, jobs=args.jobs):
+                student = get_exam_student(tasks[i][0])
+                if (student + 1) % 50 == 0 and not args.quiet:
+                    print(f"Generating exam {student + 1}")
+                if cache is not None:
+                    cache.record(*keys[i], files, "exams")
+                progress.update(nbytes=nbytes)
+        progress.finish()
+
+    if cache is not None:
+        # remove the exams of students who are no longer in the class
+        if students is None:
+            cache.prune([
+                name for name in cache.entries 
+                if get_exam_student(name) is not None and get_exam_student(name) >= num_students
+            ], "exams", directories=True)
+        cache.save()
+        if cache.summary() and not args.quiet:
+            print(cache.summary())
+
+    # export notebooks
+    if args.export is not None:
+        progress.start("export", total=len(export_tasks) + int(args.export_autograder and students is None))
+        with profiler.phase("export", jobs=args.jobs):
+            if args.export_autograder and students is None:
+                _, nbytes = export_autograder(result, pathlib.Path("autograder") / nb_name, args.export)
+                progress.update(nbytes=nbytes)
+            for i, _, nbytes in export_exam_instances(exam, result, args.export, export_tasks, jobs=args.jobs):
+                student = get_exam_student(export_tasks[i][0])
+                if (student + 1) % 50 == 0 and not args.quiet:
+                    print(f"Exporting exam {student + 1}")
+                progress.update(nbytes=nbytes)
+        progress.finish()
 
     # generate Gradescope zip file
-    if Exam.config.get("generate", {}):
+    if exam.config.get("generate", {}) and students is None:
+        from .gradescope import ZIP_NAME, generate
+
         if not args.quiet:
             print("Generating autograder zip file...")
-            generate(args.result, Exam.config.get("generate"))
+        progress.start("generate", total=1)
+        with profiler.phase("generate"):
+            nbytes = generate(exam, exam.config.get("generate"), result / ZIP_NAME, master.parent)
+        progress.update(nbytes=nbytes)
+        progress.finish()
@@ -0,0 +1,255 @@
+########################################
+##### Assignment Planner for jExam #####
+########################################
+
+import numpy as np
+
+
+#---------------------------------------------------------------------------------------------------
+# GLOBAL VARIABLES
+#---------------------------------------------------------------------------------------------------
+
+# constants of the splitmix64 mixing function
+GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+MIX_MULTIPLIERS = (np.uint64(0xBF58476D1CE4E5B9), np.uint64(0x94D049BB133111EB))
+
+# random streams used by the planner; every draw is keyed by its stream so that draws are independent
+QUESTION_STREAM = 0
+SEAT_STREAM = 1
+SLOT_STREAM = 2
+VERSION_STREAM = 3
+
+
+#---------------------------------------------------------------------------------------------------
+# RANDOM KEYS
+#---------------------------------------------------------------------------------------------------
+
+def mix(x):
+    """
+    Applies the splitmix64 finalizer to an array of unsigned 64-bit integers.
+
+    Args:
+        x (``numpy.ndarray``): the integers to mix
+
+    Returns:
+        ``numpy.ndarray``: the mixed integers
+    """
+    x = (x ^ (x >> np.uint64(30))) * MIX_MULTIPLIERS[0]
+    x = (x ^ (x >> np.uint64(27))) * MIX_MULTIPLIERS[1]
+    return x ^ (x >> np.uint64(31))
+
+def random_keys(seed, *indices):
+    """
+    Returns pseudorandom 64-bit keys that depend only on ``seed`` and ``indices``. The indices are
+    broadcast against each other, so a key can be computed for any single element of the result
+    without computing the others.
+
+    Args:
+        seed (``int``): the exam seed
+        *indices (``int`` or ``numpy.ndarray``): the indices of the keys, e.g. a stream, student, and
+            question
+
+    Returns:
+        ``numpy.ndarray``: the keys, with the broadcast shape of ``indices``
+    """
+    with np.errstate(over="ignore"):
+        x = mix(np.asarray([seed % 2 ** 64], dtype=np.uint64) + GOLDEN_GAMMA)
+        for idx in indices:
+            x = mix(x ^ (np.asarray(idx).astype(np.uint64) + np.uint64(1)) * GOLDEN_GAMMA)
+    return x
+
+def block_permutations(seed, stream, blocks, size):
+    """
+    Returns a random permutation of ``range(size)`` for each block index in ``blocks``.
+
+    Args:
+        seed (``int``): the exam seed
+        stream (``tuple`` of ``int``): the indices identifying the random stream
+        blocks (``numpy.ndarray``): the block indices
+        size (``int``): the length of each permutation
+
+    Returns:
+        ``numpy.ndarray``: the permutations, one row per block
+    """
+    keys = random_keys(seed, *stream, np.asarray(blocks)[:, None], np.arange(size)[None, :])
+    return np.argsort(keys, axis=1, kind="stable")
+
+
+#---------------------------------------------------------------------------------------------------
+# CONSTRAINTS
+#---------------------------------------------------------------------------------------------------
+
+def balanced_choices(seed, stream, size, students):
+    """
+    Chooses an element of ``range(size)`` for each student so that every consecutive block of ``size``
+    students receives each element exactly once, and so that students with adjacent indices never
+    receive the same element (if ``size`` is greater than 1). Each student's choice only depends on
+    its own block and the one before it.
+
+    Args:
+        seed (``int``): the exam seed
+        stream (``tuple`` of ``int``): the indices identifying the random stream
+        size (``int``): the number of elements to choose from
+        students (``numpy.ndarray``): the student indices
+
+    Returns:
+        ``numpy.ndarray``: the chosen element for each student
+    """
+    students = np.asarray(students, dtype=np.int64)
+    if size == 1:
+        return np.zeros(len(students), dtype=np.int64)
+    elif size == 2:
+        # the only way to keep neighbors apart is to alternate
+        start = int(random_keys(seed, *stream)[0] & np.uint64(1))
+        return (students + start) % 2
+
+    blocks, positions = np.divmod(students, size)
+    needed = np.unique(np.concatenate([blocks, blocks - 1]))
+    needed = needed[needed >= 0]
+    perms = block_permutations(seed, stream, needed, size)
+
+    # if a block would start with the element that ends the previous block, swap its first two
+    # elements; with at least 3 elements, this never changes the element that ends the block
+    prev_last = perms[np.searchsorted(needed, np.maximum(blocks - 1, 0)), -1]
+    prev_last = np.where(blocks > 0, prev_last, -1)
+    perms = perms[np.searchsorted(needed, blocks)]
+    clash = perms[:, 0] == prev_last
+    perms[clash, 0], perms[clash, 1] = perms[clash, 1], perms[clash, 0].copy()
+
+    return perms[np.arange(len(students)), positions]
+
+def plan_questions(seed, num_questions, num_total, students):
+    """
+    Chooses ``num_questions`` distinct questions for each student so that every question is used 
+    evenly. Students are split into consecutive blocks of ``num_total``; each block arranges the 
+    questions in a random cycle and seats its students at random positions on it, and each student
+    receives the window of ``num_questions`` questions starting at their position. Every question is
+    then received by exactly ``num_questions`` students of each block, while each student's questions
+    are still a uniformly random ordered subset.
+
+    Args:
+        seed (``int``): the exam seed
+        num_questions (``int``): the number of questions on each exam
+        num_total (``int``): the number of questions to choose from
+        students (``numpy.ndarray``): the student indices
+
+    Returns:
+        ``tuple`` of ``numpy.ndarray``: the questions of each student and each student's rank among 
+        the students that receive each of those questions
+    """
+    blocks, seats = np.divmod(students, num_total)
+    needed = np.unique(blocks)
+    cycles = block_permutations(seed, (QUESTION_STREAM,), needed, num_total)
+    positions = block_permutations(seed, (SEAT_STREAM,), needed, num_total)
+
+    # the questions of every seat in each block
+    windows = (positions[:, :, None] + np.arange(num_questions)) % num_total
+    block_questions = cycles[np.arange(len(needed))[:, None, None], windows]
+
+    # rank the students receiving each question within its block by seat
+    received = np.zeros((len(needed), num_total, num_total), dtype=np.int64)
+    np.put_along_axis(received, block_questions, 1, axis=2)
+    block_ranks = np.cumsum(received, axis=1) - received
+
+    rows = np.searchsorted(needed, blocks)
+    questions = block_questions[rows, seats]
+    ranks = blocks[:, None] * num_questions + block_ranks[rows[:, None], seats[:, None], questions]
+    return questions, ranks
+
+def plan_stratified_questions(seed, num_questions, difficulties, students):
+    """
+    Chooses one question from each stratum returned by ``difficulty_strata`` for each student, in 
+    order, so that the questions of each stratum are used evenly.
+
+    Args:
+        seed (``int``): the exam seed
+        num_questions (``int``): the number of questions on each exam
+        difficulties (``list`` of ``float``): the difficulty of each question
+        students (``numpy.ndarray``): the student indices
+
+    Returns:
+        ``tuple`` of ``numpy.ndarray``: the questions of each student and each student's rank among 
+        the students that receive each of those questions
+    """
+    questions = np.empty((len(students), num_questions), dtype=np.int64)
+    ranks = np.empty((len(students), num_questions), dtype=np.int64)
+    for slot, stratum in enumerate(difficulty_strata(difficulties, num_questions)):
+        questions[:, slot] = stratum[balanced_choices(seed, (SLOT_STREAM, slot), len(stratum), students)]
+        # each block of students receives each question of the stratum once
+        ranks[:, slot] = students // len(stratum)
+    return questions, ranks
+
+def difficulty_strata(difficulties, num_questions):
+    """
+    Partitions the questions into ``num_questions`` strata of consecutive difficulty, from easiest to
+    hardest. Ties are broken by question index.
+
+    Args:
+        difficulties (``list`` of ``float``): the difficulty of each question
+        num_questions (``int``): the number of questions on each exam
+
+    Returns:
+        ``list`` of ``numpy.ndarray``: the question indices in each stratum
+    """
+    order = np.argsort(np.asarray(difficulties, dtype=float), kind="stable")
+    return np.array_split(order, num_questions)
+
+
+#---------------------------------------------------------------------------------------------------
+# PLANNER
+#---------------------------------------------------------------------------------------------------
+
+def plan_assignments(seed, num_students, num_questions, num_versions, difficulties=None, students=None):
+    """
+    Plans the questions and versions of every exam at once. Each exam has ``num_questions`` distinct
+    questions. The plan satisfies these constraints:
+
+    * questions are used evenly (see ``plan_questions``)
+    * every question's versions are used evenly: taking the students that receive a question in 
+      order, each consecutive group of as many students as the question has versions is assigned 
+      every version once
+    * students with adjacent indices (e.g. adjacent seats) are never assigned the same version of a
+      question with more than one version
+    * if ``difficulties`` is given, the questions are partitioned into one stratum of similar
+      difficulty per question slot, from easiest to hardest, and each slot is filled from its stratum
+      evenly, so that every exam has the same difficulty profile
+
+    The plan for a student depends only on ``seed`` and the blocks of students around it, so any subset
+    of ``students`` can be planned without planning the others.
+
+    Args:
+        seed (``int``): the exam seed
+        num_students (``int``): the number of students
+        num_questions (``int``): the number of questions on each exam
+        num_versions (``list`` of ``int``): the number of versions of each question
+        difficulties (``list`` of ``float``, optional): the difficulty of each question
+        students (``numpy.ndarray``, optional): the indices of the students to plan; defaults to all
+            students
+
+    Returns:
+        ``tuple`` of ``numpy.ndarray``: the question indices and version indices of each student's
+        exam, each with one row per student and one column per question slot
+
+    Raises:
+        ``AssertionError``: if there are fewer questions than ``num_questions``
+    """
+    num_total = len(num_versions)
+    assert 0 <= num_questions <= num_total, \
+        f"Cannot choose {num_questions} questions from {num_total} questions"
+    if students is None:
+        students = np.arange(num_students)
+    students = np.asarray(students, dtype=np.int64)
+
+    if difficulties is None or num_questions == 0:
+        questions, ranks = plan_questions(seed, num_questions, num_total, students)
+    else:
+        questions, ranks = plan_stratified_questions(seed, num_questions, difficulties, students)
+
+    # choose versions by each student's rank among the students receiving the same question, so that 
+    # consecutive recipients, including any adjacent students, get different versions
+    versions = np.zeros_like(questions)
+    for q, size in enumerate(num_versions):
+        received = questions == q
+        versions[received] = balanced_choices(seed, (VERSION_STREAM, q), size, ranks[received])
+
+    return questions, versions
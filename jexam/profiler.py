@@ -0,0 +1,250 @@
+##########################
+##### jExam Profiler #####
+##########################
+
+import os
+import json
+import time
+import cProfile
+import pathlib
+import sys
+
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+#---------------------------------------------------------------------------------------------------
+# GLOBAL VARIABLES
+#---------------------------------------------------------------------------------------------------
+
+REPORT_FILE = "report.json"
+TRACE_FILE = "trace.json"
+CPROFILE_FILE = "cprofile.prof"
+
+# the profiler of this process; ``None`` if profiling is disabled
+_profiler = None
+
+# returned by ``phase`` when profiling is disabled
+_NULL_PHASE = nullcontext()
+
+
+#---------------------------------------------------------------------------------------------------
+# PROFILER
+#---------------------------------------------------------------------------------------------------
+
+class Profiler:
+    """
+    Records the time spent in each phase of a build and counts of the objects it processed. Each
+    phase is recorded both as a total and as a Chrome trace event, so that the phases of a build can be
+    viewed as a timeline (e.g. in ``chrome://tracing`` or Perfetto). Profilers in worker processes
+    share the origin of the parent profiler and send their records to it with ``drain`` and
+    ``merge``.
+
+    Args:
+        origin (``float``, optional): the ``time.perf_counter`` value at which the build started;
+            defaults to now
+
+    Attributes:
+        origin (``float``): the ``time.perf_counter`` value at which the build started
+        events (``list`` of ``dict``): the Chrome trace events of the phases
+        phases (``dict``): the number of times each phase ran and the total seconds spent in it
+        counts (``dict``): counts of the objects processed, keyed by name
+    """
+    def __init__(self, origin=None):
+        self.origin = time.perf_counter() if origin is None else origin
+        self.events = []
+        self.phases = {}
+        self.counts = {}
+
+    @contextmanager
+    def phase(self, name, **args):
+        """
+        Records the time spent in the body of a ``with`` statement as the phase ``name``.
+
+        Args:
+            name (``str``): the name of the phase
+            **args: details of the phase to include in its trace event
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            event = {
+                "name": name,
+                "ph": "X",
+                "ts": (start - self.origin) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": os.getpid(),
+                "tid": 0,
+            }
+            if args:
+                event["args"] = args
+            self.events.append(event)
+            count, seconds = self.phases.get(name, (0, 0.0))
+            self.phases[name] = (count + 1, seconds + end - start)
+
+    def count(self, name, n=1):
+        """
+        Adds ``n`` to the count ``name``.
+
+        Args:
+            name (``str``): the name of the count
+            n (``int``, optional): the amount to add
+        """
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def drain(self):
+        """
+        Returns and clears the records of this profiler, e.g. to send them to the parent process.
+
+        Returns:
+            ``tuple``: the events, phases, and counts
+        """
+        records = (self.events, self.phases, self.counts)
+        self.events, self.phases, self.counts = [], {}, {}
+        return records
+
+    def merge(self, records):
+        """
+        Adds records returned by the ``drain`` method of another profiler to this one.
+
+        Args:
+            records (``tuple``): the events, phases, and counts
+        """
+        events, phases, counts = records
+        self.events.extend(events)
+        for name, (count, seconds) in phases.items():
+            total_count, total_seconds = self.phases.get(name, (0, 0.0))
+            self.phases[name] = (total_count + count, total_seconds + seconds)
+        for name, n in counts.items():
+            self.count(name, n)
+
+    def report(self):
+        """
+        Returns a summary of the build: its wall time, the count and total seconds of each phase, the
+        counts, and the peak resident memory of this process and of its (finished) worker processes
+        if available. Phases that run inside other phases are included in both.
+
+        Returns:
+            ``dict``: the report
+        """
+        report = {
+            "wall_seconds": time.perf_counter() - self.origin,
+            "phases": {
+                name: {"count": count, "seconds": seconds}
+                for name, (count, seconds) in sorted(self.phases.items(), key=lambda p: -p[1][1])
+            },
+            "counts": dict(sorted(self.counts.items())),
+        }
+        if resource is not None:
+            # ru_maxrss is in kilobytes on Linux and bytes on macOS
+            scale = 1 if sys.platform == "darwin" else 1024
+            report["peak_memory_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+            report["peak_worker_memory_bytes"] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+        return report
+
+    def write(self, directory, cprofile=None):
+        """
+        Writes the report to ``{{ directory }}/report.json``, the Chrome trace to
+        ``{{ directory }}/trace.json``, and the stats of ``cprofile`` (if given) to
+        ``{{ directory }}/cprofile.prof``.
+
+        Args:
+            directory (``pathlib.Path``): the directory to write to
+            cprofile (``cProfile.Profile``, optional): a profile of this process
+
+        Returns:
+            ``dict``: the report
+        """
+        directory = pathlib.Path(directory)
+        os.makedirs(directory, exist_ok=True)
+        report = self.report()
+        with open(directory / REPORT_FILE, "w") as f:
+            json.dump(report, f, indent=1)
+        with open(directory / TRACE_FILE, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+        if cprofile is not None:
+            cprofile.dump_stats(str(directory / CPROFILE_FILE))
+        return report
+
+
+#---------------------------------------------------------------------------------------------------
+# PROCESS PROFILER
+#---------------------------------------------------------------------------------------------------
+
+def get_profiler():
+    """
+    Returns the profiler of this process, or ``None`` if profiling is disabled.
+
+    Returns:
+        ``Profiler`` or ``None``: the profiler
+    """
+    return _profiler
+
+def set_profiler(profiler):
+    """
+    Sets the profiler of this process. Passing ``None`` disables profiling.
+
+    Args:
+        profiler (``Profiler`` or ``None``): the profiler
+    """
+    global _profiler
+    _profiler = profiler
+
+@contextmanager
+def profiling(directory, cprofile=False):
+    """
+    Profiles the body of a ``with`` statement with a new process profiler and then writes its results
+    to ``directory`` (see ``Profiler.write``).
+
+    Args:
+        directory (``str`` or ``pathlib.Path``): the directory to write the results to
+        cprofile (``bool``, optional): whether to also profile this process with cProfile
+
+    Yields:
+        ``Profiler``: the profiler
+    """
+    build_profiler = Profiler()
+    cprofile = cProfile.Profile() if cprofile else None
+    set_profiler(build_profiler)
+    if cprofile is not None:
+        cprofile.enable()
+    try:
+        yield build_profiler
+    finally:
+        if cprofile is not None:
+            cprofile.disable()
+        set_profiler(None)
+        build_profiler.write(directory, cprofile=cprofile)
+
+def phase(name, **args):
+    """
+    Returns a context manager that records its body as the phase ``name`` with the profiler of this
+    process, or does nothing if profiling is disabled.
+
+    Args:
+        name (``str``): the name of the phase
+        **args: details of the phase to include in its trace event
+
+    Returns:
+        context manager: the phase
+    """
+    if _profiler is None:
+        return _NULL_PHASE
+    return _profiler.phase(name, **args)
+
+def count(name, n=1):
+    """
+    Adds ``n`` to the count ``name`` of the profiler of this process, if profiling is enabled.
+
+    Args:
+        name (``str``): the name of the count
+        n (``int``, optional): the amount to add
+    """
+    if _profiler is not None:
+        _profiler.count(name, n)
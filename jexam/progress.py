@@ -0,0 +1,157 @@
+########################################
+##### Progress Reporting for jExam #####
+########################################
+
+import sys
+import json
+import time
+import threading
+
+
+#---------------------------------------------------------------------------------------------------
+# PROGRESS TRACKER
+#---------------------------------------------------------------------------------------------------
+
+class ProgressTracker:
+    """
+    Tracks the progress of the phases of a build and emits events to callbacks. Each event is a
+    ``dict`` with the keys
+
+    * ``event``: ``"start"``, ``"progress"``, or ``"finish"``
+    * ``phase``: the name of the phase, e.g. ``"exams"``
+    * ``done`` and ``total``: the number of units done and the total number of units in the phase, or
+      ``None`` if unknown
+    * ``bytes``: the number of bytes written in the phase
+    * ``elapsed``: the seconds since the phase started
+    * ``rate`` and ``bytes_per_second``: the units and bytes done per second in the phase
+    * ``eta``: the estimated seconds until the phase finishes, or ``None`` if unknown
+    * ``time``: the Unix time of the event
+    * ``build``: the name of the build, if the tracker has one
+
+    Only one phase is tracked at a time.
+
+    Args:
+        callbacks (iterable of callable, optional): functions called with each event
+        name (``str``, optional): the name of the build, e.g. to tell apart the events of concurrent
+            builds that share callbacks
+
+    Attributes:
+        callbacks (``list`` of callable): functions called with each event
+        name (``str``): the name of the build, or ``None``
+    """
+    def __init__(self, callbacks=(), name=None):
+        self.callbacks = list(callbacks)
+        self.name = name
+        self.phase = None
+
+    def add_callback(self, callback):
+        """
+        Adds a function to call with each event.
+
+        Args:
+            callback (callable): the function
+        """
+        self.callbacks.append(callback)
+
+    def _emit(self, event):
+        if not self.callbacks:
+            return
+        elapsed = time.perf_counter() - self.start_time
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.total is not None and rate > 0:
+            eta = (self.total - self.done) / rate
+        event = {
+            "event": event,
+            "phase": self.phase,
+            "done": self.done,
+            "total": self.total,
+            "bytes": self.bytes,
+            "elapsed": elapsed,
+            "rate": rate,
+            "bytes_per_second": self.bytes / elapsed if elapsed > 0 else 0.0,
+            "eta": eta,
+            "time": time.time(),
+        }
+        if self.name is not None:
+            event["build"] = self.name
+        for callback in self.callbacks:
+            callback(event)
+
+    def start(self, phase, total=None):
+        """
+        Starts a phase, finishing the current phase if there is one.
+
+        Args:
+            phase (``str``): the name of the phase
+            total (``int``, optional): the total number of units in the phase
+        """
+        if self.phase is not None:
+            self.finish()
+        self.phase, self.total = phase, total
+        self.done, self.bytes = 0, 0
+        self.start_time = time.perf_counter()
+        self._emit("start")
+
+    def update(self, n=1, nbytes=0):
+        """
+        Records progress in the current phase.
+
+        Args:
+            n (``int``, optional): the number of units done
+            nbytes (``int``, optional): the number of bytes written
+        """
+        self.done += n
+        self.bytes += nbytes
+        self._emit("progress")
+
+    def finish(self):
+        """
+        Finishes the current phase.
+        """
+        if self.phase is None:
+            return
+        self._emit("finish")
+        self.phase = None
+
+
+#---------------------------------------------------------------------------------------------------
+# SINKS
+#---------------------------------------------------------------------------------------------------
+
+class JSONLinesSink:
+    """
+    A progress callback that writes events as JSON lines, flushing after each line. ``start`` and
+    ``finish`` events are always written; ``progress`` events are written at most once every
+    ``interval`` seconds per phase of each build. Events may be sent from several threads.
+
+    Args:
+        path (``str``): the path of the file to write to, or ``"-"`` for stdout
+        interval (``float``, optional): the minimum number of seconds between ``progress`` events
+    """
+    def __init__(self, path, interval=1.0):
+        self.file = sys.stdout if path == "-" else open(path, "w")
+        self.interval = interval
+        self.last_progress = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, event):
+        build = event.get("build")
+        with self.lock:
+            if event["event"] == "progress":
+                now = time.perf_counter()
+                last = self.last_progress.get(build)
+                if last is not None and now - last < self.interval:
+                    return
+                self.last_progress[build] = now
+            else:
+                self.last_progress.pop(build, None)
+            self.file.write(json.dumps(event) + "\n")
+            self.file.flush()
+
+    def close(self):
+        """
+        Closes the file written to, unless it is stdout.
+        """
+        if self.file is not sys.stdout:
+            self.file.close()
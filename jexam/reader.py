@@ -0,0 +1,272 @@
+#####################################
+##### Notebook Reader for jExam #####
+#####################################
+
+import io
+import json
+import nbformat
+
+from nbformat.v4.rwbase import rejoin_lines, strip_transient
+
+from . import profiler
+
+
+#---------------------------------------------------------------------------------------------------
+# GLOBAL VARIABLES
+#---------------------------------------------------------------------------------------------------
+
+# the number of characters read from a notebook at a time
+CHUNK_SIZE = 1 << 16
+
+JSON_WHITESPACE = " \t\n\r"
+
+# the notebook format read cell by cell; other formats are converted by nbformat
+NBFORMAT = 4
+
+# the cell types of format v4 and the fields that each must have, with their types
+CELL_FIELDS = {
+    "code": {"source": (str, list), "metadata": dict, "outputs": list, "execution_count": (int, type(None))},
+    "markdown": {"source": (str, list), "metadata": dict},
+    "raw": {"source": (str, list), "metadata": dict},
+}
+
+
+#---------------------------------------------------------------------------------------------------
+# JSON STREAM
+#---------------------------------------------------------------------------------------------------
+
+class JSONStream:
+    """
+    Decodes JSON values one at a time from a text stream, keeping only the unread part of the stream
+    in memory. A value is decoded once the buffer holds all of it, so the buffer grows to at most the
+    size of the largest value read.
+
+    Args:
+        fp (file-like object): the text stream
+        chunk_size (``int``, optional): the number of characters to read at a time
+
+    Attributes:
+        buffer (``str``): the characters read from ``fp`` but not yet decoded
+        eof (``bool``): whether all of ``fp`` has been read
+    """
+    def __init__(self, fp, chunk_size=CHUNK_SIZE):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self):
+        """
+        Reads more of the stream into the buffer, discarding the characters already decoded. Reads at
+        least as many characters as are buffered so that decoding a large value takes linear time.
+
+        Returns:
+            ``bool``: whether any characters were read
+        """
+        data = self.fp.read(max(self.chunk_size, len(self.buffer) - self.pos))
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        if not data:
+            self.eof = True
+        return bool(data)
+
+    def peek(self):
+        """
+        Skips whitespace and returns the next character without consuming it.
+
+        Returns:
+            ``str``: the next character, or an empty string at the end of the stream
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in JSON_WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, chars):
+        """
+        Skips whitespace and consumes the next character, which must be in ``chars``.
+
+        Args:
+            chars (``str``): the allowed characters
+
+        Returns:
+            ``str``: the character consumed
+
+        Raises:
+            ``ValueError``: if the next character is not in ``chars``
+        """
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Expected one of {chars!r} at {char!r} while reading notebook")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """
+        Skips whitespace and decodes the next JSON value.
+
+        Returns:
+            the decoded value
+
+        Raises:
+            ``json.JSONDecodeError``: if the value is invalid
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof or not self.fill():
+                    raise
+                continue
+            # a number may continue past the end of the buffer
+            if end == len(self.buffer) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+#---------------------------------------------------------------------------------------------------
+# NOTEBOOK READER
+#---------------------------------------------------------------------------------------------------
+
+def iter_cells(fp, fields=None, chunk_size=CHUNK_SIZE):
+    """
+    Reads a notebook's JSON from a text stream one cell at a time, yielding each cell as it is read.
+    The notebook's other top-level fields are added to ``fields`` as they are read, with ``cells`` set 
+    to an empty list since the cells are yielded instead. Reading stops as
+    soon as the notebook is found not to be in format v4, i.e. at a ``worksheets`` field or an 
+    ``nbformat`` other than 4, so that the rest of the stream is not decoded.
+
+    Args:
+        fp (file-like object): the text stream
+        fields (``dict``, optional): a dictionary to add the notebook's other fields to
+        chunk_size (``int``, optional): the number of characters to read at a time
+
+    Yields:
+        ``dict``: the JSON of each cell
+
+    Raises:
+        ``ValueError``: if the notebook JSON is invalid
+    """
+    stream = JSONStream(fp, chunk_size=chunk_size)
+    if fields is None:
+        fields = {}
+    stream.expect("{")
+    if stream.peek() == "}":
+        stream.expect("}")
+    else:
+        while True:
+            key = stream.value()
+            stream.expect(":")
+            if key == "cells":
+                fields[key] = []
+                stream.expect("[")
+                if stream.peek() == "]":
+                    stream.expect("]")
+                else:
+                    while True:
+                        yield stream.value()
+                        if stream.expect(",]") == "]":
+                            break
+            elif key == "worksheets":
+                # the cells of notebooks before v4
+                return
+            else:
+                fields[key] = stream.value()
+                if key == "nbformat" and fields[key] != NBFORMAT:
+                    return
+            if stream.expect(",}") == "}":
+                break
+
+def validate_cell(cell, index):
+    """
+    Checks that a cell's JSON has a valid type and the fields of that type (see ``CELL_FIELDS``).
+
+    Args:
+        cell (``dict``): the JSON of the cell
+        index (``int``): the index of the cell in the notebook, used in errors
+
+    Raises:
+        ``ValueError``: if the cell is invalid
+    """
+    if not isinstance(cell, dict):
+        raise ValueError(f"Notebook JSON is invalid: cell {index} is not an object")
+    cell_type = cell.get("cell_type")
+    if cell_type not in CELL_FIELDS:
+        raise ValueError(f"Notebook JSON is invalid: cell {index} has invalid type {cell_type!r}")
+    for field, types in CELL_FIELDS[cell_type].items():
+        if field not in cell:
+            raise ValueError(f"Notebook JSON is invalid: {cell_type} cell {index} has no {field}")
+        if not isinstance(cell[field], types) or isinstance(cell[field], bool):
+            raise ValueError(f"Notebook JSON is invalid: {field} of {cell_type} cell {index} is invalid")
+    if isinstance(cell["source"], list) and not all(isinstance(line, str) for line in cell["source"]):
+        raise ValueError(f"Notebook JSON is invalid: source of {cell_type} cell {index} is invalid")
+
+def validate_fields(fields):
+    """
+    Checks the top-level fields of a v4 notebook's JSON as read by ``iter_cells``.
+
+    Args:
+        fields (``dict``): the top-level fields
+
+    Raises:
+        ``ValueError``: if the fields are invalid
+    """
+    if "cells" not in fields:
+        raise ValueError("Notebook JSON is invalid: notebook has no cells")
+    if not isinstance(fields.get("metadata"), dict):
+        raise ValueError("Notebook JSON is invalid: notebook has no metadata")
+    minor = fields.get("nbformat_minor")
+    if not isinstance(minor, int) or isinstance(minor, bool) or minor < 0:
+        raise ValueError(f"Notebook JSON is invalid: nbformat_minor {minor!r} is invalid")
+
+def read_notebook(path, keep_outputs=None, chunk_size=CHUNK_SIZE):
+    """
+    Reads a notebook cell by cell, as ``nbformat.read`` does with ``as_version=4`` but without holding
+    the notebook's whole JSON in memory. If ``keep_outputs`` is given, the outputs of each cell for
+    which it returns ``False`` are discarded as soon as the cell is read, so peak memory scales with
+    the largest cell rather than the whole notebook. Notebooks in formats other than v4 are read,
+    validated, and converted with ``nbformat.read`` instead, as soon as their format is known. v4 
+    notebooks are checked for the fields that jExam uses (see ``validate_cell`` and 
+    ``validate_fields``) rather than validated against the full schema; unlike ``nbformat.read``, 
+    which only logs schema errors, a notebook without these fields is an error.
+
+    Args:
+        path (``str`` or ``pathlib.Path``): the path to the notebook
+        keep_outputs (callable, optional): a function that takes a cell's JSON and returns whether to
+            keep its outputs; defaults to keeping all outputs
+        chunk_size (``int``, optional): the number of characters to read at a time
+
+    Returns:
+        ``nbformat.NotebookNode``: the notebook
+
+    Raises:
+        ``ValueError``: if the notebook JSON is invalid
+    """
+    cells, fields, discarded = [], {}, 0
+    with io.open(path, encoding="utf-8") as f:
+        for cell in iter_cells(f, fields, chunk_size=chunk_size):
+            validate_cell(cell, len(cells))
+            if keep_outputs is not None and cell.get("outputs") and not keep_outputs(cell):
+                discarded += len(cell["outputs"])
+                cell["outputs"] = []
+            cells.append(nbformat.from_dict(cell))
+
+    if fields.get("nbformat") != NBFORMAT:
+        nb = nbformat.read(path, as_version=4)
+        for cell in nb.cells:
+            if keep_outputs is not None and cell.get("outputs") and not keep_outputs(cell):
+                discarded += len(cell.outputs)
+                cell.outputs = []
+    else:
+        validate_fields(fields)
+        nb = nbformat.from_dict(fields)
+        nb.cells = cells
+        nb = strip_transient(rejoin_lines(nb))
+
+    profiler.count("discarded outputs", discarded)
+    return nb
@@ -0,0 +1,344 @@
+########################
+##### jExam Server #####
+########################
+
+import os
+import hmac
+import json
+import stat
+import time
+import secrets
+import argparse
+import threading
+import socketserver
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .parser import build, load_exam
+
+
+#---------------------------------------------------------------------------------------------------
+# EXAM CACHE
+#---------------------------------------------------------------------------------------------------
+
+class ExamCache:
+    """
+    Keeps parsed master notebooks in memory, keyed by their absolute path and autograder format. A
+    master is parsed again if its modification time or size has changed since it was parsed. The lock
+    is only held to look up and insert exams, so masters are parsed concurrently.
+
+    Attributes:
+        exams (``dict``): the ``(mtime, size)`` stamp and ``jexam.parser.Exam`` of each master, keyed
+            by ``(path, autograder format)``
+    """
+    def __init__(self):
+        self.exams = {}
+        self.lock = threading.Lock()
+
+    def get(self, master, autograder_format="otter"):
+        """
+        Returns the parsed exam of a master notebook, parsing it if it is not cached or has changed.
+
+        Args:
+            master (``str``): the path to the master notebook
+            autograder_format (``str``, optional): the autograder output format; either "otter" or
+                "ok"
+
+        Returns:
+            ``tuple`` of ``jexam.parser.Exam`` and ``bool``: the exam and whether it was cached
+        """
+        path = os.path.abspath(master)
+        st = os.stat(path)
+        key, stamp = (path, autograder_format), (st.st_mtime_ns, st.st_size)
+        with self.lock:
+            entry = self.exams.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1], True
+
+        # parse without holding the lock so that requests for other masters are not blocked
+        exam = load_exam(path, autograder_format=autograder_format)
+        with self.lock:
+            self.exams[key] = (stamp, exam)
+        return exam, False
+
+    def masters(self):
+        """
+        Returns the paths and formats of the cached master notebooks.
+
+        Returns:
+            ``list`` of ``dict``: the ``master`` and ``format`` of each cached exam
+        """
+        with self.lock:
+            return [{"master": path, "format": fmt} for path, fmt in sorted(self.exams)]
+
+
+#---------------------------------------------------------------------------------------------------
+# REQUEST HANDLING
+#---------------------------------------------------------------------------------------------------
+
+# the hosts that requests to a TCP server may be addressed to, with the server's port; other hosts
+# are rejected so that web pages cannot reach the server by rebinding their domain to 127.0.0.1
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "[::1]")
+
+# the number of random bytes in the token that TCP clients must send
+TOKEN_BYTES = 32
+
+# the fields of a build request and their defaults; ``master`` is required
+BUILD_FIELDS = {
+    "master": None,
+    "result": "dist",
+    "format": "otter",
+    "seed": None,
+    "jobs": 1,
+    "incremental": False,
+    "students": None,
+    "link": False,
+    "export": None,
+    "export_autograder": False,
+}
+
+def handle_build(cache, request):
+    """
+    Builds a master notebook for a request, using the parsed exam in ``cache``. The request is a
+    ``dict`` with the keys of ``BUILD_FIELDS``, which have the same meanings as the command-line
+    arguments of ``jexam``.
+
+    Args:
+        cache (``ExamCache``): the cache of parsed master notebooks
+        request (``dict``): the request
+
+    Returns:
+        ``dict``: the response
+
+    Raises:
+        ``ValueError``: if the request has unknown fields or no master notebook
+    """
+    unknown = set(request) - set(BUILD_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    if not request.get("master"):
+        raise ValueError("No master notebook given")
+
+    start = time.perf_counter()
+    args = argparse.Namespace(**{**BUILD_FIELDS, **request, "quiet": True})
+    exam, cached = cache.get(args.master, args.format)
+    build(args, exam=exam)
+    return {
+        "master": args.master,
+        "result": args.result,
+        "cached": cached,
+        "seconds": time.perf_counter() - start,
+    }
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """
+    Answers the requests of a jExam server:
+
+    * ``GET /status``: the cached master notebooks and the server's uptime
+    * ``POST /build``: builds a master notebook from a JSON request (see ``handle_build``), which must
+      be sent with ``Content-Type: application/json``
+
+    Requests to a TCP server must be addressed to a local host (see ``LOCAL_HOSTS``) and send the
+    server's token as ``Authorization: Bearer {{ token }}``. This stops web pages open in a browser 
+    on the same machine from building exams with forged requests.
+
+    Responses are JSON objects; errors have the key ``error`` and status 400 for invalid requests,
+    401 for a missing or wrong token, 403 for a non-local host, 415 for a body that is not JSON, or
+    500 for failed builds.
+    """
+    def send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def check_request(self):
+        """
+        Checks the host and token of a request to a TCP server, sending an error response if either is
+        invalid. Requests over a Unix socket are protected by the socket's permissions instead.
+
+        Returns:
+            ``bool``: whether the request may be answered
+        """
+        if self.server.token is None:
+            return True
+        port = self.server.server_address[1]
+        if self.headers.get("Host") not in [f"{host}:{port}" for host in LOCAL_HOSTS]:
+            self.send_json(403, {"error": f"Host {self.headers.get('Host')} not allowed"})
+            return False
+        if not hmac.compare_digest(self.headers.get("Authorization", ""), f"Bearer {self.server.token}"):
+            self.send_json(401, {"error": "Missing or invalid token"})
+            return False
+        return True
+
+    def do_GET(self):
+        if not self.check_request():
+            return
+        if self.path != "/status":
+            self.send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        self.send_json(200, {
+            "masters": self.server.cache.masters(),
+            "uptime": time.time() - self.server.start_time,
+        })
+
+    def do_POST(self):
+        if not self.check_request():
+            return
+        if self.path != "/build":
+            self.send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        # browsers send forms and text/plain bodies to any host without asking it first
+        content_type = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type != "application/json":
+            self.send_json(415, {"error": "Requests must have Content-Type application/json"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+            response = handle_build(self.server.cache, request)
+        except (AssertionError, ValueError, KeyError, OSError) as e:
+            self.send_json(400, {"error": f"{type(e).__name__}: {e}"})
+        except Exception as e:
+            self.send_json(500, {"error": f"{type(e).__name__}: {e}"})
+        else:
+            self.send_json(200, response)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else self.server.address
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+#---------------------------------------------------------------------------------------------------
+# SERVERS
+#---------------------------------------------------------------------------------------------------
+
+class ServerMixin:
+    """
+    Adds the exam cache and settings of a jExam server to a ``socketserver`` server.
+    """
+    daemon_threads = True
+    cache = None
+    verbose = False
+    token = None
+
+    def setup_jexam(self, cache, verbose, token=None):
+        self.cache = cache
+        self.verbose = verbose
+        self.token = token
+        self.start_time = time.time()
+
+    @property
+    def address(self):
+        """
+        ``str``: the address that the server listens on
+        """
+        if isinstance(self.server_address, tuple):
+            host, port = self.server_address[:2]
+            return f"http://{host}:{port}"
+        return self.server_address
+
+class HTTPServer(ServerMixin, ThreadingHTTPServer):
+    """
+    A jExam server listening on a TCP port.
+    """
+
+class UnixHTTPServer(ServerMixin, socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    A jExam server listening on a Unix socket.
+    """
+
+def make_server(port=8000, host="127.0.0.1", socket_path=None, cache=None, verbose=False, token=None):
+    """
+    Creates a jExam server that listens on ``socket_path`` if it is given or on ``host:port``
+    otherwise. The Unix socket is only accessible to the current user; a stale socket at 
+    ``socket_path`` is replaced, but any other file there is an error. Clients of a TCP server must 
+    send ``token`` (see ``RequestHandler``); a random token is generated if none is given.
+
+    Args:
+        port (``int``, optional): the TCP port; 0 picks a free port
+        host (``str``, optional): the TCP host
+        socket_path (``str``, optional): the path of a Unix socket
+        cache (``ExamCache``, optional): the cache of parsed master notebooks
+        verbose (``bool``, optional): whether to log requests
+        token (``str``, optional): the token that clients of a TCP server must send
+
+    Returns:
+        ``HTTPServer`` or ``UnixHTTPServer``: the server
+
+    Raises:
+        ``FileExistsError``: if ``socket_path`` exists and is not a socket
+    """
+    if socket_path is not None:
+        if os.path.lexists(socket_path):
+            if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+                raise FileExistsError(f"{socket_path} exists and is not a socket")
+            os.remove(socket_path)
+        # create the socket without access for other users rather than restricting it after binding
+        umask = os.umask(0o177)
+        try:
+            server = UnixHTTPServer(socket_path, RequestHandler)
+        finally:
+            os.umask(umask)
+        token = None
+    else:
+        server = HTTPServer((host, port), RequestHandler)
+        if token is None:
+            token = secrets.token_urlsafe(TOKEN_BYTES)
+    server.setup_jexam(cache or ExamCache(), verbose, token)
+    return server
+
+def write_token(path, token):
+    """
+    Writes the token of a TCP server to ``path``, readable and writable only by the current user.
+
+    Args:
+        path (``str``): the path of the token file
+        token (``str``): the token
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        # the file may have existed with other permissions
+        os.fchmod(f.fileno(), 0o600)
+        f.write(token)
+
+def serve(args):
+    """
+    Runs ``jexam serve``: parses the master notebooks in ``args.masters`` and then answers requests
+    until interrupted. The server listens on the Unix socket ``args.socket`` unless ``args.tcp`` is 
+    true, in which case it listens on ``args.host:args.port`` and writes the token that clients must 
+    send to ``args.token_file``.
+
+    Args:
+        args (``argparse.Namespace``): parsed command-line arguments for ``jexam serve``
+    """
+    cache = ExamCache()
+    for master in args.masters:
+        cache.get(master, args.format)
+
+    socket_path = None if args.tcp else args.socket
+    server = make_server(args.port, args.host, socket_path, cache, args.verbose)
+    if server.token is not None:
+        write_token(args.token_file, server.token)
+    if not args.quiet:
+        print(f"Serving on {server.address}")
+        if server.token is not None:
+            print(f"Token written to {args.token_file}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path is not None and os.path.exists(socket_path):
+            os.remove(socket_path)
+        if server.token is not None and os.path.exists(args.token_file):
+            os.remove(args.token_file)
@@ -2,6 +2,33 @@
 ##### jExam Utilities #####
 ###########################
 
+import threading
+import multiprocessing
+
+# lines that continue the previous statement even though they are not indented
+CONTINUATION_PREFIXES = ("except:", "elif ", "else:", "finally:")
+
+def iter_doctest(code_lines, previous=None):
+    """
+    Converts lines of Python code ``code_lines`` to doctest-formatted lines one at a time. Indented 
+    lines, ``except``/``elif``/``else``/``finally`` clauses, and lines following a backslash are 
+    prefixed with ``...``; all other lines are prefixed with ``>>>``.
+
+    Args:
+        code_lines (iterable of ``str``): lines of python code
+        previous (``str``, optional): the doctest line preceding ``code_lines``, if any
+    
+    Yields:
+        ``str``: doctest formatted lines
+    """
+    for line in code_lines:
+        if line.startswith((" ", "\t")) or line.startswith(CONTINUATION_PREFIXES) or \
+                (previous is not None and previous.strip().endswith("\\")):
+            previous = "... " + line
+        else:
+            previous = ">>> " + line
+        yield previous
+
 def str_to_doctest(code_lines, lines):
     """
     Converts a list of lines of Python code ``code_lines`` to a list of doctest-formatted lines ``lines``
@@ -13,74 +40,18 @@ def str_to_doctest(code_lines, lines):
     Returns:
         ``list`` of ``str``: doctest formatted list of lines
     """
-    if len(code_lines) == 0:
-        return lines
-    line = code_lines.pop(0)
-    if line.startswith(" ") or line.startswith("\t"):
-        return str_to_doctest(code_lines, lines + ["... " + line])
-    elif line.startswith("except:") or line.startswith("elif ") or line.startswith("else:") or line.startswith("finally:"):
-        return str_to_doctest(code_lines, lines + ["... " + line])
-    elif len(lines) > 0 and lines[-1].strip().endswith("\\"):
-        return str_to_doctest(code_lines, lines + ["... " + line])
-    else:
-        return str_to_doctest(code_lines, lines + [">>> " + line])
+    return lines + list(iter_doctest(code_lines, lines[-1] if lines else None))
 
-def generate(result, config):
+def get_mp_context():
     """
-    Runs Otter Generate on the directory ``result`` using the configurations provided in ``config``.
-
-    Args:
-        result (``pathlib.Path``): the path to the autograder directory
-        config (``dict``): configurations for Otter Generate
+    Returns the ``multiprocessing`` context for worker process pools. Forking a process while other 
+    threads are running (e.g. concurrent builds in ``jexam batch`` or ``jexam serve``) can copy locks
+    that those threads hold, such as logging and import locks, and deadlock the child; in that case,
+    workers are started with ``"spawn"`` instead of the platform's default method.
 
-    Raises:
-        ``ImportError``: if Otter is not installed
+    Returns:
+        ``multiprocessing.context.BaseContext``: the context
     """
-    try:
-        from otter.argparser import get_parser
-        parser = get_parser()
-    except ImportError:
-        raise ImportError("You must have otter-grader installed to generate a Gradescope zip file.")
-    
-    curr_dir = os.getcwd()
-    os.chdir(result)
-    generate_cmd = ["generate", "autograder"]
-
-    if config.get('points', None) is not None:
-        generate_cmd += ["--points", config.get('points', None)]
-    
-    if config.get('threshold', None) is not None:
-        generate_cmd += ["--threshold", config.get('threshold', None)]
-    
-    if config.get('show_stdout', False):
-        generate_cmd += ["--show-stdout"]
-    
-    if config.get('show_hidden', False):
-        generate_cmd += ["--show-hidden"]
-    
-    if config.get('grade_from_log', False):
-        generate_cmd += ["--grade-from-log"]
-    
-    if config.get('seed', None) is not None:
-        generate_cmd += ["--seed", str(config.get('seed', None))]
-
-    if config.get('pdfs', {}):
-        pdf_args = config.get('pdfs', {})
-        token = APIClient.get_token()
-        generate_cmd += ["--token", token]
-        generate_cmd += ["--course-id", str(pdf_args["course_id"])]
-        generate_cmd += ["--assignment-id", str(pdf_args["assignment_id"])]
-
-        if not pdf_args.get("filtering", True):
-            generate_cmd += ["--unfiltered-pdfs"]
-    
-    if config.get('files', []):
-        generate_cmd += config.get('files', [])
-
-    if config.get('variables', {}):
-        generate_cmd += ["--serialized-variables", str(config["variables"])]
-    
-    args = parser.parse_args(generate_cmd)
-    args.func(args)
-
-    os.chdir(curr_dir)
+    if threading.active_count() > 1:
+        return multiprocessing.get_context("spawn")
+    return multiprocessing.get_context()
@@ -0,0 +1,95 @@
+################################
+##### Watch Mode for jExam #####
+################################
+
+import os
+import time
+import argparse
+
+from .output import get_archive_mode
+from .parser import build, load_exam
+
+
+#---------------------------------------------------------------------------------------------------
+# WATCHER
+#---------------------------------------------------------------------------------------------------
+
+class Watcher:
+    """
+    Rebuilds a master notebook whenever it changes. Each rebuild is incremental: versions whose
+    cells are unchanged are reused from the previous parse with their stripped cells, rendered tests,
+    and encoded fragments, and only the autograder notebook, tests, and exams whose inputs changed are
+    rewritten (see ``jexam.cache``).
+
+    Args:
+        args (``argparse.Namespace``): parsed command-line arguments; ``args.incremental`` is ignored
+
+    Raises:
+        ``AssertionError``: if ``args.result`` is an archive, which incremental builds cannot update, or
+            ``args.profile`` or ``args.progress`` is given, which only single builds support
+
+    Attributes:
+        args (``argparse.Namespace``): the arguments for each build
+        stamp (``tuple``): the modification time and size of the master notebook at the last build
+        version_cache (``dict``): the versions of the last parse, keyed by content hash
+        reused (``int``): the number of versions reused by the last build
+    """
+    def __init__(self, args):
+        assert get_archive_mode(args.result) is None, "Watching requires a directory result"
+        assert args.profile is None, "--profile is not supported with --watch"
+        assert args.progress is None, "--progress is not supported with --watch"
+        self.args = argparse.Namespace(**{**vars(args), "incremental": True})
+        self.stamp = None
+        self.version_cache = {}
+        self.reused = 0
+
+    def check(self):
+        """
+        Rebuilds the master notebook if it has changed since the last build.
+
+        Returns:
+            ``bool``: whether the notebook was rebuilt
+        """
+        st = os.stat(self.args.master)
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp == self.stamp:
+            return False
+        self.stamp = stamp
+
+        cached = set(self.version_cache)
+        exam = load_exam(self.args.master, self.args.format, version_cache=self.version_cache, 
+            jobs=self.args.jobs, strip_outputs=self.args.strip_outputs, 
+            extract_attachments=self.args.extract_attachments)
+        current = {v.get_content_hash(): v for q in exam.questions for v in q.versions}
+        self.reused = len(cached & set(current))
+        self.version_cache = current
+        build(self.args, exam=exam)
+        return True
+
+def watch(args, interval=0.5):
+    """
+    Runs ``jexam --watch``: builds the master notebook and then rebuilds it whenever it changes until
+    interrupted. Errors in the notebook are printed and the last good build is kept; unsupported 
+    arguments are rejected before watching starts (see ``Watcher``).
+
+    Args:
+        args (``argparse.Namespace``): parsed command-line arguments
+        interval (``float``, optional): the number of seconds between checks for changes
+    """
+    watcher = Watcher(args)
+    if not args.quiet:
+        print(f"Watching {args.master}")
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                rebuilt = watcher.check()
+            except (AssertionError, ValueError, OSError) as e:
+                print(f"Build failed: {e}")
+                rebuilt = False
+            if rebuilt and not args.quiet:
+                print(f"Rebuilt {args.result} in {time.perf_counter() - start:.2f}s "
+                    f"({watcher.reused} of {len(watcher.version_cache)} versions unchanged)")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
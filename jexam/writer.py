@@ -0,0 +1,133 @@
+#####################################
+##### Notebook Writer for jExam #####
+#####################################
+
+import io
+import json
+import copy
+import nbformat
+
+from nbformat.v4.nbjson import BytesEncoder
+from nbformat.v4.rwbase import split_lines, strip_transient
+from traitlets.log import get_logger
+
+
+#---------------------------------------------------------------------------------------------------
+# GLOBAL VARIABLES
+#---------------------------------------------------------------------------------------------------
+
+# the keyword arguments used by nbformat to serialize notebooks
+JSON_KWARGS = {
+    "cls": BytesEncoder,
+    "indent": 1,
+    "sort_keys": True,
+    "separators": (",", ": "),
+    "ensure_ascii": False,
+}
+
+# cells are nested two levels deep in the notebook JSON
+CELL_INDENT = "  "
+
+
+#---------------------------------------------------------------------------------------------------
+# FRAGMENTS
+#---------------------------------------------------------------------------------------------------
+
+def encode_cells(cells):
+    """
+    Validates and serializes a list of cells into notebook fragments. Each fragment is the JSON of a
+    single cell exactly as it would appear in the ``cells`` list of a notebook written by
+    ``nbformat.write``. Like ``nbformat.write``, validation errors are logged, not raised.
+
+    Args:
+        cells (``list`` of ``nbformat.NotebookNode``): the cells to encode
+
+    Returns:
+        ``list`` of ``str``: the encoded cells
+    """
+    nb = nbformat.v4.new_notebook(cells=copy.deepcopy(cells))
+    try:
+        nbformat.validate(nb)
+    except nbformat.ValidationError as e:
+        get_logger().error("Notebook JSON is invalid: %s", e)
+
+    nb = strip_transient(split_lines(nb))
+    fragments = []
+    for cell in nb.cells:
+        lines = json.dumps(cell, **JSON_KWARGS).split("\n")
+        fragments.append("\n".join(CELL_INDENT + line for line in lines))
+    return fragments
+
+def encode_cell(cell):
+    """
+    Validates and serializes a single cell into a notebook fragment. See ``encode_cells``.
+
+    Args:
+        cell (``nbformat.NotebookNode``): the cell to encode
+
+    Returns:
+        ``str``: the encoded cell
+    """
+    return encode_cells([cell])[0]
+
+
+#---------------------------------------------------------------------------------------------------
+# NOTEBOOKS
+#---------------------------------------------------------------------------------------------------
+
+class NotebookWriter:
+    """
+    Writes notebooks from pre-encoded cell fragments (as returned by ``encode_cells``) without building
+    or validating a notebook. The output is identical to that of ``nbformat.write`` for a notebook
+    made with ``nbformat.v4.new_notebook`` containing the same cells.
+
+    Args:
+        metadata (``dict``, optional): the notebook metadata
+
+    Attributes:
+        tail (``str``): the encoded notebook JSON following the ``cells`` list
+    """
+    def __init__(self, metadata=None):
+        nb = strip_transient(nbformat.v4.new_notebook(metadata=metadata or {}))
+        del nb["cells"]
+        # "cells" sorts before all other notebook keys, so the rest of the notebook follows it
+        self.tail = json.dumps(nb, **JSON_KWARGS)[len("{\n"):]
+
+    def writes(self, fragments):
+        """
+        Joins encoded cells into the JSON string of a notebook.
+
+        Args:
+            fragments (``list`` of ``str``): the encoded cells
+
+        Returns:
+            ``str``: the notebook JSON
+        """
+        if len(fragments) == 0:
+            return '{\n "cells": [],\n' + self.tail + "\n"
+        return '{\n "cells": [\n' + ",\n".join(fragments) + "\n ],\n" + self.tail + "\n"
+
+    def write(self, fragments, fp):
+        """
+        Writes a notebook made of encoded cells, streaming one fragment at a time.
+
+        Args:
+            fragments (``list`` of ``str``): the encoded cells
+            fp (file-like object or ``pathlib.Path``): a text stream or the path at which to write the
+                notebook
+        """
+        if not hasattr(fp, "write"):
+            with io.open(fp, "w", encoding="utf-8") as f:
+                return self.write(fragments, f)
+
+        if len(fragments) == 0:
+            fp.write('{\n "cells": [],\n')
+        else:
+            fp.write('{\n "cells": [\n')
+            for i, fragment in enumerate(fragments):
+                if i > 0:
+                    fp.write(",\n")
+                fp.write(fragment)
+            fp.write("\n ],\n")
+        fp.write(self.tail)
+        fp.write("\n")
@@ -0,0 +1,99 @@
+#########################################
+##### Tests for jExam Shared Assets #####
+#########################################
+
+import unittest
+import os
+import base64
+import tarfile
+import hashlib
+import pathlib
+import tempfile
+import nbformat
+
+from jexam.argparser import get_parser
+from jexam.assets import extract_attachments, extract_cell_attachments
+from jexam.parser import load_exam, main as jexam
+
+TEST_FILES_PATH = pathlib.Path("test")
+
+PNG = os.urandom(1 << 16)
+SVG = '<svg xmlns="http://www.w3.org/2000/svg"/>'
+
+class TestAssets(unittest.TestCase):
+
+    def make_cell(self, text, **attachments):
+        cell = nbformat.v4.new_markdown_cell(text)
+        cell.attachments = {
+            name: {"image/png": base64.b64encode(data).decode("ascii")} if isinstance(data, bytes) else {"image/svg+xml": data}
+            for name, data in attachments.items()
+        }
+        return cell
+
+    def test_extract_cell_attachments(self):
+        png_name = hashlib.sha256(PNG).hexdigest() + ".png"
+        svg_name = hashlib.sha256(SVG.encode("utf-8")).hexdigest() + ".svg"
+
+        assets = {}
+        cell = self.make_cell("![a](attachment:a.png) ![b](attachment:a.png2) <img src='attachment:a.png'>", **{"a.png": PNG, "a.png2": SVG})
+        extracted = extract_cell_attachments(cell, assets)
+        self.assertEqual(extracted.source, f"![a](../assets/{png_name}) ![b](../assets/{svg_name}) <img src='../assets/{png_name}'>")
+        self.assertNotIn("attachments", extracted)
+        self.assertEqual(assets, {png_name: PNG, svg_name: SVG.encode("utf-8")})
+
+        # the original cell is unchanged and cells without attachments are shared
+        self.assertIn("attachment:a.png", cell.source)
+        self.assertIn("attachments", cell)
+        plain = nbformat.v4.new_markdown_cell("foo")
+        self.assertIs(extract_cell_attachments(plain, assets), plain)
+
+        nb, assets = extract_attachments(nbformat.v4.new_notebook(cells=[cell, plain, self.make_cell("![](attachment:x)", x=PNG)]))
+        self.assertEqual(len(assets), 2)
+        self.assertEqual(nb.cells[2].source, f"![](../assets/{png_name})")
+
+    def test_build(self):
+        nb = nbformat.read(TEST_FILES_PATH / "test-exam.ipynb", as_version=4)
+        nb.cells[2] = self.make_cell("# Exam\n![logo](attachment:logo.png)", **{"logo.png": PNG})
+        nb.cells[7] = self.make_cell(nb.cells[7].source + "\n![figure](attachment:figure.png)", **{"figure.png": PNG})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            master = os.path.join(tmp, "test-exam.ipynb")
+            nbformat.write(nb, master)
+            plain, extracted = os.path.join(tmp, "plain"), os.path.join(tmp, "extracted")
+            jexam(get_parser().parse_args([master, plain, "-q"]))
+            jexam(get_parser().parse_args([master, extracted, "-q", "-a"]))
+
+            name = hashlib.sha256(PNG).hexdigest() + ".png"
+            self.assertEqual(os.listdir(os.path.join(extracted, "assets")), [name])
+            with open(os.path.join(extracted, "assets", name), "rb") as f:
+                self.assertEqual(f.read(), PNG)
+
+            for i in range(100):
+                student = nbformat.read(os.path.join(extracted, f"exam_{i}", "test-exam.ipynb"), as_version=4)
+                self.assertTrue(all("attachments" not in cell for cell in student.cells))
+                self.assertIn(f"![logo](../assets/{name})", student.cells[1].source)
+                self.assertLess(
+                    os.path.getsize(os.path.join(extracted, f"exam_{i}", "test-exam.ipynb")),
+                    os.path.getsize(os.path.join(plain, f"exam_{i}", "test-exam.ipynb")) - len(PNG),
+                )
+
+            # extracting attachments does not change version hashes or test names
+            self.assertEqual(
+                sorted(os.listdir(os.path.join(extracted, "autograder", "tests"))), 
+                sorted(os.listdir(os.path.join(plain, "autograder", "tests"))),
+            )
+            exams = [load_exam(master, extract_attachments=a) for a in [False, True]]
+            for question, other in zip(*(exam.questions for exam in exams)):
+                self.assertEqual([v.get_hash() for v in question.versions], [v.get_hash() for v in other.versions])
+            self.assertTrue(any(
+                "attachments" in cell for q in exams[0].questions for v in q.versions for cell in v.original_cells
+            ))
+            self.assertFalse(any(
+                "attachments" in cell for q in exams[1].questions for v in q.versions for cell in v.original_cells
+            ))
+
+            # assets are written once into archives too
+            archive = os.path.join(tmp, "dist.tar.gz")
+            jexam(get_parser().parse_args([master, archive, "-q", "-a"]))
+            with tarfile.open(archive) as tar:
+                self.assertEqual([m for m in tar.getnames() if m.startswith("assets/")], [f"assets/{name}"])
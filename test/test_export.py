@@ -0,0 +1,52 @@
+#####################################
+##### Tests for jExam Exporting #####
+#####################################
+
+import unittest
+import os
+import pathlib
+import tempfile
+import nbformat
+import importlib.util
+
+from jexam.argparser import get_parser
+from jexam.export import get_export_path, read_exam_instance
+from jexam.parser import load_exam, main as jexam, plan_exam_instances
+
+TEST_FILES_PATH = pathlib.Path("test")
+
+class TestExport(unittest.TestCase):
+
+    def test_read_exam_instance(self):
+        exam = load_exam(TEST_FILES_PATH / "test-exam.ipynb")
+        assignments = plan_exam_instances(exam, 42, exam.config["num_students"], exam.config["num_questions"])
+        for i in [0, 17, 99]:
+            nb = read_exam_instance(exam, "test-exam.ipynb", assignments[i])
+            expected = nbformat.read(TEST_FILES_PATH / "dist-correct" / f"exam_{i}" / "test-exam.ipynb", as_version=4)
+            self.assertEqual(nb, expected)
+
+    def test_export_path(self):
+        self.assertEqual(get_export_path(pathlib.Path("exam_0/test-exam.ipynb"), "html"), pathlib.Path("exam_0/test-exam.html"))
+        self.assertEqual(get_export_path(pathlib.Path("exam_0/test-exam.ipynb"), "pdf"), pathlib.Path("exam_0/test-exam.pdf"))
+
+    @unittest.skipIf(importlib.util.find_spec("nbconvert") is None, "nbconvert is not installed")
+    def test_export_html(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            master = TEST_FILES_PATH / "test-exam.ipynb"
+            serial, parallel = os.path.join(tmp, "serial"), os.path.join(tmp, "parallel")
+            jexam(get_parser().parse_args([str(master), serial, "-q", "-e", "html", "--export-autograder"]))
+            jexam(get_parser().parse_args([str(master), parallel, "-q", "-e", "html", "-j", "2"]))
+
+            self.assertTrue(os.path.isfile(os.path.join(serial, "autograder", "test-exam.html")))
+            self.assertFalse(os.path.exists(os.path.join(parallel, "autograder", "test-exam.html")))
+            for i in range(100):
+                with open(os.path.join(serial, f"exam_{i}", "test-exam.html")) as f:
+                    html = f.read()
+                with open(os.path.join(parallel, f"exam_{i}", "test-exam.html")) as f:
+                    self.assertEqual(f.read(), html)
+
+            # exports of unchanged exams are kept by incremental builds unless they are missing
+            jexam(get_parser().parse_args([str(master), parallel, "-q", "-i"]))
+            os.remove(os.path.join(parallel, "exam_3", "test-exam.html"))
+            jexam(get_parser().parse_args([str(master), parallel, "-q", "-i", "-e", "html"]))
+            self.assertTrue(os.path.isfile(os.path.join(parallel, "exam_3", "test-exam.html")))
@@ -0,0 +1,235 @@
+################################################
+##### Tests for jExam Gradescope Zip Files #####
+################################################
+
+import unittest
+import os
+import sys
+import stat
+import types
+import pathlib
+import zipfile
+import tempfile
+import nbformat
+import importlib.util
+
+from unittest import mock
+
+from jexam.argparser import get_parser
+from jexam.gradescope import OTTER_VERSION, generate, iter_support_files, iter_test_files, read_requirements, write_zip
+from jexam.parser import load_exam, main as jexam
+
+TEST_FILES_PATH = pathlib.Path("test")
+
+# stand-ins for the templates of otter generate autograder that use every variable it renders them with
+OTTER_TEMPLATES = {
+    "run_autograder": "#!/usr/bin/env bash\npython {{ autograder_dir }}/source/run_otter.py\n",
+    "run_otter.py": (
+        "config = {\n"
+        "    'score_threshold': {{ threshold }},\n"
+        "    'points_possible': {{ points }},\n"
+        "    'show_stdout_on_release': {{ show_stdout }},\n"
+        "    'show_hidden_tests_on_release': {{ show_hidden }},\n"
+        "    'seed': {{ seed }},\n"
+        "    'grade_from_log': {{ grade_from_log }},\n"
+        "    'serialized_variables': {{ serialized_variables }},\n"
+        "    'public_multiplier': {{ public_multiplier }},\n"
+        "    'token': {% if token %}'{{ token }}'{% else %}None{% endif %},\n"
+        "    'course_id': '{{ course_id }}',\n"
+        "    'assignment_id': '{{ assignment_id }}',\n"
+        "    'filtering': {{ filtering }},\n"
+        "    'pagebreaks': {{ pagebreaks }},\n"
+        "    'autograder_dir': '{{ autograder_dir }}',\n"
+        "    'lang': '{{ lang }}',\n"
+        "}\n"
+    ),
+    "setup.sh": (
+        "wget -O {{ autograder_dir }}/source/miniconda_install.sh {{ miniconda_install_url }}\n"
+        "conda env create -f {{ autograder_dir }}/source/environment.yml\n"
+        "git clone -b {{ ottr_branch }} https://github.com/ucbds-infra/ottr.git\n"
+        "conda run -n {{ otter_env_name }} Rscript -e 'devtools::install()'\n"
+    ),
+    "environment.yml": "name: {{ otter_env_name }}\n",
+    "requirements.txt": "{% if not overwrite_requirements %}otter-grader==1.1.6\n{% endif %}{{ other_requirements }}",
+    "requirements.r": "{% if not overwrite_requirements %}install.packages('testthat')\n{% endif %}{{ other_requirements }}",
+}
+
+class TestGradescope(unittest.TestCase):
+
+    def test_iter_test_files(self):
+        exam = load_exam(TEST_FILES_PATH / "test-exam.ipynb")
+        tests = dict(iter_test_files(exam))
+
+        expected = {}
+        for path in (TEST_FILES_PATH / "dist-correct" / "autograder" / "tests").iterdir():
+            with open(path) as f:
+                expected[f"tests/{path.name}"] = f.read()
+        self.assertEqual(tests, expected)
+
+    def test_support_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, "data", "raw"))
+            for path in ["data/b.csv", "data/raw/a.csv", "utils.py"]:
+                with open(os.path.join(tmp, path), "w") as f:
+                    f.write(path)
+
+            files = [name for name, _ in iter_support_files(["utils.py", "data"], tmp)]
+            self.assertEqual(files, ["files/utils.py", "files/data/b.csv", "files/data/raw/a.csv"])
+
+            with self.assertRaises(AssertionError):
+                list(iter_support_files(["../outside.py"], os.path.join(tmp, "data")))
+            with self.assertRaises(AssertionError):
+                list(iter_support_files(["missing.py"], tmp))
+
+    def test_read_requirements(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(read_requirements({}, tmp), "")
+            with self.assertRaises(AssertionError):
+                read_requirements({"requirements": "reqs.txt"}, tmp)
+
+            with open(os.path.join(tmp, "requirements.txt"), "w") as f:
+                f.write("pandas\n")
+            with open(os.path.join(tmp, "reqs.txt"), "w") as f:
+                f.write("numpy\n")
+            self.assertEqual(read_requirements({}, tmp), "pandas\n")
+            self.assertEqual(read_requirements({"requirements": "reqs.txt"}, tmp), "numpy\n")
+
+    def test_write_zip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            data = os.path.join(tmp, "data.csv")
+            with open(data, "w") as f:
+                f.write("a,b\n1,2\n")
+
+            contents = [("run_autograder", "#!/usr/bin/env bash\n"), ("tests/q1.py", "test = {}\n")]
+            paths = [os.path.join(tmp, "first.zip"), os.path.join(tmp, "second.zip")]
+            for path in paths:
+                size = write_zip(path, contents, [("files/data.csv", pathlib.Path(data))])
+                self.assertEqual(size, os.path.getsize(path))
+
+            with open(paths[0], "rb") as f, open(paths[1], "rb") as g:
+                self.assertEqual(f.read(), g.read())
+
+            with zipfile.ZipFile(paths[0]) as zf:
+                self.assertEqual(zf.namelist(), ["run_autograder", "tests/q1.py", "files/data.csv"])
+                self.assertEqual(zf.read("files/data.csv"), b"a,b\n1,2\n")
+                self.assertEqual(stat.S_IMODE(zf.getinfo("run_autograder").external_attr >> 16), 0o755)
+                self.assertEqual(stat.S_IMODE(zf.getinfo("tests/q1.py").external_attr >> 16), 0o644)
+
+
+@unittest.skipIf(importlib.util.find_spec("jinja2") is None, "jinja2 is not installed")
+class TestGradescopeTemplates(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+        paths = {}
+        os.mkdir(os.path.join(self.tmp, "templates"))
+        for name, template in OTTER_TEMPLATES.items():
+            paths[name] = os.path.join(self.tmp, "templates", name)
+            with open(paths[name], "w") as f:
+                f.write(template)
+
+        self.version = types.ModuleType("otter.version")
+        self.version.__version__ = OTTER_VERSION
+        autograder = types.ModuleType("otter.generate.autograder")
+        autograder.MINICONDA_INSTALL_URL = "https://example.com/miniconda.sh"
+        autograder.OTTER_ENV_NAME = "otter-env"
+        autograder.TEMPLATE_FILE_PATHS = paths
+        token = types.ModuleType("otter.generate.token")
+        token.APIClient = mock.Mock(**{"get_token.return_value": "abc123"})
+        self.token = token
+
+        patcher = mock.patch.dict(sys.modules, {
+            "otter": types.ModuleType("otter"),
+            "otter.version": self.version,
+            "otter.generate": types.ModuleType("otter.generate"),
+            "otter.generate.autograder": autograder,
+            "otter.generate.token": token,
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def read_zip(self, path):
+        with zipfile.ZipFile(path) as zf:
+            return {name: zf.read(name).decode("utf-8") for name in zf.namelist()}
+
+    def test_generate(self):
+        exam = load_exam(TEST_FILES_PATH / "test-exam.ipynb")
+        with open(os.path.join(self.tmp, "requirements.txt"), "w") as f:
+            f.write("pandas\n")
+
+        path = os.path.join(self.tmp, "autograder.zip")
+        generate(exam, {
+            "points": 10, 
+            "threshold": 0.5, 
+            "show_stdout": True, 
+            "seed": 42, 
+            "variables": {"x": "int"},
+            "pdfs": {"course_id": 1, "assignment_id": 2},
+        }, path, self.tmp)
+        files = self.read_zip(path)
+
+        self.assertEqual(
+            sorted(f for f in files if not f.startswith("tests/")),
+            ["environment.yml", "requirements.r", "requirements.txt", "run_autograder", "run_otter.py", "setup.sh"],
+        )
+        self.assertEqual({f: c for f, c in files.items() if f.startswith("tests/")}, dict(iter_test_files(exam)))
+        self.assertEqual(files["run_autograder"], "#!/usr/bin/env bash\npython /autograder/source/run_otter.py")
+        self.assertEqual(files["setup.sh"], (
+            "wget -O /autograder/source/miniconda_install.sh https://example.com/miniconda.sh\n"
+            "conda env create -f /autograder/source/environment.yml\n"
+            "git clone -b stable https://github.com/ucbds-infra/ottr.git\n"
+            "conda run -n otter-env Rscript -e 'devtools::install()'"
+        ))
+        self.assertEqual(files["environment.yml"], "name: otter-env")
+        self.assertEqual(files["requirements.txt"], "otter-grader==1.1.6\npandas\n")
+        self.assertEqual(files["requirements.r"], "install.packages('testthat')\n")
+        self.assertEqual(files["run_otter.py"], (
+            "config = {\n"
+            "    'score_threshold': 0.5,\n"
+            "    'points_possible': 10.0,\n"
+            "    'show_stdout_on_release': True,\n"
+            "    'show_hidden_tests_on_release': False,\n"
+            "    'seed': 42,\n"
+            "    'grade_from_log': False,\n"
+            "    'serialized_variables': {'x': 'int'},\n"
+            "    'public_multiplier': 0.0,\n"
+            "    'token': 'abc123',\n"
+            "    'course_id': '1',\n"
+            "    'assignment_id': '2',\n"
+            "    'filtering': True,\n"
+            "    'pagebreaks': True,\n"
+            "    'autograder_dir': '/autograder',\n"
+            "    'lang': 'python',\n"
+            "}"
+        ))
+
+        # requirements replace the defaults only if there are some
+        generate(exam, {"overwrite_requirements": True}, path, self.tmp)
+        files = self.read_zip(path)
+        self.assertEqual(files["requirements.txt"], "pandas\n")
+        self.assertIn("'token': None", files["run_otter.py"])
+        os.remove(os.path.join(self.tmp, "requirements.txt"))
+        generate(exam, {"overwrite_requirements": True}, path, self.tmp)
+        self.assertEqual(self.read_zip(path)["requirements.txt"], "otter-grader==1.1.6\n")
+
+        for config in [{"threshold": 2}, {"public_multiplier": -1}, {"pdfs": {"course_id": 1}}]:
+            with self.assertRaises(AssertionError, msg=config):
+                generate(exam, config, path, self.tmp)
+
+    def test_otter_version(self):
+        self.version.__version__ = "2.0.0"
+        exam = load_exam(TEST_FILES_PATH / "test-exam.ipynb")
+        with self.assertRaisesRegex(ImportError, f"requires otter-grader {OTTER_VERSION}, not 2.0.0"):
+            generate(exam, {}, os.path.join(self.tmp, "autograder.zip"), self.tmp)
+
+    def test_quiet_build(self):
+        # the zip is generated for quiet builds too
+        nb = nbformat.read(str(TEST_FILES_PATH / "test-exam.ipynb"), as_version=4)
+        nb.cells[0].source += "\ngenerate:\n  points: 10"
+        master, result = os.path.join(self.tmp, "test-exam.ipynb"), os.path.join(self.tmp, "dist")
+        nbformat.write(nb, master)
+        jexam(get_parser().parse_args([master, result, "-q"]))
+        self.assertIn("'points_possible': 10.0", self.read_zip(os.path.join(result, "autograder.zip"))["run_otter.py"])
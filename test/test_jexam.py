@@ -5,13 +5,26 @@
 import unittest
 import os
 import io
+import json
+import hashlib
 import shutil
+import subprocess
+import sys
+import time
+import tarfile
+import zipfile
 import pathlib
+import nbformat
 
 from contextlib import redirect_stdout
 from textwrap import dedent
+from unittest import mock
 
-from jexam.parser import main as jexam
+from jexam.argparser import get_batch_parser, get_query_parser
+from jexam.batch import build_batch
+from jexam.manifest import Manifest, get_manifest_path, query
+from jexam.parser import build, is_test_cell, main as jexam
+from jexam.progress import ProgressTracker
 
 bin_globals = {"__name__": "__not_main__"}
 with open("bin/jexam") as f:
@@ -45,16 +58,22 @@ class TestJexam(unittest.TestCase):
                 f1, f2 = os.path.join(dir1, f1), os.path.join(dir2, f2)
                 self.assertDirsEqual(f1, f2)
 
-    def run_and_check_jexam(self, seed=None, ok=False):
+    def run_and_check_jexam(self, seed=None, ok=False, jobs=None):
         nb_path = str(TEST_FILES_PATH / 'test-exam.ipynb')
         command = [nb_path]
         if seed is not None:
             command += ["-s", str(seed)]
         if ok:
             command += ["--format", "ok"]
+        if jobs is not None:
+            command += ["--jobs", str(jobs)]
         args = PARSER.parse_args(command)
         jexam(args)
 
+        # the manifest is checked separately
+        self.assertTrue(os.path.isfile(get_manifest_path("dist")), "Manifest was not written")
+        shutil.rmtree(os.path.join("dist", ".jexam"))
+
         correct_dir = "dist-correct" if seed is None else f"dist-correct-{seed}"
         if ok:
             correct_dir += "-ok"
@@ -79,6 +98,302 @@ class TestJexam(unittest.TestCase):
             self.run_and_check_jexam(150)
         self.assertEqual(stdout.getvalue().strip(), type(self).expected_stdout.strip(), "Process stdout incorrect")
     
-    def tearDown(self):
-        if os.path.exists("dist"):
+    def test_jobs(self):
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            self.run_and_check_jexam(jobs=3)
+        self.assertEqual(stdout.getvalue().strip(), type(self).expected_stdout.strip(), "Process stdout incorrect")
+
+    def test_incremental(self):
+        command = [str(TEST_FILES_PATH / 'test-exam.ipynb'), "--incremental"]
+        with redirect_stdout(io.StringIO()):
+            jexam(PARSER.parse_args(command))
+
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            jexam(PARSER.parse_args(command))
+        self.assertEqual(
+            stdout.getvalue().strip(), 
+            "Skipped 1 of 1 autograder notebooks, 100 of 100 exams (unchanged)", 
+            "Process stdout incorrect"
+        )
+
+        # rebuilt exams are reported by student
+        os.remove(os.path.join("dist", "exam_49", "test-exam.ipynb"))
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            jexam(PARSER.parse_args(command))
+        self.assertEqual(stdout.getvalue().splitlines()[0], "Generating exam 50", "Process stdout incorrect")
+
+        shutil.rmtree(os.path.join("dist", ".jexam"))
+        self.assertDirsEqual("dist", TEST_FILES_PATH / "dist-correct")
+
+    def test_incremental_prune(self):
+        nb = nbformat.read(str(TEST_FILES_PATH / 'test-exam.ipynb'), as_version=4)
+        jexam(PARSER.parse_args([str(TEST_FILES_PATH / 'test-exam.ipynb'), "-q", "--incremental"]))
+
+        # exams of students no longer in the class are removed with their cache entries
+        nb.cells[0].source = nb.cells[0].source.replace("num_students: 100", "num_students: 60")
+        nbformat.write(nb, "test-exam.ipynb")
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            jexam(PARSER.parse_args(["test-exam.ipynb", "--incremental"]))
+        self.assertIn("Removed 40 exams (no longer planned)", stdout.getvalue())
+
+        self.assertEqual(sorted(d for d in os.listdir("dist") if d.startswith("exam_")), sorted(f"exam_{i}" for i in range(60)))
+        with open(os.path.join("dist", ".jexam", "cache.json")) as f:
+            entries = json.load(f)["entries"]
+        self.assertEqual(sorted(e for e in entries if e.startswith("exam_")), sorted(f"exam_{i}" for i in range(60)))
+
+    def test_archives(self):
+        for archive in ["dist.zip", "dist.tar.gz"]:
+            args = PARSER.parse_args([str(TEST_FILES_PATH / 'test-exam.ipynb'), archive, "-q", "--jobs", "2"])
+            jexam(args)
+
+            if archive.endswith(".zip"):
+                with zipfile.ZipFile(archive) as zf:
+                    zf.extractall("dist")
+            else:
+                with tarfile.open(archive) as tf:
+                    tf.extractall("dist")
+
+            self.assertDirsEqual("dist", TEST_FILES_PATH / "dist-correct")
+            self.assertTrue(os.path.isfile(get_manifest_path(archive)), f"Manifest for {archive} was not written")
             shutil.rmtree("dist")
+
+    def test_reproducible_archives(self):
+        for archive in ["dist.zip", "dist.tar.gz"]:
+            contents = []
+            for _ in range(2):
+                jexam(PARSER.parse_args([str(TEST_FILES_PATH / 'test-exam.ipynb'), archive, "-q"]))
+                with open(archive, "rb") as f:
+                    contents.append(f.read())
+                time.sleep(1.1)
+            self.assertEqual(contents[0], contents[1], f"{archive} differs between builds")
+
+        os.environ["SOURCE_DATE_EPOCH"] = "1600000000"
+        try:
+            jexam(PARSER.parse_args([str(TEST_FILES_PATH / 'test-exam.ipynb'), "dist.tar.gz", "-q"]))
+            jexam(PARSER.parse_args([str(TEST_FILES_PATH / 'test-exam.ipynb'), "dist.zip", "-q"]))
+        finally:
+            del os.environ["SOURCE_DATE_EPOCH"]
+        with tarfile.open("dist.tar.gz") as tf:
+            self.assertEqual({m.mtime for m in tf.getmembers()}, {1600000000})
+        with zipfile.ZipFile("dist.zip") as zf:
+            self.assertEqual({i.date_time for i in zf.infolist()}, {(2020, 9, 13, 12, 26, 40)})
+
+    def test_students(self):
+        args = PARSER.parse_args([str(TEST_FILES_PATH / 'test-exam.ipynb'), "-q", "--student", "17", "--student", "3"])
+        events = []
+        build(args, progress=ProgressTracker([events.append]))
+
+        self.assertEqual(sorted(os.listdir("dist")), ["exam_17", "exam_3"])
+        for exam in ["exam_17", "exam_3"]:
+            self.assertDirsEqual(os.path.join("dist", exam), TEST_FILES_PATH / "dist-correct" / exam)
+        self.assertEqual([e["phase"] for e in events if e["event"] == "finish"], ["parse", "plan", "exams"])
+
+        args = PARSER.parse_args([str(TEST_FILES_PATH / 'test-exam.ipynb'), "-q", "--student", "100"])
+        with self.assertRaisesRegex(AssertionError, "Student 100 not in range"):
+            build(args)
+
+        # an archive of the whole class is not replaced by single students' exams
+        jexam(PARSER.parse_args([str(TEST_FILES_PATH / 'test-exam.ipynb'), "dist.zip", "-q"]))
+        with open("dist.zip", "rb") as f:
+            archive = f.read()
+        args = PARSER.parse_args([str(TEST_FILES_PATH / 'test-exam.ipynb'), "dist.zip", "-q", "--student", "3"])
+        with self.assertRaisesRegex(AssertionError, "Writing single students' exams requires a directory result"):
+            build(args)
+        with open("dist.zip", "rb") as f:
+            self.assertEqual(f.read(), archive)
+
+    def test_link(self):
+        nb = nbformat.read(str(TEST_FILES_PATH / 'test-exam.ipynb'), as_version=4)
+        nb.cells[0].source += "\npublic_tests: true"
+        nbformat.write(nb, "public-test-exam.ipynb")
+
+        jexam(PARSER.parse_args(["public-test-exam.ipynb", "-q", "--link", "--jobs", "2"]))
+        otter_files = [os.stat(os.path.join("dist", d, "public-test-exam.otter")) for d in ["autograder"] + [f"exam_{i}" for i in range(100)]]
+        self.assertEqual(len({(s.st_dev, s.st_ino) for s in otter_files}), 1)
+        self.assertEqual(otter_files[0].st_nlink, 102)
+
+        # every file is linked to an object in the store, and no object is unused
+        objects = list(pathlib.Path("dist", ".jexam", "objects").glob("*/*"))
+        files = [p for p in pathlib.Path("dist").rglob("*") if p.is_file() and ".jexam" not in p.parts]
+        self.assertEqual({os.stat(p).st_ino for p in files}, {os.stat(p).st_ino for p in objects})
+        self.assertLess(len(objects), len(files))
+
+        # rebuilding without links does not write through to the shared objects
+        jexam(PARSER.parse_args(["public-test-exam.ipynb", "-q", "-s", "150"]))
+        for obj in objects:
+            with open(obj, "rb") as f:
+                self.assertEqual(hashlib.sha256(f.read()).hexdigest(), obj.name)
+
+        shutil.rmtree("dist")
+        jexam(PARSER.parse_args([str(TEST_FILES_PATH / 'test-exam.ipynb'), "-q", "--link"]))
+        shutil.rmtree(os.path.join("dist", ".jexam"))
+        self.assertDirsEqual("dist", TEST_FILES_PATH / "dist-correct")
+
+    def test_public_tests(self):
+        nb = nbformat.read(str(TEST_FILES_PATH / 'test-exam.ipynb'), as_version=4)
+        nb.cells[0].source += "\npublic_tests: true"
+        nbformat.write(nb, "public-test-exam.ipynb")
+
+        args = PARSER.parse_args(["public-test-exam.ipynb", "-q"])
+        jexam(args)
+
+        for i in range(100):
+            test_dir = pathlib.Path("dist") / f"exam_{i}" / "tests"
+            for test_path in test_dir.iterdir():
+                env = {}
+                with open(test_path) as f:
+                    exec(f.read(), env)
+                autograder_path = pathlib.Path("dist") / "autograder" / "tests" / test_path.name
+                self.assertTrue(autograder_path.exists(), f"{test_path} has no autograder test")
+                for suite in env["test"]["suites"]:
+                    self.assertTrue(all(not case["hidden"] for case in suite["cases"]), f"{test_path} has hidden tests")
+
+    def test_manifest(self):
+        args = PARSER.parse_args([str(TEST_FILES_PATH / 'test-exam.ipynb'), "-q"])
+        jexam(args)
+
+        with Manifest(get_manifest_path("dist")) as manifest:
+            self.assertEqual(manifest.meta["seed"], 42)
+            key = manifest.answer_key("exam_17")
+            self.assertEqual(key, manifest.answer_key(17))
+            self.assertEqual([row["slot"] for row in key], list(range(manifest.meta["num_questions"])))
+
+            with open(os.path.join("dist", "autograder", "test-exam.ipynb")) as f:
+                autograder = f.read()
+            for row in key:
+                if row["test_file"] is not None:
+                    self.assertIn(f'grader.check(\\"{row["hash"]}\\")', autograder)
+                    self.assertTrue(os.path.isfile(os.path.join("dist", "autograder", "tests", row["test_file"])))
+
+                students = manifest.students_with(row["question"], row["version"])
+                self.assertIn(17, [r["student"] for r in students])
+                self.assertEqual(students, manifest.students_with_hash(row["hash"]))
+                self.assertTrue(all(r["question"] == row["question"] and r["version"] == row["version"] for r in students))
+
+            # each student gets a question at most once
+            for row in key:
+                students = [r["student"] for r in manifest.students_with(row["question"])]
+                self.assertEqual(len(students), len(set(students)))
+
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            rows = query(get_query_parser().parse_args(["dist", "--student", "exam_17"]))
+        self.assertEqual(rows, key)
+        self.assertEqual(len(stdout.getvalue().strip().split("\n")), len(key) + 1)
+
+    def test_profile(self):
+        versions = None
+        for jobs in ["1", "2"]:
+            args = PARSER.parse_args([str(TEST_FILES_PATH / 'test-exam.ipynb'), "-q", "--jobs", jobs, "--profile", "profile", "--cprofile"])
+            # prepare versions in worker processes too
+            with mock.patch("jexam.parser.MIN_PARALLEL_VERSIONS", 1):
+                jexam(args)
+
+            with open(os.path.join("profile", "report.json")) as f:
+                report = json.load(f)
+            self.assertEqual(report["counts"]["exams"], 100)
+
+            # versions prepared by workers are profiled as well
+            if versions is None:
+                versions = report["counts"]["prepared versions"]
+            self.assertGreater(versions, 1)
+            self.assertEqual(report["counts"]["prepared versions"], versions)
+            self.assertEqual(report["phases"]["strip solutions"]["count"], versions)
+            self.assertEqual(report["phases"]["write exam"]["count"], 100)
+            for phase in ["read master", "parse notebook", "parse config", "strip solutions", "format tests", "nbformat write"]:
+                self.assertIn(phase, report["phases"])
+
+            with open(os.path.join("profile", "trace.json")) as f:
+                trace = json.load(f)
+            self.assertEqual(len([e for e in trace["traceEvents"] if e["name"] == "write exam"]), 100)
+            self.assertTrue(os.path.isfile(os.path.join("profile", "cprofile.prof")))
+
+            shutil.rmtree(os.path.join("dist", ".jexam"))
+            self.assertDirsEqual("dist", TEST_FILES_PATH / "dist-correct")
+            shutil.rmtree("profile")
+
+    def test_progress(self):
+        args = PARSER.parse_args([str(TEST_FILES_PATH / 'test-exam.ipynb'), "-q", "--jobs", "2", "--progress", "progress.jsonl"])
+        jexam(args)
+
+        with open("progress.jsonl") as f:
+            events = [json.loads(l) for l in f]
+        self.assertEqual(
+            [(e["event"], e["phase"]) for e in events if e["event"] != "progress"],
+            [(e, p) for p in ["parse", "autograder", "plan", "exams"] for e in ["start", "finish"]],
+        )
+        exams = [e for e in events if e["phase"] == "exams"]
+        self.assertEqual((exams[-1]["done"], exams[-1]["total"], exams[-1]["eta"]), (100, 100, 0))
+        self.assertEqual(exams[-1]["bytes"], sum(
+            os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk("dist") 
+            for f in files if root.split(os.sep)[1].startswith("exam_")
+        ))
+
+        events = []
+        build(args, progress=ProgressTracker([events.append]))
+        exams = [e for e in events if e["phase"] == "exams" and e["event"] == "progress"]
+        self.assertEqual([e["done"] for e in exams], list(range(1, 101)))
+        self.assertTrue(all(e["rate"] > 0 and e["eta"] >= 0 for e in exams))
+
+    def test_progress_stdout(self):
+        # status messages go to stderr when progress events are written to stdout
+        master = str(TEST_FILES_PATH / 'test-exam.ipynb')
+        env = {**os.environ, "PYTHONPATH": os.getcwd()}
+        for command in [
+            ["bin/jexam", master, "--progress", "-", "-i", "--profile", "profile"],
+            ["bin/jexam", master, "--progress", "-", "-i"],
+            ["bin/jexam", "batch", master, "--progress", "-"],
+        ]:
+            result = subprocess.run([sys.executable, *command], env=env, capture_output=True, text=True, check=True)
+            events = [json.loads(line) for line in result.stdout.splitlines()]
+            self.assertIn("finish", [e["event"] for e in events])
+            self.assertNotEqual(result.stderr.strip(), "", command)
+
+    def test_batch(self):
+        nb = nbformat.read(str(TEST_FILES_PATH / 'test-exam.ipynb'), as_version=4)
+        nb.cells[0].source += "\npublic_tests: true"
+        nbformat.write(nb, "public-test-exam.ipynb")
+
+        masters = [str(TEST_FILES_PATH / 'test-exam.ipynb'), "public-test-exam.ipynb"]
+        args = get_batch_parser().parse_args(masters + ["-c", "2", "-j", "2", "-q"])
+        events = []
+        results = build_batch(args, [events.append])
+        self.assertEqual(results, [pathlib.Path("dist", "test-exam"), pathlib.Path("dist", "public-test-exam")])
+
+        shutil.rmtree(os.path.join("dist", "test-exam", ".jexam"))
+        self.assertDirsEqual(os.path.join("dist", "test-exam"), TEST_FILES_PATH / "dist-correct")
+        self.assertTrue(os.path.isdir(os.path.join("dist", "public-test-exam", "exam_0", "tests")))
+        self.assertFalse(os.path.isdir(os.path.join("dist", "test-exam", "exam_0", "tests")))
+
+        for master in masters:
+            finished = [e["phase"] for e in events if e["build"] == master and e["event"] == "finish"]
+            self.assertEqual(finished, ["parse", "autograder", "plan", "exams"])
+
+        # builds use the same options as jexam
+        args = get_batch_parser().parse_args([masters[0], "-q", "-j", "2", "--strip-outputs"])
+        build_batch(args)
+        autograder = nbformat.read(os.path.join("dist", "test-exam", "autograder", "test-exam.ipynb"), as_version=4)
+        self.assertTrue(all(not cell.get("outputs") for cell in autograder.cells if not is_test_cell(cell)))
+
+        args = get_batch_parser().parse_args(masters + ["other/test-exam.ipynb"])
+        with self.assertRaisesRegex(ValueError, "would both be written to test-exam"):
+            build_batch(args)
+
+    def test_lazy_imports(self):
+        code = "import sys; exec(open('bin/jexam').read(), {'__name__': '__not_main__'}); " \
+            "print(' '.join(m for m in ['nbformat', 'numpy', 'yaml'] if m in sys.modules))"
+        env = {**os.environ, "PYTHONPATH": os.getcwd()}
+        result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "", "bin/jexam imported heavy modules before parsing arguments")
+
+    def tearDown(self):
+        for path in ["dist", "profile"]:
+            if os.path.exists(path):
+                shutil.rmtree(path)
+        for path in ["public-test-exam.ipynb", "test-exam.ipynb", "dist.zip", "dist.tar.gz", "dist.zip.manifest.sqlite", "dist.tar.gz.manifest.sqlite", "progress.jsonl"]:
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,144 @@
+##################################
+##### Tests for jExam Parser #####
+##################################
+
+import unittest
+import nbformat
+
+from unittest import mock
+from concurrent.futures import ProcessPoolExecutor
+
+from jexam.parser import (
+    BEGIN_CELL, END_CELL, MARKDOWN_ANSWER_CELL_TEMPLATE, MARKDOWN_SOLUTION_CELL, PLAIN_CELL, TEST_CELL, 
+    MIN_PARALLEL_VERSIONS, classify_cell, encode_student_cells, parse_notebook, remove_output, 
+    replace_cell_solutions
+)
+
+class TestParser(unittest.TestCase):
+
+    def test_classify_cell(self):
+        c = classify_cell(nbformat.v4.new_raw_cell("BEGIN QUESTION\npoints: 2"))
+        self.assertEqual((c.kind, c.delim, c.config), (BEGIN_CELL, "question", {"points": 2}))
+
+        c = classify_cell(nbformat.v4.new_raw_cell("begin version"))
+        self.assertEqual((c.kind, c.delim, c.config), (BEGIN_CELL, "version", None))
+
+        c = classify_cell(nbformat.v4.new_raw_cell("END CONCLUSION"))
+        self.assertEqual((c.kind, c.delim), (END_CELL, "conclusion"))
+
+        c = classify_cell(nbformat.v4.new_code_cell("## Hidden Test ##\nx\n1"))
+        self.assertEqual(c.kind, TEST_CELL)
+        self.assertEqual(c.source, ["## Hidden Test ##", "x", "1"])
+
+        c = classify_cell(nbformat.v4.new_markdown_cell("**Solution:** foo"))
+        self.assertEqual(c.kind, MARKDOWN_SOLUTION_CELL)
+
+        for cell in [
+            nbformat.v4.new_raw_cell("END EXAM"),
+            nbformat.v4.new_raw_cell(""),
+            nbformat.v4.new_code_cell(""),
+            nbformat.v4.new_markdown_cell("BEGIN QUESTION"),
+        ]:
+            self.assertEqual(classify_cell(cell).kind, PLAIN_CELL, f"{cell} was not a plain cell")
+
+    def test_parse_errors(self):
+        raw, md = nbformat.v4.new_raw_cell, nbformat.v4.new_markdown_cell
+        for cells, message in [
+            ([raw("END QUESTION")], "END QUESTION found outside question block"),
+            ([raw("BEGIN QUESTION"), raw("END VERSION")], "END VERSION found outside version block"),
+            ([raw("BEGIN QUESTION"), raw("BEGIN QUESTION")], "BEGIN QUESTION detected inside another block"),
+            ([raw("BEGIN VERSION")], "BEGIN VERSION detected inside an incompatible block"),
+            ([md("foo")], "Cell found outside a block"),
+        ]:
+            with self.assertRaisesRegex(AssertionError, message):
+                parse_notebook(nbformat.v4.new_notebook(cells=cells))
+
+    def test_parse_single_version(self):
+        exam = parse_notebook(nbformat.v4.new_notebook(cells=[
+            nbformat.v4.new_raw_cell("BEGIN QUESTION\npoints: 3"),
+            nbformat.v4.new_markdown_cell("**Solution:** foo"),
+            nbformat.v4.new_code_cell("# TEST\n1 + 1"),
+            nbformat.v4.new_raw_cell("END QUESTION"),
+        ]))
+        self.assertEqual(len(exam.questions), 1)
+        question = exam.questions[0]
+        self.assertEqual(question.points, 3)
+        self.assertEqual(len(question.versions), 1)
+        version = question.versions[0]
+        self.assertEqual(len(version.tests), 1)
+        self.assertEqual(version.tests[0].input, "1 + 1")
+        self.assertEqual(len(version.get_cells(False)), 1)
+        self.assertNotIn("foo", version.get_cells(False)[0].source)
+
+    def test_shared_cells(self):
+        plain = nbformat.v4.new_code_cell("x = 1")
+        solution = nbformat.v4.new_code_cell("x = 1 # SOLUTION")
+        markdown = nbformat.v4.new_markdown_cell("**Solution:** foo")
+        self.assertIs(replace_cell_solutions(plain), plain)
+        self.assertIs(replace_cell_solutions(markdown), MARKDOWN_ANSWER_CELL_TEMPLATE)
+        stripped = replace_cell_solutions(solution)
+        self.assertEqual((stripped.source, solution.source), ("x = ...", "x = 1 # SOLUTION"))
+
+        plain.outputs = [nbformat.v4.new_output("stream", text="1\n")]
+        nb = nbformat.v4.new_notebook(cells=[plain, markdown])
+        student = remove_output(nb)
+        self.assertEqual(student.cells[0].outputs, [])
+        self.assertIs(student.cells[1], markdown)
+        self.assertEqual(len(plain.outputs), 1)
+
+        encode_student_cells([plain])
+        self.assertEqual(len(plain.outputs), 1)
+
+        cells = [
+            nbformat.v4.new_raw_cell("BEGIN QUESTION"),
+            solution,
+            nbformat.v4.new_raw_cell("END QUESTION"),
+        ]
+        exam = parse_notebook(nbformat.v4.new_notebook(cells=cells))
+        self.assertIs(exam.questions[0].versions[0].get_cells(True)[0], solution)
+
+    def make_question_bank(self, num_versions, malformed=None):
+        raw, code, md = nbformat.v4.new_raw_cell, nbformat.v4.new_code_cell, nbformat.v4.new_markdown_cell
+        cells = [raw("BEGIN QUESTION\npoints: 2")]
+        for i in range(num_versions):
+            solution = f"x = {i} # SOLUTION" if i != malformed else "# BEGIN SOLUTION\nx = 1"
+            cells += [
+                raw("BEGIN VERSION"), md(f"Question {i}"), md("**Solution:** foo"), code(solution), 
+                code(f"# TEST\nx == {i}"), code(f"# HIDDEN TEST\nx != {i + 1}"), raw("END VERSION"),
+            ]
+        cells.append(raw("END QUESTION"))
+        return nbformat.v4.new_notebook(cells=cells)
+
+    def test_prepare_versions(self):
+        nb = self.make_question_bank(MIN_PARALLEL_VERSIONS + 8)
+        serial, parallel = parse_notebook(nb), parse_notebook(nb, jobs=2)
+        for version, other in zip(serial.questions[0].versions, parallel.questions[0].versions):
+            self.assertTrue(other.is_prepared())
+            self.assertIsNone(other.classified)
+            self.assertEqual(other.get_fragments(), version.get_fragments())
+            self.assertEqual(other.tests, version.tests)
+            self.assertEqual(other.public_tests, version.public_tests)
+            self.assertEqual(other.test_sources, version.test_sources)
+            self.assertEqual(other.get_cells(False), version.get_cells(False))
+
+            # cells are still shared with the master notebook
+            self.assertIs(other.get_cells(False)[0], other.original_cells[0])
+            self.assertIs(other.get_cells(False)[1], MARKDOWN_ANSWER_CELL_TEMPLATE)
+            self.assertIs(other.get_cells(True)[2], other.original_cells[2])
+
+    def test_prepare_errors(self):
+        nb = self.make_question_bank(MIN_PARALLEL_VERSIONS + 8, malformed=5)
+        for jobs in [1, 2]:
+            with self.assertRaisesRegex(AssertionError, "Question 1, version 6: BEGIN SOLUTION without END SOLUTION"):
+                parse_notebook(nb, jobs=jobs)
+
+    def test_prepare_shutdown(self):
+        # executors before Python 3.9 have no cancel_futures argument
+        shutdown = ProcessPoolExecutor.shutdown
+        def old_shutdown(self, wait=True):
+            shutdown(self, wait=wait)
+
+        with mock.patch.object(ProcessPoolExecutor, "shutdown", old_shutdown):
+            self.assertEqual(len(parse_notebook(self.make_question_bank(MIN_PARALLEL_VERSIONS), jobs=2).questions[0].versions), MIN_PARALLEL_VERSIONS)
+            with self.assertRaisesRegex(AssertionError, "Question 1, version 3"):
+                parse_notebook(self.make_question_bank(MIN_PARALLEL_VERSIONS, malformed=2), jobs=2)
@@ -0,0 +1,63 @@
+###################################
+##### Tests for jExam Planner #####
+###################################
+
+import unittest
+import numpy as np
+
+from jexam.planner import plan_assignments
+
+NUM_VERSIONS = [3, 2, 1, 4, 5, 3]
+
+class TestPlanner(unittest.TestCase):
+
+    def assertBalanced(self, questions, versions):
+        counts = np.bincount(questions.ravel())
+        self.assertLessEqual(counts.max() - counts.min(), 1, "Questions are not used evenly")
+        for q, size in enumerate(NUM_VERSIONS):
+            students, slots = np.nonzero(questions == q)
+            chosen = versions[students, slots]
+            if size > 1:
+                adjacent = np.diff(students) == 1
+                self.assertFalse(np.any(chosen[1:][adjacent] == chosen[:-1][adjacent]), 
+                    f"Adjacent students share a version of question {q}")
+            counts = np.bincount(chosen, minlength=size)
+            self.assertLessEqual(counts.max() - counts.min(), 1, f"Versions of question {q} are not used evenly")
+
+    def test_plan(self):
+        questions, versions = plan_assignments(42, 600, 6, NUM_VERSIONS)
+        self.assertEqual(questions.shape, (600, 6))
+        self.assertTrue(all(sorted(row) == list(range(6)) for row in questions.tolist()))
+        self.assertBalanced(questions, versions)
+
+        # with every question on every exam, each block of students uses each version exactly once
+        for q, size in enumerate(NUM_VERSIONS):
+            chosen = versions[questions == q]
+            for block in range(600 // size):
+                self.assertEqual(sorted(chosen[block * size:(block + 1) * size]), list(range(size)))
+
+    def test_subset(self):
+        questions, versions = plan_assignments(42, 600, 3, NUM_VERSIONS)
+        self.assertEqual(questions.shape, (600, 3))
+        self.assertTrue(all(len(set(row)) == 3 for row in questions.tolist()))
+        self.assertBalanced(questions, versions)
+
+    def test_difficulty(self):
+        difficulties = [1, 5, 3, 2, 4, 6]
+        questions, versions = plan_assignments(42, 600, 3, NUM_VERSIONS, difficulties=difficulties)
+        strata = [{0, 3}, {2, 4}, {1, 5}]
+        for slot, stratum in enumerate(strata):
+            self.assertEqual(set(questions[:, slot]), stratum)
+            self.assertEqual(np.bincount(questions[:, slot], minlength=6)[list(stratum)].tolist(), [300, 300])
+        self.assertBalanced(questions, versions)
+
+    def test_random_access(self):
+        questions, versions = plan_assignments(7, 1000, 4, NUM_VERSIONS)
+        students = [999, 0, 500, 501]
+        sub_questions, sub_versions = plan_assignments(7, 1000, 4, NUM_VERSIONS, students=students)
+        np.testing.assert_array_equal(sub_questions, questions[students])
+        np.testing.assert_array_equal(sub_versions, versions[students])
+
+    def test_too_many_questions(self):
+        with self.assertRaises(AssertionError):
+            plan_assignments(42, 10, 7, NUM_VERSIONS)
@@ -0,0 +1,145 @@
+###########################################
+##### Tests for jExam Notebook Reader #####
+###########################################
+
+import unittest
+import io
+import os
+import json
+import base64
+import shutil
+import pathlib
+import tempfile
+import nbformat
+import tracemalloc
+
+from jexam.argparser import get_parser
+from jexam.parser import is_test_cell, main as jexam
+from jexam.reader import iter_cells, read_notebook
+
+from . import test_jexam
+
+TEST_FILES_PATH = pathlib.Path("test")
+
+class TestReader(unittest.TestCase):
+
+    assertDirsEqual = test_jexam.TestJexam.assertDirsEqual
+    assertFilesEqual = test_jexam.TestJexam.assertFilesEqual
+
+    def test_read_notebook(self):
+        path = TEST_FILES_PATH / "test-exam.ipynb"
+        expected = nbformat.read(path, as_version=4)
+        for chunk_size in [1, 7, 100, 1 << 16]:
+            self.assertEqual(read_notebook(path, chunk_size=chunk_size), expected, chunk_size)
+
+    def test_iter_cells(self):
+        fields = {}
+        cells = list(iter_cells(io.StringIO('{"metadata": {"a": [1, 2]}, "cells" : [ {"x": 1} , {"y": 22}], "nbformat": 4 }'), fields, chunk_size=3))
+        self.assertEqual(cells, [{"x": 1}, {"y": 22}])
+        self.assertEqual(fields, {"metadata": {"a": [1, 2]}, "cells": [], "nbformat": 4})
+
+        # reading stops at the first sign of another format
+        for source in ['{"metadata": {}, "nbformat": 3, "worksheets": [{"cells": [{"x": 1}]}]}', '{"worksheets": [{"cells": [1}}']:
+            fields = {}
+            self.assertEqual(list(iter_cells(io.StringIO(source), fields)), [])
+            self.assertNotIn("worksheets", fields)
+
+        self.assertEqual(list(iter_cells(io.StringIO('{"cells": []}'))), [])
+        for invalid in ['{"cells": [{"x": 1}', '{"cells": [{"x": 1} {"y": 2}]}', '["cells"]', '']:
+            with self.assertRaises(ValueError, msg=invalid):
+                list(iter_cells(io.StringIO(invalid), chunk_size=4))
+
+    def test_validation(self):
+        nb = nbformat.read(TEST_FILES_PATH / "test-exam.ipynb", as_version=4)
+        invalid = [
+            ({"cell_type": "foo", "source": "", "metadata": {}}, "cell 1 has invalid type 'foo'"),
+            ({"cell_type": "markdown", "metadata": {}}, "markdown cell 1 has no source"),
+            ({"cell_type": "raw", "source": [1], "metadata": {}}, "source of raw cell 1 is invalid"),
+            ({"cell_type": "code", "source": "", "metadata": {}, "outputs": []}, "code cell 1 has no execution_count"),
+            ({"cell_type": "code", "source": "", "metadata": [], "outputs": [], "execution_count": None}, "metadata of code cell 1 is invalid"),
+            ([], "cell 1 is not an object"),
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "master.ipynb")
+            for cell, error in invalid:
+                with open(path, "w") as f:
+                    json.dump({**nb, "cells": [nb.cells[0], cell, *nb.cells[1:]]}, f)
+                with self.assertRaisesRegex(ValueError, error):
+                    read_notebook(path)
+
+            for fields, error in [
+                ({"metadata": None}, "notebook has no metadata"), 
+                ({"nbformat_minor": "2"}, "nbformat_minor '2' is invalid"),
+            ]:
+                with open(path, "w") as f:
+                    json.dump({**nb, **fields}, f)
+                with self.assertRaisesRegex(ValueError, error):
+                    read_notebook(path)
+
+            with open(path, "w") as f:
+                json.dump({"metadata": {}, "nbformat": 4, "nbformat_minor": 4}, f)
+            with self.assertRaisesRegex(ValueError, "notebook has no cells"):
+                read_notebook(path)
+
+    def test_other_formats(self):
+        nb = nbformat.v3.new_notebook(worksheets=[nbformat.v3.new_worksheet(cells=[
+            nbformat.v3.new_text_cell("markdown", "# Exam"), 
+            nbformat.v3.new_code_cell("x = 1", outputs=[nbformat.v3.new_output("stream", output_text="1")]),
+        ])])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "master.ipynb")
+            with open(path, "w") as f:
+                nbformat.write(nb, f, version=nbformat.NO_CONVERT)
+            self.assertEqual(read_notebook(path), nbformat.read(path, as_version=4))
+            self.assertEqual(read_notebook(path, keep_outputs=lambda cell: False).cells[1].outputs, [])
+
+    def test_keep_outputs(self):
+        nb = read_notebook(TEST_FILES_PATH / "test-exam.ipynb", keep_outputs=is_test_cell)
+        expected = nbformat.read(TEST_FILES_PATH / "test-exam.ipynb", as_version=4)
+        self.assertEqual(len(nb.cells), len(expected.cells))
+        for cell, expected_cell in zip(nb.cells, expected.cells):
+            if is_test_cell(cell):
+                self.assertEqual(cell, expected_cell)
+            elif cell.cell_type == "code":
+                self.assertEqual(cell.outputs, [])
+                self.assertEqual(cell.source, expected_cell.source)
+
+    def test_peak_memory(self):
+        png = base64.b64encode(os.urandom(1 << 18)).decode("ascii")
+        cells = [nbformat.v4.new_raw_cell("BEGIN INTRODUCTION")]
+        for i in range(40):
+            cells.append(nbformat.v4.new_code_cell(f"plot({i})", outputs=[
+                nbformat.v4.new_output("display_data", data={"image/png": png, "text/plain": "<Figure>"}),
+            ]))
+        cells.append(nbformat.v4.new_raw_cell("END INTRODUCTION"))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "master.ipynb")
+            nbformat.write(nbformat.v4.new_notebook(cells=cells), path)
+
+            peaks = []
+            for read in [lambda: nbformat.read(path, as_version=4), lambda: read_notebook(path, keep_outputs=is_test_cell)]:
+                tracemalloc.start()
+                nb = read()
+                peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+                del nb
+
+        # the stripped notebook is read within a few of its largest cells
+        self.assertLess(peaks[1], 8 * len(png))
+        self.assertLess(peaks[1] * 5, peaks[0])
+
+    def test_strip_outputs(self):
+        jexam(get_parser().parse_args([str(TEST_FILES_PATH / "test-exam.ipynb"), "dist", "-q", "--strip-outputs"]))
+        for i in range(100):
+            self.assertDirsEqual(os.path.join("dist", f"exam_{i}"), TEST_FILES_PATH / "dist-correct" / f"exam_{i}")
+        self.assertDirsEqual(os.path.join("dist", "autograder", "tests"), TEST_FILES_PATH / "dist-correct" / "autograder" / "tests")
+
+        autograder = nbformat.read(os.path.join("dist", "autograder", "test-exam.ipynb"), as_version=4)
+        for cell in autograder.cells:
+            if cell.cell_type == "code" and not is_test_cell(cell):
+                self.assertEqual(cell.outputs, [])
+
+    def tearDown(self):
+        if os.path.exists("dist"):
+            shutil.rmtree("dist")
@@ -0,0 +1,199 @@
+##################################
+##### Tests for jExam Server #####
+##################################
+
+import unittest
+import os
+import json
+import shutil
+import socket
+import pathlib
+import tempfile
+import threading
+import http.client
+
+from unittest import mock
+
+from jexam.server import ExamCache, make_server, write_token
+
+from . import test_jexam
+
+TEST_FILES_PATH = pathlib.Path("test")
+
+class TestServer(unittest.TestCase):
+
+    assertDirsEqual = test_jexam.TestJexam.assertDirsEqual
+    assertFilesEqual = test_jexam.TestJexam.assertFilesEqual
+
+    def start(self, **kwargs):
+        server = make_server(**kwargs)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def request(self, server, method, path, body=None, headers=None):
+        conn = http.client.HTTPConnection(*server.server_address[:2])
+        headers = {
+            "Host": f"localhost:{server.server_address[1]}",
+            "Authorization": f"Bearer {server.token}",
+            "Content-Type": "application/json",
+            **(headers or {}),
+        }
+        conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = conn.getresponse()
+        data = json.loads(response.read())
+        conn.close()
+        return response.status, data
+
+    def test_build(self):
+        server = self.start(port=0)
+        master = str(TEST_FILES_PATH / "test-exam.ipynb")
+
+        status, response = self.request(server, "POST", "/build", {"master": master, "result": "dist"})
+        self.assertEqual(status, 200, response)
+        self.assertFalse(response["cached"])
+
+        shutil.rmtree(os.path.join("dist", ".jexam"))
+        self.assertDirsEqual("dist", TEST_FILES_PATH / "dist-correct")
+        shutil.rmtree("dist")
+
+        status, response = self.request(server, "POST", "/build", {"master": master, "seed": 150, "jobs": 2})
+        self.assertEqual(status, 200, response)
+        self.assertTrue(response["cached"])
+        shutil.rmtree(os.path.join("dist", ".jexam"))
+        self.assertDirsEqual("dist", TEST_FILES_PATH / "dist-correct-150")
+
+        status, response = self.request(server, "GET", "/status")
+        self.assertEqual(status, 200)
+        self.assertEqual(response["masters"], [{"master": os.path.abspath(master), "format": "otter"}])
+
+        for body in [{}, {"master": master, "foo": 1}, {"master": "missing.ipynb"}, {"master": master, "format": "xyz"}]:
+            status, response = self.request(server, "POST", "/build", body)
+            self.assertEqual(status, 400, body)
+            self.assertIn("error", response)
+
+        status, _ = self.request(server, "GET", "/foo")
+        self.assertEqual(status, 404)
+
+    def test_request_checks(self):
+        server = self.start(port=0, token="secret")
+        body = {"master": str(TEST_FILES_PATH / "test-exam.ipynb")}
+        for headers, status in [
+            ({"Content-Type": "text/plain"}, 415),
+            ({"Content-Type": "application/x-www-form-urlencoded"}, 415),
+            ({"Host": f"evil.example:{server.server_address[1]}"}, 403),
+            ({"Host": "localhost:1"}, 403),
+            ({"Authorization": "Bearer wrong"}, 401),
+            ({"Authorization": ""}, 401),
+        ]:
+            self.assertEqual(self.request(server, "POST", "/build", body, headers)[0], status, headers)
+        self.assertFalse(os.path.exists("dist"))
+
+        self.assertEqual(self.request(server, "GET", "/status", headers={"Authorization": ""})[0], 401)
+        self.assertEqual(self.request(server, "GET", "/status", headers={"Host": "127.0.0.1:1"})[0], 403)
+        status, _ = self.request(server, "GET", "/status", headers={
+            "Host": f"127.0.0.1:{server.server_address[1]}", "Content-Type": "application/json; charset=utf-8",
+        })
+        self.assertEqual(status, 200)
+
+        # TCP servers get a random token
+        self.assertNotEqual(self.start(port=0).token, self.start(port=0).token)
+
+    def test_write_token(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "token")
+            with open(path, "w") as f:
+                f.write("old token")
+            os.chmod(path, 0o644)
+            write_token(path, "secret")
+            with open(path) as f:
+                self.assertEqual(f.read(), "secret")
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            master = os.path.join(tmp, "test-exam.ipynb")
+            shutil.copy(TEST_FILES_PATH / "test-exam.ipynb", master)
+
+            cache = ExamCache()
+            exam, cached = cache.get(master)
+            self.assertFalse(cached)
+            self.assertEqual(cache.get(master), (exam, True))
+            self.assertFalse(cache.get(master, "ok")[1])
+
+            with open(master, "a") as f:
+                f.write("\n")
+            new_exam, cached = cache.get(master)
+            self.assertFalse(cached)
+            self.assertIsNot(new_exam, exam)
+
+    def test_cache_concurrency(self):
+        parsing, release = threading.Event(), threading.Event()
+        def load_exam(path, autograder_format):
+            if autograder_format == "ok":
+                parsing.set()
+                release.wait(10)
+            return object()
+
+        cache = ExamCache()
+        master = str(TEST_FILES_PATH / "test-exam.ipynb")
+        with mock.patch("jexam.server.load_exam", load_exam):
+            thread = threading.Thread(target=cache.get, args=(master, "ok"))
+            thread.start()
+            try:
+                self.assertTrue(parsing.wait(10))
+                # a slow parse does not block other masters
+                other = threading.Thread(target=cache.get, args=(master, "otter"))
+                other.start()
+                other.join(5)
+                self.assertFalse(other.is_alive())
+                self.assertTrue(cache.get(master, "otter")[1])
+            finally:
+                release.set()
+                thread.join()
+        self.assertEqual(len(cache.masters()), 2)
+
+    def test_unix_socket(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "jexam.sock")
+            server = self.start(socket_path=path)
+            self.assertIsNone(server.token)
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(path)
+                sock.sendall(b"GET /status HTTP/1.0\r\n\r\n")
+                data = b""
+                while True:
+                    chunk = sock.recv(4096)
+                    if not chunk:
+                        break
+                    data += chunk
+
+            head, body = data.split(b"\r\n\r\n", 1)
+            self.assertTrue(head.startswith(b"HTTP/1.0 200"), head)
+            self.assertEqual(json.loads(body)["masters"], [])
+
+            # a stale socket is replaced and the umask is restored
+            umask = os.umask(0o022)
+            try:
+                self.start(socket_path=path)
+                self.assertEqual(os.umask(0o022), 0o022)
+            finally:
+                os.umask(umask)
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+
+            # other files are never deleted
+            notebook = os.path.join(tmp, "exam.ipynb")
+            with open(notebook, "w") as f:
+                f.write("{}")
+            with self.assertRaisesRegex(FileExistsError, "is not a socket"):
+                make_server(socket_path=notebook)
+            with open(notebook) as f:
+                self.assertEqual(f.read(), "{}")
+
+    def tearDown(self):
+        if os.path.exists("dist"):
+            shutil.rmtree("dist")
@@ -0,0 +1,67 @@
+#####################################
+##### Tests for jExam Utilities #####
+#####################################
+
+import unittest
+import threading
+import multiprocessing
+
+from jexam.utils import get_mp_context, str_to_doctest
+
+class TestUtils(unittest.TestCase):
+
+    def test_str_to_doctest(self):
+        code_lines = [
+            "try:",
+            "    x = 1",
+            "except:",
+            "    pass",
+            "if x:",
+            "    y = 2",
+            "elif x is None:",
+            "    y = 3",
+            "else:",
+            "\ty = 4",
+            "z = 1 + \\",
+            "2",
+            "x + z",
+        ]
+        self.assertEqual(str_to_doctest(code_lines, []), [
+            ">>> try:",
+            "...     x = 1",
+            "... except:",
+            "...     pass",
+            ">>> if x:",
+            "...     y = 2",
+            "... elif x is None:",
+            "...     y = 3",
+            "... else:",
+            "... \ty = 4",
+            ">>> z = 1 + \\",
+            "... 2",
+            ">>> x + z",
+        ])
+
+    def test_str_to_doctest_continues_lines(self):
+        self.assertEqual(str_to_doctest(["2"], [">>> x = 1 + \\"]), [">>> x = 1 + \\", "... 2"])
+
+    def test_str_to_doctest_long_cell(self):
+        code_lines = ["data = ["] + ["    (%d, %d)," % (i, i ** 2) for i in range(20000)] + ["]", "len(data)"]
+        lines = str_to_doctest(code_lines, [])
+        self.assertEqual(len(lines), len(code_lines))
+        self.assertEqual(lines[0], ">>> data = [")
+        self.assertTrue(all(l.startswith("... ") for l in lines[1:-2]))
+        self.assertEqual(lines[-2:], [">>> ]", ">>> len(data)"])
+
+    def test_get_mp_context(self):
+        self.assertEqual(get_mp_context().get_start_method(), multiprocessing.get_start_method())
+
+        # worker processes are spawned while other threads are running
+        event = threading.Event()
+        thread = threading.Thread(target=event.wait)
+        thread.start()
+        try:
+            self.assertEqual(get_mp_context().get_start_method(), "spawn")
+        finally:
+            event.set()
+            thread.join()
@@ -0,0 +1,65 @@
+#################################
+##### Tests for jExam Watch #####
+#################################
+
+import unittest
+import os
+import shutil
+import pathlib
+import tempfile
+import nbformat
+
+from jexam.argparser import get_parser
+from jexam.parser import main as jexam
+from jexam.watch import Watcher
+
+from . import test_jexam
+
+TEST_FILES_PATH = pathlib.Path("test")
+
+class TestWatch(unittest.TestCase):
+
+    assertDirsEqual = test_jexam.TestJexam.assertDirsEqual
+    assertFilesEqual = test_jexam.TestJexam.assertFilesEqual
+
+    def test_watcher(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            master, result = os.path.join(tmp, "test-exam.ipynb"), os.path.join(tmp, "dist")
+            shutil.copy(TEST_FILES_PATH / "test-exam.ipynb", master)
+
+            watcher = Watcher(get_parser().parse_args([master, result, "-q"]))
+            self.assertTrue(watcher.check())
+            self.assertEqual(watcher.reused, 0)
+            self.assertFalse(watcher.check())
+
+            # keep the build cache for the next check
+            first = os.path.join(tmp, "first")
+            shutil.copytree(result, first, ignore=shutil.ignore_patterns(".jexam"))
+            self.assertDirsEqual(first, TEST_FILES_PATH / "dist-correct")
+
+            # change the solution of one version
+            nb = nbformat.read(master, as_version=4)
+            nb.cells[8].source = "root = 3 # SOLUTION"
+            nb.cells[10].source = "# HIDDEN TEST\nroot == 3"
+            nbformat.write(nb, master)
+
+            self.assertTrue(watcher.check())
+            self.assertEqual(watcher.reused, len(watcher.version_cache) - 1)
+
+            expected = os.path.join(tmp, "expected")
+            jexam(get_parser().parse_args([master, expected, "-q"]))
+            for path in [result, expected]:
+                shutil.rmtree(os.path.join(path, ".jexam"))
+            self.assertDirsEqual(result, expected)
+
+    def test_unsupported_args(self):
+        master = str(TEST_FILES_PATH / "test-exam.ipynb")
+        for args, error in [
+            ([master, "dist.zip"], "Watching requires a directory result"),
+            ([master, "dist.tar.gz"], "Watching requires a directory result"),
+            ([master, "--profile"], "--profile is not supported with --watch"),
+            ([master, "--progress", "-"], "--progress is not supported with --watch"),
+        ]:
+            with self.assertRaisesRegex(AssertionError, error):
+                Watcher(get_parser().parse_args(args + ["--watch"]))
+
@@ -0,0 +1,43 @@
+##################################
+##### Tests for jExam Writer #####
+##################################
+
+import os
+import unittest
+import nbformat
+
+from jexam.writer import NotebookWriter, encode_cells
+
+TEST_NB_PATH = "test-writer.ipynb"
+
+class TestWriter(unittest.TestCase):
+
+    def assertWriterMatchesNbformat(self, cells):
+        nb = nbformat.v4.new_notebook(cells=cells)
+        expected = nbformat.writes(nb) + "\n"
+
+        writer = NotebookWriter()
+        fragments = encode_cells(cells)
+        self.assertEqual(writer.writes(fragments), expected, "Joined notebook did not match nbformat")
+
+        writer.write(fragments, TEST_NB_PATH)
+        with open(TEST_NB_PATH, encoding="utf-8") as f:
+            self.assertEqual(f.read(), expected, "Written notebook did not match nbformat")
+
+    def test_cells(self):
+        code = nbformat.v4.new_code_cell("x = 1\ny = 2  # ünïcödé", execution_count=3)
+        code.outputs = [nbformat.v4.new_output("stream", text="a\nb\n")]
+        code.metadata["trusted"] = True
+        self.assertWriterMatchesNbformat([
+            nbformat.v4.new_markdown_cell("# Title\n\nSome *text*"),
+            code,
+            nbformat.v4.new_raw_cell(""),
+            nbformat.v4.new_code_cell(["grader.check(\"q1\")"]),
+        ])
+
+    def test_empty_notebook(self):
+        self.assertWriterMatchesNbformat([])
+
+    def tearDown(self):
+        if os.path.exists(TEST_NB_PATH):
+            os.remove(TEST_NB_PATH)